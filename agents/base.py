@@ -0,0 +1,282 @@
+import os
+import time
+
+from langchain_groq import ChatGroq
+
+from agents.call_policy import get_call_policy, last_record
+from agents.llm_cache import LLMCache, get_default_cache
+from agents.llm_clients import get_llm
+from agents.prompts import count_tokens
+from agents.routing import call_cost, routed_model
+from agents.scheduler import estimate_tokens, get_scheduler
+from agents.schemas import REPAIR_PROMPT, fill_defaults, repair_inputs, validate
+from utils.json_extract import parse_json
+from utils.json_stream import IncrementalJSONParser
+from utils.metrics import record, timed
+
+
+class BaseAgent:
+	"""Shared LLM plumbing for the agents. Subclasses set ``self.prompt`` (the default for ``_invoke``)."""
+
+	# Completion size assumed for rate-limit admission before the response is known
+	expected_completion_tokens = 512
+	# Expected JSON response (see agents/schemas.py); enables JSON mode and per-field repair
+	schema = None
+	# A repaired response from this agent stands in for a whole extra refinement loop
+	repair_saves_loop = False
+	json_mode = os.getenv("RESUME_JSON_MODE", "1") != "0"
+
+	def __init__(self, groq_api_key: str, model_name: str = "llama-3.1-8b-instant", cache: LLMCache = None):
+		self.groq_api_key = groq_api_key
+		self.model_name = model_name
+		self._llm = None
+		self.cache = cache if cache is not None else get_default_cache()
+		self.scheduler = get_scheduler()
+		self.call_policy = get_call_policy(type(self).__name__)
+
+	@property
+	def llm(self) -> ChatGroq:
+		# An explicitly assigned model (e.g. a test double) always wins; otherwise the routed model for
+		# this call, or the agent's own, comes from the shared client registry
+		if self._llm is not None:
+			return self._llm
+		return get_llm(self.groq_api_key, routed_model() or self.model_name)
+
+	@llm.setter
+	def llm(self, value: ChatGroq):
+		self._llm = value
+
+	def _chain(self, prompt):
+		llm = self.llm
+		# Groq's JSON mode guarantees a syntactically valid object; streaming calls do not use it
+		if self.json_mode and self.schema is not None and isinstance(llm, ChatGroq):
+			llm = llm.bind(response_format={"type": "json_object"})
+		return prompt | llm
+
+	def _cache_key(self, inputs: dict, prompt) -> str:
+		return LLMCache.make_key(prompt.template, inputs, self.llm.model_name, self.llm.temperature)
+
+	def _cached(self, inputs: dict, prompt):
+		"""Return (cache key, cached response or None) for these inputs."""
+		if self.cache is None:
+			return None, None
+		key = self._cache_key(inputs, prompt)
+		return key, self.cache.get(key)
+
+	def _forget(self, inputs: dict, prompt=None):
+		"""Drop the cached response for these inputs, e.g. one that parsed but is unusable."""
+		if self.cache is not None:
+			self.cache.delete(self._cache_key(inputs, prompt or self.prompt))
+
+	def _count_prompt(self, event: dict, inputs: dict, prompt) -> int:
+		"""Count the formatted prompt's tokens before sending and note them on the call's event
+		(``prompt_tokens_exact`` when a tokenizer is configured, see ``agents.prompts.count_tokens``)."""
+		tokens, exact = count_tokens(prompt.format(**inputs))
+		event["prompt_tokens_counted"] = tokens
+		event["prompt_tokens_exact"] = exact
+		return tokens
+
+	def _estimate_tokens(self, inputs: dict, prompt_tokens: int) -> int:
+		"""Prompt plus expected completion tokens, used for admission before sending."""
+		return prompt_tokens + self._completion_estimate(inputs)
+
+	def _completion_estimate(self, inputs: dict) -> int:
+		return self.expected_completion_tokens
+
+	def _store(self, key: str, response, schema: dict = None) -> str:
+		# Extract text from AIMessage if needed
+		response_text = getattr(response, "content", response) if hasattr(response, "content") else response
+		# a truncated or malformed response would otherwise be replayed for the cache's whole TTL
+		if key is not None and (schema is None or not self._validate(response_text, schema)[2]):
+			self.cache.set(key, response_text)
+		return response_text
+
+	def _annotate(self, event: dict, inputs: dict, prompt, response, response_text: str, via_policy: bool = True):
+		"""Add token usage and retry details of a completed LLM call to its metrics event."""
+		metadata = getattr(response, "response_metadata", None) or {}
+		usage = metadata.get("token_usage") or {}
+		if usage.get("prompt_tokens") is not None:
+			event["prompt_tokens"] = usage["prompt_tokens"]
+			event["completion_tokens"] = usage.get("completion_tokens", 0)
+		else:
+			event["prompt_tokens"] = event["prompt_tokens_counted"]
+			event["completion_tokens"] = estimate_tokens(response_text)
+			event["tokens_estimated"] = True
+		event["cost"] = call_cost(event["model"], event["prompt_tokens"], event["completion_tokens"])
+		policy_record = last_record() if via_policy and self.call_policy is not None else None
+		if policy_record is not None:
+			event["retries"] = policy_record["attempt"]
+			event["winner"] = policy_record["winner"]
+
+	def _record_parse(self, outcome: str, **fields):
+		"""Record how a response was parsed: ``json``, ``extracted`` (found in surrounding text),
+		``repaired`` or ``default``."""
+		record({"kind": "parse", "agent": type(self).__name__, "outcome": outcome, **fields})
+
+	def _validate(self, response_text: str, schema: dict) -> tuple:
+		"""(validated fields, how the JSON was found or None, broken field names)."""
+		data, how = parse_json(response_text)
+		result, broken = validate(data, schema)
+		return result, how, broken
+
+	def _repairable(self, response_text: str, broken: list, schema: dict) -> list:
+		if not response_text or not response_text.strip():
+			return []
+		return [name for name in broken if schema[name].repair]
+
+	@staticmethod
+	def _repair_schema(schema: dict, fields: list) -> dict:
+		# a repair response is only cached when every re-requested field validates
+		return {name: schema[name] for name in fields}
+
+	def _merge_repair(self, result: dict, broken: list, fields: list, repair_text: str, schema: dict) -> tuple:
+		data, _ = parse_json(repair_text)
+		fixed, _ = validate({name: data[name] for name in fields if name in (data or {})}, self._repair_schema(schema, fields))
+		fixed = {name: value for name, value in fixed.items() if name in fields}
+		result.update(fixed)
+		return result, [name for name in broken if name not in fixed], list(fixed)
+
+	def _finish_parse(self, result: dict, how: str, broken: list, repaired: list, schema: dict) -> tuple:
+		if repaired:
+			self._record_parse("repaired", fields=repaired, saves_loop=self.repair_saves_loop)
+		else:
+			self._record_parse(how or "default")
+		return fill_defaults(result, schema, broken), broken
+
+	def _parse_structured(self, response_text: str, schema: dict = None) -> tuple:
+		"""(result, fields that fell back to defaults) for a response checked against ``schema``.
+
+		Broken repairable fields are re-requested in one small prompt that only sees the broken
+		response, instead of rerunning the agent (or the whole refinement loop).
+		"""
+		schema = schema or self.schema
+		result, how, broken = self._validate(response_text, schema)
+		fields, repaired = self._repairable(response_text, broken, schema), []
+		if fields:
+			repair_text = self._invoke(repair_inputs(schema, fields, response_text), REPAIR_PROMPT, self._repair_schema(schema, fields))
+			result, broken, repaired = self._merge_repair(result, broken, fields, repair_text, schema)
+		return self._finish_parse(result, how, broken, repaired, schema)
+
+	async def _aparse_structured(self, response_text: str, schema: dict = None) -> tuple:
+		schema = schema or self.schema
+		result, how, broken = self._validate(response_text, schema)
+		fields, repaired = self._repairable(response_text, broken, schema), []
+		if fields:
+			repair_text = await self._ainvoke(repair_inputs(schema, fields, response_text), REPAIR_PROMPT, self._repair_schema(schema, fields))
+			result, broken, repaired = self._merge_repair(result, broken, fields, repair_text, schema)
+		return self._finish_parse(result, how, broken, repaired, schema)
+
+	def _invoke(self, inputs: dict, prompt=None, schema: dict = None) -> str:
+		# only responses that validate against ``schema`` (the agent's own for its own prompt) are cached
+		schema = schema if prompt is not None else self.schema
+		prompt = prompt or self.prompt
+		with timed("agent_call", agent=type(self).__name__) as event:
+			event["model"] = self.llm.model_name
+			key, cached = self._cached(inputs, prompt)
+			if cached is not None:
+				event["cache_hit"] = True
+				return cached
+			chain = self._chain(prompt)
+			prompt_tokens = self._count_prompt(event, inputs, prompt)
+			if self.scheduler is None:
+				attempt = lambda: chain.invoke(inputs)
+			else:
+				tokens = self._estimate_tokens(inputs, prompt_tokens)
+				attempt = lambda: self.scheduler.call(lambda: chain.invoke(inputs), tokens)
+			# Each attempt (including hedged duplicates and retries) is admitted by the scheduler
+			response = attempt() if self.call_policy is None else self.call_policy.call(attempt, self.scheduler)
+			response_text = self._store(key, response, schema)
+			self._annotate(event, inputs, prompt, response, response_text)
+			return response_text
+
+	async def _ainvoke(self, inputs: dict, prompt=None, schema: dict = None) -> str:
+		schema = schema if prompt is not None else self.schema
+		prompt = prompt or self.prompt
+		with timed("agent_call", agent=type(self).__name__) as event:
+			event["model"] = self.llm.model_name
+			key, cached = self._cached(inputs, prompt)
+			if cached is not None:
+				event["cache_hit"] = True
+				return cached
+			chain = self._chain(prompt)
+			prompt_tokens = self._count_prompt(event, inputs, prompt)
+			if self.scheduler is None:
+				attempt = lambda: chain.ainvoke(inputs)
+			else:
+				tokens = self._estimate_tokens(inputs, prompt_tokens)
+				attempt = lambda: self.scheduler.acall(lambda: chain.ainvoke(inputs), tokens)
+			response = await (attempt() if self.call_policy is None else self.call_policy.acall(attempt, self.scheduler))
+			response_text = self._store(key, response, schema)
+			self._annotate(event, inputs, prompt, response, response_text)
+			return response_text
+
+	def _stream(self, inputs: dict, prompt=None, schema: dict = None):
+		"""Yield response text chunks as they arrive; a cache hit is yielded as one chunk."""
+		schema = schema if prompt is not None else self.schema
+		prompt = prompt or self.prompt
+		key, cached = self._cached(inputs, prompt)
+		if cached is not None:
+			record({"kind": "agent_call", "agent": type(self).__name__, "model": self.llm.model_name, "cache_hit": True, "duration": 0.0})
+			yield cached
+			return
+		chain = prompt | self.llm
+		event = {"kind": "agent_call", "agent": type(self).__name__, "model": self.llm.model_name, "streamed": True}
+		prompt_tokens = self._count_prompt(event, inputs, prompt)
+		if self.scheduler is None:
+			stream = chain.stream(inputs)
+		else:
+			stream = self.scheduler.stream(lambda: chain.stream(inputs), self._estimate_tokens(inputs, prompt_tokens))
+		started = time.perf_counter()
+		chunks = []
+		for chunk in stream:
+			text = getattr(chunk, "content", chunk)
+			chunks.append(text)
+			if len(chunks) == 1:
+				event["first_token"] = time.perf_counter() - started
+			yield text
+		event["duration"] = time.perf_counter() - started
+		response_text = self._store(key, "".join(chunks), schema)
+		self._annotate(event, inputs, prompt, None, response_text, via_policy=False)
+		record(event)
+
+	async def _astream(self, inputs: dict, prompt=None, schema: dict = None):
+		schema = schema if prompt is not None else self.schema
+		prompt = prompt or self.prompt
+		key, cached = self._cached(inputs, prompt)
+		if cached is not None:
+			record({"kind": "agent_call", "agent": type(self).__name__, "model": self.llm.model_name, "cache_hit": True, "duration": 0.0})
+			yield cached
+			return
+		chain = prompt | self.llm
+		event = {"kind": "agent_call", "agent": type(self).__name__, "model": self.llm.model_name, "streamed": True}
+		prompt_tokens = self._count_prompt(event, inputs, prompt)
+		if self.scheduler is None:
+			stream = chain.astream(inputs)
+		else:
+			stream = self.scheduler.astream(lambda: chain.astream(inputs), self._estimate_tokens(inputs, prompt_tokens))
+		started = time.perf_counter()
+		chunks = []
+		async for chunk in stream:
+			text = getattr(chunk, "content", chunk)
+			chunks.append(text)
+			if len(chunks) == 1:
+				event["first_token"] = time.perf_counter() - started
+			yield text
+		event["duration"] = time.perf_counter() - started
+		response_text = self._store(key, "".join(chunks), schema)
+		self._annotate(event, inputs, prompt, None, response_text, via_policy=False)
+		record(event)
+
+	def _stream_json(self, inputs: dict, prompt=None):
+		"""Yield IncrementalJSONParser events as tokens arrive, then ``{"type": "text", "value": full response}``."""
+		parser = IncrementalJSONParser()
+		for chunk in self._stream(inputs, prompt):
+			yield from parser.feed(chunk)
+		yield {"type": "text", "value": parser.buffer}
+
+	async def _astream_json(self, inputs: dict, prompt=None):
+		parser = IncrementalJSONParser()
+		async for chunk in self._astream(inputs, prompt):
+			for event in parser.feed(chunk):
+				yield event
+		yield {"type": "text", "value": parser.buffer}
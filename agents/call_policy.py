@@ -0,0 +1,305 @@
+import asyncio
+import contextvars
+import os
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from agents.scheduler import Admission, track_admission
+
+# How often a call still queued for admission is checked on
+ADMISSION_POLL = 0.05
+
+TRANSIENT_ERROR_NAMES = {
+	"APIConnectionError", "APITimeoutError", "InternalServerError", "ServiceUnavailableError",
+	"ConnectError", "ReadTimeout", "ConnectTimeout", "RemoteProtocolError",
+}
+
+
+def is_transient(error: Exception) -> bool:
+	if isinstance(error, (TimeoutError, asyncio.TimeoutError, ConnectionError)):
+		return True
+	status = getattr(error, "status_code", None)
+	return (isinstance(status, int) and status >= 500) or type(error).__name__ in TRANSIENT_ERROR_NAMES
+
+
+_last_record = contextvars.ContextVar("last_call_record", default=None)
+
+
+def last_record():
+	"""The policy record (attempt, winner, latency) of the most recent call in this context."""
+	return _last_record.get()
+
+
+class CallTimeout(TimeoutError):
+	pass
+
+
+class LatencyTracker:
+	"""Rolling window of call latencies (seconds) with percentile lookups."""
+
+	def __init__(self, window: int = 200):
+		self._samples = deque(maxlen=window)
+		self._lock = threading.Lock()
+
+	def add(self, seconds: float):
+		with self._lock:
+			self._samples.append(seconds)
+
+	def __len__(self):
+		return len(self._samples)
+
+	def percentile(self, q: float):
+		with self._lock:
+			if not self._samples:
+				return None
+			ordered = sorted(self._samples)
+		return ordered[min(len(ordered) - 1, int(q / 100.0 * len(ordered)))]
+
+
+class CallPolicy:
+	"""Tail-latency control for one agent role's LLM calls.
+
+	- Deadline: ``deadline_multiplier`` x observed p99, clamped to [min_timeout, max_timeout]
+	  (``max_timeout`` until ``min_samples`` calls have been seen).
+	- Hedging: once a call outlives the observed p95, a duplicate is sent; the first to finish
+	  wins and the other is cancelled.
+	- Both clocks start when the rate-limit scheduler admits the call, not when it is queued.
+	- Retries: timeouts and transient errors are retried with jittered exponential backoff.
+	"""
+
+	def __init__(self, name: str, hedge: bool = True, max_retries: int = 2, min_samples: int = 10,
+			min_timeout: float = 10.0, max_timeout: float = 120.0, deadline_multiplier: float = 3.0,
+			base_backoff: float = 0.5):
+		self.name = name
+		self.hedge = hedge
+		self.max_retries = max_retries
+		self.min_samples = min_samples
+		self.min_timeout = min_timeout
+		self.max_timeout = max_timeout
+		self.deadline_multiplier = deadline_multiplier
+		self.base_backoff = base_backoff
+		self.latency = LatencyTracker()
+		self.records = deque(maxlen=500)
+		self._lock = threading.Lock()
+		self.counts = {"calls": 0, "hedges": 0, "hedges_skipped": 0, "hedge_wins": 0, "retries": 0,
+			"timeouts": 0}
+
+	def deadline(self) -> float:
+		if len(self.latency) < self.min_samples:
+			return self.max_timeout
+		p99 = self.latency.percentile(99)
+		return min(self.max_timeout, max(self.min_timeout, p99 * self.deadline_multiplier))
+
+	def hedge_delay(self):
+		if not self.hedge or len(self.latency) < self.min_samples:
+			return None
+		return self.latency.percentile(95)
+
+	def _backoff(self, attempt: int) -> float:
+		return self.base_backoff * 2 ** attempt * (0.5 + random.random())
+
+	def _record(self, attempt: int, winner: str, started: float, attempt_start: float, error: Exception = None) -> dict:
+		now = time.monotonic()
+		record = {"agent": self.name, "attempt": attempt, "winner": winner, "latency": round(now - started, 4)}
+		if error is None:
+			# percentiles track single-attempt latency, not time spent in earlier retries and backoff
+			self.latency.add(now - attempt_start)
+		else:
+			record["error"] = type(error).__name__
+		with self._lock:
+			self.counts["calls"] += 1
+			self.counts["retries"] += attempt
+			if winner == "hedge":
+				self.counts["hedge_wins"] += 1
+			self.records.append(record)
+		_last_record.set(record)
+		return record
+
+	def _count(self, key: str):
+		with self._lock:
+			self.counts[key] += 1
+
+	def _clock(self, admission, attempt_start: float):
+		"""When the attempt's deadline and hedge clocks started: at admission when queued by a scheduler
+		(None while still queued), otherwise at submission."""
+		return attempt_start if admission is None else admission.admitted_at
+
+	def _may_hedge(self, scheduler) -> bool:
+		# a hedge queued behind other callers only adds load where the rate limit is the bottleneck
+		if scheduler is not None and scheduler.queued():
+			self._count("hedges_skipped")
+			return False
+		self._count("hedges")
+		return True
+
+	def call(self, fn, scheduler=None):
+		"""Run ``fn`` (one blocking attempt) under the policy and return its result.
+
+		With the ``scheduler`` that admits ``fn``'s requests, queue wait is not counted toward the hedge
+		delay or the deadline, no hedge is sent while others are queued, and a losing attempt still
+		waiting for admission is withdrawn. Threads cannot be killed, so a loser already admitted (or a
+		timed-out attempt) finishes in the background and its result is discarded.
+		"""
+		started = time.monotonic()
+		for attempt in range(self.max_retries + 1):
+			attempt_start = time.monotonic()
+			deadline = self.deadline()
+			primary, admission = self._submit(fn, scheduler)
+			futures = {primary: "primary"}
+			admissions = [admission]
+			hedge_delay = self.hedge_delay()
+			error = None
+			while futures:
+				clock = self._clock(admission, attempt_start)
+				now = time.monotonic()
+				if clock is None:
+					timeout = ADMISSION_POLL
+				else:
+					timeout = clock + deadline - now
+					if "hedge" not in futures.values() and hedge_delay is not None:
+						timeout = min(timeout, clock + hedge_delay - now)
+				done, _ = wait(list(futures), timeout=max(0.0, timeout), return_when=FIRST_COMPLETED)
+				for future in done:
+					label = futures.pop(future)
+					try:
+						result = future.result()
+					except Exception as e:
+						error = e
+						continue
+					self._withdraw(futures, admissions)
+					self._record(attempt, label, started, clock if clock is not None else attempt_start)
+					return result
+				if done or clock is None:
+					continue
+				if time.monotonic() >= clock + deadline:
+					self._withdraw(futures, admissions)
+					error = CallTimeout(f"{self.name} call exceeded {deadline:.1f}s")
+					self._count("timeouts")
+					break
+				if hedge_delay is not None and "hedge" not in futures.values():
+					if self._may_hedge(scheduler):
+						hedge, hedge_admission = self._submit(fn, scheduler)
+						futures[hedge] = "hedge"
+						admissions.append(hedge_admission)
+					hedge_delay = None
+			if attempt == self.max_retries or not is_transient(error):
+				self._record(attempt, "none", started, attempt_start, error)
+				raise error
+			time.sleep(self._backoff(attempt))
+
+	@staticmethod
+	def _submit(fn, scheduler) -> tuple:
+		admission = Admission() if scheduler is not None else None
+
+		def run():
+			if admission is not None:
+				track_admission(admission)
+			return fn()
+
+		return _executor().submit(contextvars.copy_context().run, run), admission
+
+	@staticmethod
+	def _withdraw(futures: dict, admissions: list):
+		for loser in futures:
+			loser.cancel()
+		for admission in admissions:
+			if admission is not None:
+				admission.withdraw()
+
+	async def acall(self, make_coro, scheduler=None):
+		"""Async variant: ``make_coro`` returns a fresh awaitable per attempt; losers are cancelled.
+		``scheduler`` works as in ``call``."""
+		started = time.monotonic()
+		for attempt in range(self.max_retries + 1):
+			attempt_start = time.monotonic()
+			deadline = self.deadline()
+			primary, admission = self._start(make_coro, scheduler)
+			tasks = {primary: "primary"}
+			hedge_delay = self.hedge_delay()
+			error = None
+			try:
+				while tasks:
+					clock = self._clock(admission, attempt_start)
+					now = time.monotonic()
+					if clock is None:
+						timeout = ADMISSION_POLL
+					else:
+						timeout = clock + deadline - now
+						if "hedge" not in tasks.values() and hedge_delay is not None:
+							timeout = min(timeout, clock + hedge_delay - now)
+					done, _ = await asyncio.wait(list(tasks), timeout=max(0.0, timeout), return_when=asyncio.FIRST_COMPLETED)
+					for task in done:
+						label = tasks.pop(task)
+						if task.exception() is not None:
+							error = task.exception()
+							continue
+						self._record(attempt, label, started, clock if clock is not None else attempt_start)
+						return task.result()
+					if done or clock is None:
+						continue
+					if time.monotonic() >= clock + deadline:
+						error = CallTimeout(f"{self.name} call exceeded {deadline:.1f}s")
+						self._count("timeouts")
+						break
+					if hedge_delay is not None and "hedge" not in tasks.values():
+						if self._may_hedge(scheduler):
+							tasks[self._start(make_coro, scheduler)[0]] = "hedge"
+						hedge_delay = None
+			finally:
+				for task in tasks:
+					task.cancel()
+			if attempt == self.max_retries or not is_transient(error):
+				self._record(attempt, "none", started, attempt_start, error)
+				raise error
+			await asyncio.sleep(self._backoff(attempt))
+
+	@staticmethod
+	def _start(make_coro, scheduler) -> tuple:
+		admission = Admission() if scheduler is not None else None
+
+		async def run():
+			# each task runs in its own copy of the context, so this only tracks this attempt
+			if admission is not None:
+				track_admission(admission)
+			return await make_coro()
+
+		return asyncio.ensure_future(run()), admission
+
+	def stats(self) -> dict:
+		with self._lock:
+			counts = dict(self.counts)
+		counts["p50"] = self.latency.percentile(50)
+		counts["p95"] = self.latency.percentile(95)
+		counts["p99"] = self.latency.percentile(99)
+		counts["deadline"] = self.deadline()
+		return counts
+
+
+_executor_instance = None
+_policies = {}
+_lock = threading.Lock()
+
+
+def _executor() -> ThreadPoolExecutor:
+	global _executor_instance
+	with _lock:
+		if _executor_instance is None:
+			_executor_instance = ThreadPoolExecutor(max_workers=32, thread_name_prefix="llm-call")
+		return _executor_instance
+
+
+def get_call_policy(name: str):
+	"""The process-wide policy for one agent role, so latency history is shared by every instance.
+	Set RESUME_CALL_POLICY=0 to call the model directly, or RESUME_HEDGING=0 to keep deadlines and
+	retries without hedged duplicates."""
+	if os.getenv("RESUME_CALL_POLICY", "1").lower() in ("0", "false", "off"):
+		return None
+	with _lock:
+		policy = _policies.get(name)
+		if policy is None:
+			hedge = os.getenv("RESUME_HEDGING", "1").lower() not in ("0", "false", "off")
+			policy = _policies[name] = CallPolicy(name, hedge=hedge)
+		return policy
@@ -1,42 +1,101 @@
-from langchain_groq import ChatGroq
-from langchain_core.prompts import PromptTemplate
-
-class JDAnalyzer:
-	def __init__(self, groq_api_key: str, model_name: str = "llama-3.1-8b-instant"):
-		self.llm = ChatGroq(
-			api_key=groq_api_key,
-			model_name=model_name
-		)
-		self.prompt = PromptTemplate(
-			input_variables=["jd_text"],
-			template=(
-				"""
-				Analyze the following job description (JD):\n{jd_text}\n\n"
-				"Extract the following:\n"
-				"1. Key skills required (list only the most relevant).\n"
-				"2. The overall tone of the JD (e.g., formal, casual, urgent, etc.).\n"
-				"3. Important keywords (list only the most important).\n"
-				"Return your answer as a JSON object with keys: 'skills', 'tone', 'keywords'."
-				"""
-			)
+import asyncio
+import threading
+from concurrent.futures import Future
+
+from agents.base import BaseAgent
+from agents.jd_profile import JDProfile, JDProfileStore, get_default_profile_store, jd_hash
+from agents.llm_cache import LLMCache
+from agents.prompts import compile_prompt, strip_jd_boilerplate
+from agents.schemas import JD_ANALYSIS
+
+class JDAnalyzer(BaseAgent):
+	schema = JD_ANALYSIS
+
+	def __init__(self, groq_api_key: str, model_name: str = "llama-3.1-8b-instant", cache: LLMCache = None,
+			profile_store: JDProfileStore = None):
+		super().__init__(groq_api_key, model_name, cache)
+		self.profile_store = profile_store if profile_store is not None else get_default_profile_store()
+		# in-flight analyses by JD hash: concurrent.futures for threads, asyncio futures for tasks
+		self._profile_lock = threading.Lock()
+		self._inflight_sync = {}
+		self._inflight = {}
+		self.prompt = compile_prompt(
+			"""
+			Analyze the following job description (JD) and extract:
+			1. Key skills required (list only the most relevant).
+			2. The overall tone of the JD (e.g., formal, casual, urgent).
+			3. Important keywords (list only the most important).
+			JSON keys: 'skills', 'tone', 'keywords'.
+			""",
+			[("Job Description", "jd_text")],
 		)
 
 	def analyze(self, jd_text: str) -> dict:
-		chain = self.prompt | self.llm
-		response = chain.invoke({"jd_text": jd_text})
-		# Extract text from AIMessage if needed
-		response_text = getattr(response, "content", response) if hasattr(response, "content") else response
-		import json
+		# EEO and benefits paragraphs carry no skills; the profile is still keyed by the raw JD
+		return self._parse(self._invoke(self._inputs(jd_text)))
+
+	async def aanalyze(self, jd_text: str) -> dict:
+		return await self._aparse(await self._ainvoke(self._inputs(jd_text)))
+
+	@staticmethod
+	def _inputs(jd_text: str) -> dict:
+		return {"jd_text": strip_jd_boilerplate(jd_text)}
+
+	def profile(self, jd_text: str) -> JDProfile:
+		"""Analyze a JD at most once; later calls for the same normalized JD reuse the stored profile."""
+		key = jd_hash(jd_text)
+		profile = self.profile_store.get(key)
+		if profile is not None:
+			return profile
+		# Threads asking for the same JD wait for one analysis; different JDs are analyzed in parallel
+		with self._profile_lock:
+			future = self._inflight_sync.get(key)
+			owner = future is None
+			if owner:
+				future = self._inflight_sync[key] = Future()
+		if not owner:
+			return future.result()
 		try:
-			result = json.loads(response_text)
-		except Exception:
-			import re
-			match = re.search(r"{.*}", response_text, re.DOTALL)
-			if match:
-				try:
-					result = json.loads(match.group(0))
-				except Exception:
-					result = {"skills": [], "tone": "", "keywords": []}
-			else:
-				result = {"skills": [], "tone": "", "keywords": []}
+			profile = self._store_profile(jd_text, self.analyze(jd_text))
+		except BaseException as e:
+			future.set_exception(e)
+			raise
+		finally:
+			with self._profile_lock:
+				self._inflight_sync.pop(key, None)
+		future.set_result(profile)
+		return profile
+
+	async def aprofile(self, jd_text: str) -> JDProfile:
+		key = jd_hash(jd_text)
+		profile = self.profile_store.get(key)
+		if profile is not None:
+			return profile
+		# Concurrent flows on the same JD wait for one analysis instead of each starting their own
+		future = self._inflight.get(key)
+		if future is None:
+			future = asyncio.ensure_future(self._aprofile(jd_text))
+			self._inflight[key] = future
+			future.add_done_callback(lambda _: self._inflight.pop(key, None))
+		return await future
+
+	async def _aprofile(self, jd_text: str) -> JDProfile:
+		return self._store_profile(jd_text, await self.aanalyze(jd_text))
+
+	def _store_profile(self, jd_text: str, analysis: dict) -> JDProfile:
+		profile = JDProfile.from_analysis(jd_text, analysis)
+		# Failed analyses are not persisted, and a reply that parsed but named nothing is dropped from the
+		# LLM cache (unparseable ones never reach it), so the next run gets another chance
+		if profile.skills or profile.keywords:
+			self.profile_store.put(profile)
+		else:
+			self._forget(self._inputs(jd_text))
+		return profile
+
+	def _parse(self, response_text: str) -> dict:
+		result, _ = self._parse_structured(response_text)
+		return result
+
+	async def _aparse(self, response_text: str) -> dict:
+		result, _ = await self._aparse_structured(response_text)
 		return result
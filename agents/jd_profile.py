@@ -0,0 +1,130 @@
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+
+
+def normalize_jd(jd_text: str) -> str:
+	return re.sub(r"\s+", " ", jd_text or "").strip().lower()
+
+
+def jd_hash(jd_text: str) -> str:
+	return hashlib.sha256(normalize_jd(jd_text).encode("utf-8")).hexdigest()
+
+
+def compile_term(term: str):
+	"""Case-insensitive whole-term matcher that also works for terms like 'C++' or '.NET'."""
+	return re.compile(r"(?<!\w)" + re.escape(term.strip()) + r"(?!\w)", re.I)
+
+
+class JDProfile:
+	"""Everything the agents need from a JD, computed once per normalized JD text.
+
+	``digest`` is the compact form sent to the builder and supervisor in place of the
+	raw JD, so prompts shrink by the size of the JD on every call.
+	"""
+
+	def __init__(self, jd_hash: str, skills: list, keywords: list, tone: str, digest: str):
+		self.jd_hash = jd_hash
+		self.skills = skills
+		self.keywords = keywords
+		self.tone = tone
+		self.digest = digest
+		self.skill_matchers = [(s, compile_term(s)) for s in skills if s.strip()]
+		self.keyword_matchers = [(k, compile_term(k)) for k in keywords if k.strip()]
+
+	@classmethod
+	def from_analysis(cls, jd_text: str, analysis: dict) -> "JDProfile":
+		skills = [str(s) for s in (analysis.get("skills") or [])]
+		keywords = [str(k) for k in (analysis.get("keywords") or [])]
+		tone = str(analysis.get("tone") or "")
+		return cls(jd_hash(jd_text), skills, keywords, tone, make_digest(jd_text, skills, keywords, tone))
+
+	@classmethod
+	def from_dict(cls, data: dict) -> "JDProfile":
+		return cls(data["jd_hash"], data["skills"], data["keywords"], data["tone"], data["digest"])
+
+	def to_dict(self) -> dict:
+		return {
+			"jd_hash": self.jd_hash,
+			"skills": self.skills,
+			"keywords": self.keywords,
+			"tone": self.tone,
+			"digest": self.digest,
+		}
+
+	def analysis(self) -> dict:
+		"""The JDAnalyzer-shaped view of this profile."""
+		return {"skills": self.skills, "tone": self.tone, "keywords": self.keywords}
+
+	def matched_skills(self, text: str) -> list:
+		return [s for s, m in self.skill_matchers if m.search(text or "")]
+
+	def matched_keywords(self, text: str) -> list:
+		return [k for k, m in self.keyword_matchers if m.search(text or "")]
+
+
+def make_digest(jd_text: str, skills: list, keywords: list, tone: str) -> str:
+	lines = [line.strip() for line in (jd_text or "").splitlines() if line.strip()]
+	if not skills and not keywords:
+		# Analysis came back empty; the normalized JD is the best we can do
+		return re.sub(r"\s+", " ", jd_text or "").strip()
+	digest = []
+	if lines:
+		digest.append("Role: " + lines[0][:160])
+	if skills:
+		digest.append("Key skills: " + ", ".join(skills))
+	if keywords:
+		digest.append("Keywords: " + ", ".join(keywords))
+	if tone:
+		digest.append("Tone: " + tone)
+	return "\n".join(digest)
+
+
+class JDProfileStore:
+	"""Persistent JD profiles keyed by normalized JD hash."""
+
+	def __init__(self, path: str = None):
+		self._memory = {}
+		self._lock = threading.Lock()
+		self._conn = None
+		if path:
+			os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+			self._conn = sqlite3.connect(path, check_same_thread=False)
+			self._conn.execute("CREATE TABLE IF NOT EXISTS jd_profiles (jd_hash TEXT PRIMARY KEY, data TEXT NOT NULL)")
+			self._conn.commit()
+
+	def get(self, key: str):
+		with self._lock:
+			profile = self._memory.get(key)
+			if profile is None and self._conn is not None:
+				row = self._conn.execute("SELECT data FROM jd_profiles WHERE jd_hash = ?", (key,)).fetchone()
+				if row is not None:
+					profile = JDProfile.from_dict(json.loads(row[0]))
+					self._memory[key] = profile
+			return profile
+
+	def put(self, profile: JDProfile):
+		with self._lock:
+			self._memory[profile.jd_hash] = profile
+			if self._conn is not None:
+				self._conn.execute(
+					"INSERT OR REPLACE INTO jd_profiles (jd_hash, data) VALUES (?, ?)",
+					(profile.jd_hash, json.dumps(profile.to_dict())),
+				)
+				self._conn.commit()
+
+
+_default_store = None
+_default_store_lock = threading.Lock()
+
+
+def get_default_profile_store() -> JDProfileStore:
+	global _default_store
+	with _default_store_lock:
+		if _default_store is None:
+			path = os.getenv("RESUME_JD_PROFILE_PATH", os.path.join(".cache", "jd_profiles.sqlite"))
+			_default_store = JDProfileStore(path)
+		return _default_store
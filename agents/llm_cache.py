@@ -0,0 +1,162 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+class LLMCache:
+	"""Two-tier cache for LLM responses: an in-memory LRU in front of a SQLite file.
+
+	Entries are keyed by a hash of the prompt template, the rendered inputs, the model
+	name and the temperature, so a repeated call with the same inputs costs no tokens.
+	"""
+
+	def __init__(self, path: str = None, max_memory_items: int = 256, max_disk_items: int = 10000,
+			ttl_seconds: float = 7 * 24 * 3600):
+		self.path = path
+		self.max_memory_items = max_memory_items
+		self.max_disk_items = max_disk_items
+		self.ttl_seconds = ttl_seconds
+		self._memory = OrderedDict()
+		self._lock = threading.Lock()
+		self._conn = None
+		self.hits = 0
+		self.misses = 0
+		self.memory_hits = 0
+		self.disk_hits = 0
+		if path:
+			directory = os.path.dirname(os.path.abspath(path))
+			os.makedirs(directory, exist_ok=True)
+			self._conn = sqlite3.connect(path, check_same_thread=False)
+			self._conn.execute(
+				"CREATE TABLE IF NOT EXISTS llm_cache ("
+				"key TEXT PRIMARY KEY, value TEXT NOT NULL, created REAL NOT NULL, accessed REAL NOT NULL)"
+			)
+			self._conn.execute("CREATE INDEX IF NOT EXISTS llm_cache_accessed ON llm_cache (accessed)")
+			self._conn.commit()
+
+	@staticmethod
+	def make_key(template: str, inputs: dict, model_name: str, temperature) -> str:
+		payload = json.dumps(
+			{"template": template, "inputs": inputs, "model": model_name, "temperature": temperature},
+			sort_keys=True,
+			default=str,
+		)
+		return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+	def _expired(self, created: float, now: float) -> bool:
+		return self.ttl_seconds is not None and now - created > self.ttl_seconds
+
+	def get(self, key: str):
+		now = time.time()
+		with self._lock:
+			entry = self._memory.get(key)
+			if entry is not None:
+				value, created = entry
+				if not self._expired(created, now):
+					self._memory.move_to_end(key)
+					self.hits += 1
+					self.memory_hits += 1
+					return value
+				del self._memory[key]
+			if self._conn is not None:
+				row = self._conn.execute("SELECT value, created FROM llm_cache WHERE key = ?", (key,)).fetchone()
+				if row is not None:
+					value, created = row
+					if not self._expired(created, now):
+						self._conn.execute("UPDATE llm_cache SET accessed = ? WHERE key = ?", (now, key))
+						self._conn.commit()
+						self._remember(key, value, created)
+						self.hits += 1
+						self.disk_hits += 1
+						return value
+					self._conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+					self._conn.commit()
+			self.misses += 1
+			return None
+
+	def set(self, key: str, value: str):
+		now = time.time()
+		with self._lock:
+			self._remember(key, value, now)
+			if self._conn is not None:
+				self._conn.execute(
+					"INSERT OR REPLACE INTO llm_cache (key, value, created, accessed) VALUES (?, ?, ?, ?)",
+					(key, value, now, now),
+				)
+				self._evict_disk(now)
+				self._conn.commit()
+
+	def delete(self, key: str):
+		with self._lock:
+			self._memory.pop(key, None)
+			if self._conn is not None:
+				self._conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+				self._conn.commit()
+
+	def _remember(self, key: str, value: str, created: float):
+		self._memory[key] = (value, created)
+		self._memory.move_to_end(key)
+		while len(self._memory) > self.max_memory_items:
+			self._memory.popitem(last=False)
+
+	def _evict_disk(self, now: float):
+		if self.ttl_seconds is not None:
+			self._conn.execute("DELETE FROM llm_cache WHERE created < ?", (now - self.ttl_seconds,))
+		count = self._conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+		if count > self.max_disk_items:
+			self._conn.execute(
+				"DELETE FROM llm_cache WHERE key IN (SELECT key FROM llm_cache ORDER BY accessed ASC LIMIT ?)",
+				(count - self.max_disk_items,),
+			)
+
+	def clear(self):
+		with self._lock:
+			self._memory.clear()
+			if self._conn is not None:
+				self._conn.execute("DELETE FROM llm_cache")
+				self._conn.commit()
+
+	def stats(self) -> dict:
+		with self._lock:
+			return {
+				"hits": self.hits,
+				"misses": self.misses,
+				"memory_hits": self.memory_hits,
+				"disk_hits": self.disk_hits,
+				"memory_items": len(self._memory),
+			}
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def get_default_cache():
+	"""Process-wide cache shared by all agents. Set RESUME_LLM_CACHE=0 to disable it."""
+	global _default_cache
+	if os.getenv("RESUME_LLM_CACHE", "1").lower() in ("0", "false", "off"):
+		return None
+	with _default_cache_lock:
+		if _default_cache is None:
+			path = os.getenv("RESUME_LLM_CACHE_PATH", os.path.join(".cache", "llm_cache.sqlite"))
+			_default_cache = LLMCache(path)
+		return _default_cache
+
+
+_default_section_memo = None
+
+
+def get_default_section_memo():
+	"""Process-wide per-section builder memo (see ResumeBuilder). Set RESUME_SECTION_MEMO=0 to disable it."""
+	global _default_section_memo
+	if os.getenv("RESUME_SECTION_MEMO", "1").lower() in ("0", "false", "off"):
+		return None
+	with _default_cache_lock:
+		if _default_section_memo is None:
+			path = os.getenv("RESUME_SECTION_MEMO_PATH", os.path.join(".cache", "section_memo.sqlite"))
+			_default_section_memo = LLMCache(path)
+		return _default_section_memo
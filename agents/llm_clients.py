@@ -0,0 +1,113 @@
+import asyncio
+import hashlib
+import os
+import threading
+
+from langchain_groq import ChatGroq
+
+# Connection pool sizing for the shared keep-alive HTTP clients
+MAX_CONNECTIONS = 100
+MAX_KEEPALIVE_CONNECTIONS = 20
+KEEPALIVE_EXPIRY = 120.0
+
+_clients = {}
+_groq_clients = {}
+_lock = threading.Lock()
+
+
+def _api_key_id(groq_api_key: str) -> str:
+	# never keep raw keys in registry keys
+	return hashlib.sha256((groq_api_key or "").encode("utf-8")).hexdigest()
+
+
+def _groq_clients_for(groq_api_key: str):
+	"""One sync and one async Groq client (each with a keep-alive pool) per API key."""
+	key = _api_key_id(groq_api_key)
+	clients = _groq_clients.get(key)
+	if clients is None:
+		import groq
+		import httpx
+		limits = httpx.Limits(
+			max_connections=MAX_CONNECTIONS,
+			max_keepalive_connections=MAX_KEEPALIVE_CONNECTIONS,
+			keepalive_expiry=KEEPALIVE_EXPIRY,
+		)
+		# GROQ_API_BASE points the clients at another endpoint (e.g. a local fake for load tests).
+		# Retries are left to the rate-limit scheduler so 429s are not retried blindly here.
+		base_url = os.getenv("GROQ_API_BASE") or None
+		clients = (
+			groq.Groq(api_key=groq_api_key, base_url=base_url, max_retries=0,
+				http_client=httpx.Client(limits=limits, timeout=60.0)),
+			groq.AsyncGroq(api_key=groq_api_key, base_url=base_url, max_retries=0,
+				http_client=httpx.AsyncClient(limits=limits, timeout=60.0)),
+		)
+		_groq_clients[key] = clients
+	return clients
+
+
+def get_llm(groq_api_key: str, model_name: str, **params) -> ChatGroq:
+	"""Shared ChatGroq for (api key, model, params), built on first use.
+
+	Every agent, flow and Streamlit session asking for the same combination gets the same
+	instance, so HTTP connections (and their TLS sessions) are reused across calls.
+	"""
+	key = (_api_key_id(groq_api_key), model_name, tuple(sorted(params.items())))
+	with _lock:
+		llm = _clients.get(key)
+		if llm is None:
+			sync_client, async_client = _groq_clients_for(groq_api_key)
+			llm = ChatGroq(
+				api_key=groq_api_key,
+				model_name=model_name,
+				client=sync_client.chat.completions,
+				async_client=async_client.chat.completions,
+				**params
+			)
+			_clients[key] = llm
+		return llm
+
+
+def _open_connection(sync_client):
+	try:
+		sync_client.models.list()
+	except Exception:
+		# warming is best-effort; the first real request will surface any auth/network problem
+		pass
+
+
+def prewarm(groq_api_key: str, model_names=("llama-3.1-8b-instant",), connect: bool = False):
+	"""Build the shared clients up front. With ``connect`` a daemon thread also opens a pooled connection,
+	so the first real call skips the TLS handshake without the caller waiting on the network."""
+	for model_name in model_names:
+		get_llm(groq_api_key, model_name)
+	if connect:
+		sync_client, _ = _groq_clients_for(groq_api_key)
+		threading.Thread(target=_open_connection, args=(sync_client,), name="groq-prewarm", daemon=True).start()
+
+
+async def _close_async(async_clients):
+	for async_client in async_clients:
+		try:
+			await async_client.close()
+		except Exception:
+			pass
+
+
+def clear_clients():
+	"""Drop every shared client and close their connection pools (sync and async)."""
+	with _lock:
+		async_clients = []
+		for sync_client, async_client in _groq_clients.values():
+			sync_client.close()
+			async_clients.append(async_client)
+		_clients.clear()
+		_groq_clients.clear()
+	if not async_clients:
+		return
+	try:
+		loop = asyncio.get_running_loop()
+	except RuntimeError:
+		asyncio.run(_close_async(async_clients))
+	else:
+		# called from inside a loop: close on it once the current step yields
+		loop.create_task(_close_async(async_clients))
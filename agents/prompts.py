@@ -0,0 +1,95 @@
+import functools
+import os
+import re
+
+from langchain_core.prompts import PromptTemplate
+
+from agents.scheduler import estimate_tokens
+
+# Opening shared by every agent prompt. Each prompt is laid out static-first: this prefix, the agent's
+# instructions, then the JD and finally the resume, so consecutive calls (every loop iteration, every
+# resume screened against one JD) repeat the longest possible prefix for provider-side prompt caching.
+SHARED_PREFIX = "Resume tailoring pipeline step. Reply with one JSON object only."
+
+# Paragraphs of a JD that describe the employer rather than the role
+_BOILERPLATE_HEADING = re.compile(
+	r"^\W*(benefits|perks|what we offer|why join us|why work with us|equal (employment )?opportunity|eeo"
+	r"|about (the company|us))\b[^a-z]*$",
+	re.I,
+)
+_BOILERPLATE_TEXT = re.compile(
+	r"equal opportunity employer|without regard to (race|age|sex|gender)|reasonable accommodation"
+	r"|e-verify|pay transparency|eeo statement",
+	re.I,
+)
+
+
+def compact(text: str) -> str:
+	"""Template or input text without indentation, repeated spaces, trailing spaces or blank-line runs."""
+	lines = [re.sub(r"[ \t]+", " ", line).strip() for line in (text or "").splitlines()]
+	return re.sub(r"\n{3,}", "\n\n", "\n".join(lines)).strip()
+
+
+def compact_resume(text: str) -> str:
+	"""Resume text with trailing spaces and blank-line runs removed; indentation is layout, so it stays."""
+	lines = [line.rstrip() for line in (text or "").splitlines()]
+	return re.sub(r"\n{3,}", "\n\n", "\n".join(lines)).strip("\n") + "\n"
+
+
+def _strip_boilerplate_line(line: str) -> str:
+	# bullets are one sentence; a prose line keeps every sentence without EEO language
+	if not _BOILERPLATE_TEXT.search(line):
+		return line
+	sentences = re.split(r"(?<=[.!?])\s+", line)
+	return " ".join(sentence for sentence in sentences if not _BOILERPLATE_TEXT.search(sentence))
+
+
+def strip_jd_boilerplate(jd_text: str) -> str:
+	"""JD without EEO statements and benefits/company blurbs, compacted.
+
+	A blank-line separated paragraph that opens with a heading such as "Benefits" or "Equal Opportunity"
+	is dropped whole. Elsewhere only the lines, or sentences of a prose line, with EEO language go, so a
+	requirements list keeps its other items. If that would leave nothing, the compacted JD is returned whole.
+	"""
+	kept = []
+	for paragraph in re.split(r"\n\s*\n", compact(jd_text)):
+		if _BOILERPLATE_HEADING.match(paragraph.split("\n", 1)[0]):
+			continue
+		lines = [_strip_boilerplate_line(line) for line in paragraph.split("\n")]
+		paragraph = "\n".join(line for line in lines if line)
+		if paragraph:
+			kept.append(paragraph)
+	return "\n\n".join(kept) if kept else compact(jd_text)
+
+
+def compile_prompt(instructions: str, inputs: list) -> PromptTemplate:
+	"""PromptTemplate of the shared prefix, the compacted ``instructions`` and then each ``(label, variable)``
+	of ``inputs`` in order; put the inputs that change least (the JD) first."""
+	blocks = [f"{label}:\n{{{variable}}}" for label, variable in inputs]
+	template = SHARED_PREFIX + "\n" + compact(instructions) + "\n\n" + "\n\n".join(blocks) + "\n"
+	return PromptTemplate(input_variables=[variable for _, variable in inputs], template=template)
+
+
+@functools.lru_cache(maxsize=1)
+def get_tokenizer():
+	"""Tokenizer from RESUME_TOKENIZER_PATH (a Hugging Face ``tokenizer.json`` for the served model), or None.
+
+	Needs the ``tokenizers`` package. Without it, or if the file cannot be loaded, token counts fall back to
+	the estimate; the result is cached, so a bad path is tried once, not on every call.
+	"""
+	path = os.getenv("RESUME_TOKENIZER_PATH")
+	if not path:
+		return None
+	try:
+		from tokenizers import Tokenizer
+		return Tokenizer.from_file(path)
+	except Exception:
+		return None
+
+
+def count_tokens(text: str) -> tuple:
+	"""(token count, True if exact). Exact counts cover the prompt text, not the chat template around it."""
+	tokenizer = get_tokenizer()
+	if tokenizer is None:
+		return estimate_tokens(text), False
+	return len(tokenizer.encode(text or "", add_special_tokens=False).ids), True
@@ -1,61 +1,274 @@
-from langchain_groq import ChatGroq
-from langchain_core.prompts import PromptTemplate
-
-class ResumeBuilder:
-	def __init__(self, groq_api_key: str, model_name: str = "llama-3.1-8b-instant"):
-		self.llm = ChatGroq(
-			api_key=groq_api_key,
-			model_name=model_name
-		)
+import asyncio
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from agents.base import BaseAgent
+from agents.llm_cache import LLMCache
+from agents.prompts import compact_resume, compile_prompt
+from agents.scheduler import estimate_tokens
+from agents.schemas import BUILD, SECTION_BUILD
+from utils.sections import canonical_section, parse_resume, strip_heading_echo
+
+class ResumeBuilder(BaseAgent):
+	schema = BUILD
+
+	def __init__(self, groq_api_key: str, model_name: str = "llama-3.1-8b-instant", cache: LLMCache = None,
+			section_memo: LLMCache = None):
+		super().__init__(groq_api_key, model_name, cache)
+		# Section responses by (section text, JD digest, model); lets re-runs skip unchanged sections
+		self.section_memo = section_memo
 		# Prompt asks the model to compare the JD and the resume, provide per-section feedback,
 		# make minimal edits preserving the resume's original format and ordering, and return JSON.
-		self.prompt = PromptTemplate(
-			input_variables=["resume_text", "jd_text"],
-			template=(
-				"""
-				You are a resume editor. Do NOT create a new resume format or change the resume layout.
-				You will be given the applicant's current resume text (which may be plain text extracted from a PDF/DOCX)
-				and the full job description text. Your tasks:
-				1) Compare the JD to the resume and for each resume section (Summary, Skills, Experience, Education, Other)
-				   provide concise feedback on how well that section matches the JD. For each section include:
-				   - match_score (0-5),
-				   - comments (short suggestions),
-				   - important_keywords_to_add (list)
-				2) Produce a minimally edited version of the resume that keeps the original format and ordering,
-				   only modifying or adding lines/phrases to better match the JD. Do not reformat, do not reorder sections,
-				   and do not invent sections.
-				3) Indicate whether another refinement is recommended with a boolean 'request_rebuild'.
-
-				Return a JSON object with keys: 'sections' (object by section name), 'revised_resume' (string),
-				and 'request_rebuild' (true/false). Example:
-				{
-				  "sections": {"Summary": {"match_score":4, "comments":"...", "important_keywords_to_add":[...]}, ...},
-				  "revised_resume": "...full resume text...",
-				  "request_rebuild": false
-				}
-				Only return the JSON (no extra commentary). Here are the inputs:\n\nResume:\n{resume_text}\n\nJob Description:\n{jd_text}\n"""
-			)
+		self.prompt = compile_prompt(
+			"""
+			You are a resume editor. Do NOT create a new resume format or change the resume layout.
+			You get a digest of the job description (role, key skills, keywords, tone) and the applicant's current
+			resume, which may be plain text extracted from a PDF/DOCX. Your tasks:
+			1) For each resume section (Summary, Skills, Experience, Education, Other) rate how well it matches the JD:
+			match_score (0-5), comments (short suggestions), important_keywords_to_add (list).
+			2) Minimally edit the resume to better match the JD, only modifying or adding lines/phrases. Keep the
+			original format and ordering: do not reformat, reorder or invent sections.
+			3) Say whether another refinement is recommended.
+			JSON keys: {{"sections": {{"<section>": {{"match_score", "comments", "important_keywords_to_add"}}}},
+			"revised_resume": "<full resume text>", "request_rebuild": true|false}}
+			""",
+			[("Job Description", "jd_text"), ("Resume", "resume_text")],
+		)
+		# Section mode: one small prompt per weak section instead of regenerating the whole resume.
+		self.section_prompt = compile_prompt(
+			"""
+			You are a resume editor. Make minimal edits to one section of an applicant's resume so it better
+			matches the job description digest. Keep its format, line structure and ordering, do not add a heading
+			and do not invent experience.
+			JSON keys: 'match_score' (0-5, for the revised section), 'comments' (short),
+			'important_keywords_to_add' (list), 'revised_section' (string).
+			""",
+			[("Job Description", "jd_text"), ("Section name", "section_name"), ("Section", "section_text")],
 		)
 
+	@staticmethod
+	def _inputs(resume_text: str, jd_text: str) -> dict:
+		return {"resume_text": compact_resume(resume_text), "jd_text": jd_text}
+
+	def _completion_estimate(self, inputs: dict) -> int:
+		# The builder echoes back the (revised) resume or section plus per-section feedback
+		return estimate_tokens(inputs.get("resume_text") or inputs.get("section_text")) + 300
+
 	def build(self, resume_text: str, jd_text: str) -> dict:
-		import json
-		chain = self.prompt | self.llm
-		response = chain.invoke({
-			"resume_text": resume_text,
-			"jd_text": jd_text
-		})
-		response_text = getattr(response, "content", response) if hasattr(response, "content") else response
-		# Try to parse JSON; allow for JSON embedded in text
-		try:
-			result = json.loads(response_text)
-		except Exception:
-			import re
-			match = re.search(r"{.*}\n?", response_text, re.DOTALL)
-			if match:
-				try:
-					result = json.loads(match.group(0))
-				except Exception:
-					result = {"sections": {}, "revised_resume": resume_text, "request_rebuild": False}
+		response_text = self._invoke(self._inputs(resume_text, jd_text))
+		return self._parse(response_text, resume_text)
+
+	async def abuild(self, resume_text: str, jd_text: str) -> dict:
+		response_text = await self._ainvoke(self._inputs(resume_text, jd_text))
+		return await self._aparse(response_text, resume_text)
+
+	def stream_build(self, resume_text: str, jd_text: str):
+		"""Like ``build`` but yields partial ``revised_resume`` text and per-section feedback as tokens
+		arrive (see IncrementalJSONParser), ending with ``{"type": "result", "result": <build result>}``."""
+		for event in self._stream_json(self._inputs(resume_text, jd_text)):
+			if event["type"] == "text":
+				yield {"type": "result", "result": self._parse(event["value"], resume_text)}
 			else:
-				result = {"sections": {}, "revised_resume": resume_text, "request_rebuild": False}
+				yield event
+
+	async def astream_build(self, resume_text: str, jd_text: str):
+		async for event in self._astream_json(self._inputs(resume_text, jd_text)):
+			if event["type"] == "text":
+				yield {"type": "result", "result": await self._aparse(event["value"], resume_text)}
+			else:
+				yield event
+
+	def _parse(self, response_text: str, resume_text: str) -> dict:
+		return self._build_result(*self._parse_structured(response_text), resume_text)
+
+	async def _aparse(self, response_text: str, resume_text: str) -> dict:
+		return self._build_result(*await self._aparse_structured(response_text), resume_text)
+
+	@staticmethod
+	def _build_result(result: dict, broken: list, resume_text: str) -> dict:
+		if "revised_resume" in broken:
+			# keep the current resume rather than losing it to a truncated response
+			result["revised_resume"] = resume_text
+			result["parse_error"] = True
 		return result
+
+	def build_sections(self, resume_text: str, jd_text: str, section_feedback: dict, threshold: float = 4.0) -> dict:
+		"""Rebuild only the sections whose previous match_score is below ``threshold``, in parallel,
+		and splice them back in their original order. Returns the same shape as ``build``."""
+		doc = parse_resume(resume_text)
+		weak = self._weak_sections(doc.sections, section_feedback, threshold)
+		return self._splice(doc, section_feedback, weak, self._section_responses(weak, jd_text), threshold)
+
+	async def abuild_sections(self, resume_text: str, jd_text: str, section_feedback: dict, threshold: float = 4.0) -> dict:
+		doc = parse_resume(resume_text)
+		weak = self._weak_sections(doc.sections, section_feedback, threshold)
+		responses = await asyncio.gather(*(self._asection_response(section, jd_text) for section in weak))
+		return self._splice(doc, section_feedback, weak, responses, threshold)
+
+	def build_incremental(self, resume_text: str, jd_text: str, threshold: float = 4.0) -> dict:
+		"""First pass built section by section, so a re-run after a small edit to the resume or JD only
+		re-requests the sections whose inputs changed; the rest come from the section memo.
+		Falls back to ``build`` for a resume without recognizable section headings."""
+		doc = parse_resume(resume_text)
+		targets = self._editable_sections(doc.sections)
+		if not targets:
+			return self.build(resume_text, jd_text)
+		return self._splice(doc, {}, targets, self._section_responses(targets, jd_text), threshold)
+
+	async def abuild_incremental(self, resume_text: str, jd_text: str, threshold: float = 4.0) -> dict:
+		doc = parse_resume(resume_text)
+		targets = self._editable_sections(doc.sections)
+		if not targets:
+			return await self.abuild(resume_text, jd_text)
+		responses = await asyncio.gather(*(self._asection_response(section, jd_text) for section in targets))
+		return self._splice(doc, {}, targets, responses, threshold)
+
+	def stream_sections(self, resume_text: str, jd_text: str, section_feedback: dict, threshold: float = 4.0):
+		"""Like ``build_sections`` but yields progress as each section completes (see ``_stream_splice``)."""
+		doc = parse_resume(resume_text)
+		weak = self._weak_sections(doc.sections, section_feedback, threshold)
+		yield from self._stream_splice(doc, section_feedback, weak, jd_text, threshold)
+
+	def stream_incremental(self, resume_text: str, jd_text: str, threshold: float = 4.0):
+		"""Like ``build_incremental`` but yields progress as each section completes (see ``_stream_splice``).
+		Falls back to ``stream_build`` for a resume without recognizable section headings."""
+		doc = parse_resume(resume_text)
+		targets = self._editable_sections(doc.sections)
+		if not targets:
+			yield from self.stream_build(resume_text, jd_text)
+			return
+		yield from self._stream_splice(doc, {}, targets, jd_text, threshold)
+
+	@staticmethod
+	def _editable_sections(sections: list) -> list:
+		# the header block (name, contact details) is never tailored
+		return [s for s in sections if s.name != "Header" and s.body.strip()]
+
+	def _memo_key(self, section, jd_text: str) -> str:
+		# whitespace-insensitive, so reflowed or re-extracted text still hits
+		inputs = {"section_name": section.name, "section_text": " ".join(section.body.split()), "jd_text": jd_text}
+		return LLMCache.make_key(self.section_prompt.template, inputs, self.llm.model_name, self.llm.temperature)
+
+	def _memo_lookup(self, section, jd_text: str):
+		"""(memo key, remembered response or None)."""
+		if self.section_memo is None:
+			return None, None
+		key = self._memo_key(section, jd_text)
+		return key, self.section_memo.get(key)
+
+	def _memo_store(self, key: str, response_text: str):
+		# only responses that carry a usable section are worth replaying
+		if key is not None and "revised_section" not in self._validate(response_text, SECTION_BUILD)[2]:
+			self.section_memo.set(key, response_text)
+
+	def _section_response(self, section, jd_text: str) -> tuple:
+		"""(response text, True if it came from the section memo)."""
+		key, remembered = self._memo_lookup(section, jd_text)
+		if remembered is not None:
+			return remembered, True
+		response_text = self._invoke(self._section_inputs(section, jd_text), self.section_prompt, SECTION_BUILD)
+		self._memo_store(key, response_text)
+		return response_text, False
+
+	async def _asection_response(self, section, jd_text: str) -> tuple:
+		key, remembered = self._memo_lookup(section, jd_text)
+		if remembered is not None:
+			return remembered, True
+		response_text = await self._ainvoke(self._section_inputs(section, jd_text), self.section_prompt, SECTION_BUILD)
+		self._memo_store(key, response_text)
+		return response_text, False
+
+	def _submit_sections(self, pool, sections: list, jd_text: str) -> list:
+		# copy the caller's context so each call keeps its scheduling priority and routed model
+		return [
+			pool.submit(contextvars.copy_context().run, self._section_response, section, jd_text)
+			for section in sections
+		]
+
+	def _section_responses(self, sections: list, jd_text: str) -> list:
+		if not sections:
+			return []
+		with ThreadPoolExecutor(max_workers=len(sections)) as pool:
+			return [future.result() for future in self._submit_sections(pool, sections, jd_text)]
+
+	def _stream_splice(self, doc, section_feedback: dict, sections: list, jd_text: str, threshold: float):
+		"""Request ``sections`` in parallel and, as each one completes, yield the same events a streamed full
+		build does: a ``member`` event with its feedback and a ``partial`` ``revised_resume`` with every
+		finished section spliced in. Ends with ``{"type": "result", "result": <build result>}``."""
+		parsed = [None] * len(sections)
+		responses = [None] * len(sections)
+		if sections:
+			with ThreadPoolExecutor(max_workers=len(sections)) as pool:
+				futures = self._submit_sections(pool, sections, jd_text)
+				index = {future: i for i, future in enumerate(futures)}
+				for future in as_completed(futures):
+					i = index[future]
+					responses[i] = future.result()
+					parsed[i] = self._section_result(sections[i], responses[i][0])
+					body, feedback = parsed[i]
+					if feedback:
+						yield {"type": "member", "key": "sections", "name": sections[i].name, "value": feedback}
+					bodies = {doc.sections.index(s): p[0] for s, p in zip(sections, parsed) if p and p[0] is not None}
+					partial = "".join(s.heading + bodies.get(j, s.body) for j, s in enumerate(doc.sections))
+					yield {"type": "partial", "key": "revised_resume", "value": partial}
+		yield {"type": "result", "result": self._spliced(doc, section_feedback, sections, responses, parsed, threshold)}
+
+	@staticmethod
+	def _section_score(feedback) -> float:
+		try:
+			return float(feedback.get("match_score"))
+		except (AttributeError, TypeError, ValueError):
+			return None
+
+	def _weak_sections(self, sections: list, section_feedback: dict, threshold: float) -> list:
+		scores = {}
+		for name, feedback in (section_feedback or {}).items():
+			score = self._section_score(feedback)
+			if score is not None:
+				scores[canonical_section(name)] = score
+		return [
+			s for s in sections
+			if s.body.strip() and s.name in scores and scores[s.name] < threshold
+		]
+
+	@staticmethod
+	def _section_inputs(section, jd_text: str) -> dict:
+		return {"section_name": section.name, "section_text": section.body.strip(), "jd_text": jd_text}
+
+	def _section_result(self, section, response_text: str) -> tuple:
+		"""(revised body or None, feedback) from one section response."""
+		# no repair here: an unusable section response just leaves that section as it was
+		result, how, _ = self._validate(response_text, SECTION_BUILD)
+		self._record_parse(how or "default")
+		revised = result.pop("revised_section", None)
+		if isinstance(revised, str):
+			revised = strip_heading_echo(section.name, revised)
+		if not (isinstance(revised, str) and revised.strip()):
+			return None, result
+		# keep the original trailing blank lines so the layout between sections is unchanged
+		trailing = section.body[len(section.body.rstrip()):]
+		return revised.strip("\n") + (trailing or "\n"), result
+
+	def _splice(self, doc, section_feedback: dict, weak: list, responses: list, threshold: float) -> dict:
+		parsed = [self._section_result(section, response_text) for section, (response_text, _) in zip(weak, responses)]
+		return self._spliced(doc, section_feedback, weak, responses, parsed, threshold)
+
+	def _spliced(self, doc, section_feedback: dict, weak: list, responses: list, parsed: list, threshold: float) -> dict:
+		feedback = dict(section_feedback or {})
+		keys = {canonical_section(name): name for name in feedback}
+		bodies = {}
+		for section, (body, result) in zip(weak, parsed):
+			if body is not None:
+				bodies[doc.sections.index(section)] = body
+			if result:
+				feedback[keys.get(section.name, section.name)] = result
+		# the next version shares every untouched section (and its tokens) with this one
+		revised_doc = doc.revise(bodies)
+		still_weak = self._weak_sections(revised_doc.sections, feedback, threshold)
+		return {
+			"sections": feedback,
+			"revised_resume": revised_doc.text,
+			"request_rebuild": bool(still_weak),
+			"rebuilt_sections": [s.name for s, (_, remembered) in zip(weak, responses) if not remembered],
+			"reused_sections": [s.name for s, (_, remembered) in zip(weak, responses) if remembered]
+		}
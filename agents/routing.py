@@ -0,0 +1,101 @@
+import contextlib
+import contextvars
+import os
+
+# USD per million (prompt, completion) tokens, used for the per-route cost profile. Adjust per deployment.
+MODEL_PRICES = {
+	"llama-3.1-8b-instant": (0.05, 0.08),
+	"llama-3.3-70b-versatile": (0.59, 0.79),
+	"llama3-8b-8192": (0.05, 0.08),
+	"llama3-70b-8192": (0.59, 0.79),
+	"gemma2-9b-it": (0.20, 0.20),
+}
+
+ROLES = ("analyzer", "builder", "supervisor")
+
+_routed_model = contextvars.ContextVar("routed_model", default=None)
+
+
+def routed_model():
+	"""Model chosen by the router for the agent call in progress, or None to use the agent's own."""
+	return _routed_model.get()
+
+
+@contextlib.contextmanager
+def use_model(model_name: str):
+	token = _routed_model.set(model_name)
+	try:
+		yield
+	finally:
+		_routed_model.reset(token)
+
+
+def call_cost(model_name: str, prompt_tokens: int, completion_tokens: int) -> float:
+	prompt_price, completion_price = MODEL_PRICES.get(model_name, (0.0, 0.0))
+	return (prompt_tokens * prompt_price + completion_tokens * completion_price) / 1e6
+
+
+class RoutingPolicy:
+	"""Which model each agent role uses at each escalation tier.
+
+	``routes`` maps a role (analyzer, builder, supervisor) to a model name or a list of models from
+	cheapest to strongest. A flow starts every role at tier 0 and moves up one tier when the loop
+	stalls (plateau) or a reply cannot be parsed; roles with fewer models stay on their last one.
+	"""
+
+	def __init__(self, routes: dict, escalate_on=("plateau", "parse_error")):
+		unknown = set(routes) - set(ROLES)
+		if unknown:
+			raise ValueError(f"Unknown routing roles: {', '.join(sorted(unknown))}")
+		self.routes = {role: [models] if isinstance(models, str) else list(models) for role, models in routes.items()}
+		self.escalate_on = tuple(escalate_on)
+		self.max_tier = max((len(models) - 1 for models in self.routes.values()), default=0)
+
+	@classmethod
+	def from_spec(cls, spec: str) -> "RoutingPolicy":
+		"""Parse ``builder=small>large,supervisor=small`` (``>`` separates escalation tiers)."""
+		routes = {}
+		for part in filter(None, (p.strip() for p in spec.split(","))):
+			role, _, models = part.partition("=")
+			routes[role.strip()] = [m.strip() for m in models.split(">") if m.strip()]
+		return cls(routes)
+
+	def model(self, role: str, tier: int = 0):
+		models = self.routes.get(role)
+		if not models:
+			return None
+		return models[min(tier, len(models) - 1)]
+
+
+class Cascade:
+	"""Escalation state of one flow run under a RoutingPolicy (or a no-op without one)."""
+
+	def __init__(self, policy: RoutingPolicy = None, tier: int = 0):
+		self.policy = policy
+		self.tier = tier
+		self.escalations = []
+
+	def use(self, role: str):
+		model_name = self.policy.model(role, self.tier) if self.policy is not None else None
+		return use_model(model_name) if model_name else contextlib.nullcontext()
+
+	def escalate(self, iteration: int, reason: str) -> bool:
+		"""Move to the next tier; False when there is no policy, the reason is not enabled or no tier is left."""
+		if self.policy is None or reason not in self.policy.escalate_on or self.tier >= self.policy.max_tier:
+			return False
+		self.tier += 1
+		self.escalations.append({"iteration": iteration, "reason": reason, "tier": self.tier})
+		return True
+
+	def stats(self) -> dict:
+		return {
+			"tier": self.tier,
+			"escalations": self.escalations,
+			"models": {role: self.policy.model(role, self.tier) for role in self.policy.routes},
+		}
+
+
+def get_default_policy():
+	"""RoutingPolicy from RESUME_ROUTES (see ``RoutingPolicy.from_spec``), or None."""
+	spec = os.getenv("RESUME_ROUTES")
+	return RoutingPolicy.from_spec(spec) if spec else None
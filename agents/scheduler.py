@@ -0,0 +1,314 @@
+import asyncio
+import contextlib
+import contextvars
+import heapq
+import itertools
+import os
+import random
+import threading
+import time
+
+# Priority classes: lower values are admitted first
+INTERACTIVE = 0
+BATCH = 10
+
+_priority = contextvars.ContextVar("llm_priority", default=INTERACTIVE)
+
+
+@contextlib.contextmanager
+def priority(level: int):
+	"""Run the enclosed agent calls (including tasks started inside) at ``level``."""
+	token = _priority.set(level)
+	try:
+		yield
+	finally:
+		_priority.reset(token)
+
+
+def set_priority(level: int):
+	"""Set the priority for the rest of the current context, e.g. one asyncio task."""
+	_priority.set(level)
+
+
+def current_priority() -> int:
+	return _priority.get()
+
+
+class Withdrawn(Exception):
+	"""Raised in a queued call whose owner no longer wants it (e.g. a hedge that lost the race)."""
+
+
+class Admission:
+	"""Links one call attempt to the scheduler: when it was admitted, and a way to withdraw it while it
+	is still queued so it never spends request or token budget. Set it with ``track_admission``."""
+
+	def __init__(self):
+		self.admitted_at = None
+		self.withdrawn = False
+
+	def admit(self):
+		self.admitted_at = time.monotonic()
+
+	def withdraw(self):
+		self.withdrawn = True
+
+
+_admission = contextvars.ContextVar("llm_admission", default=None)
+
+
+def track_admission(admission: Admission):
+	"""Report admissions of the calls made in the rest of the current context to ``admission``."""
+	_admission.set(admission)
+
+
+def estimate_tokens(text: str) -> int:
+	# ~4 characters per token for English prose; close enough for admission control
+	return max(1, len(text or "") // 4)
+
+
+def is_rate_limited(error: Exception) -> bool:
+	return getattr(error, "status_code", None) == 429 or type(error).__name__ == "RateLimitError"
+
+
+def retry_after(error: Exception):
+	response = getattr(error, "response", None)
+	headers = getattr(response, "headers", None) or {}
+	try:
+		return float(headers.get("retry-after"))
+	except (TypeError, ValueError):
+		return None
+
+
+class TokenBucket:
+	"""Refills ``capacity`` units per minute, scaled by ``scale`` when the server pushes back."""
+
+	def __init__(self, capacity_per_minute: float):
+		self.capacity = float(capacity_per_minute)
+		self.available = self.capacity
+		self.scale = 1.0
+		self._updated = time.monotonic()
+
+	def _refill(self, now: float):
+		rate = self.capacity * self.scale / 60.0
+		self.available = min(self.capacity, self.available + (now - self._updated) * rate)
+		self._updated = now
+
+	def wait_time(self, amount: float, now: float) -> float:
+		self._refill(now)
+		# a single request larger than the bucket waits for a full bucket rather than forever
+		amount = min(amount, self.capacity)
+		if self.available >= amount:
+			return 0.0
+		return (amount - self.available) / (self.capacity * self.scale / 60.0)
+
+	def consume(self, amount: float):
+		self.available -= min(amount, self.capacity)
+
+	def credit(self, amount: float):
+		self.available = min(self.capacity, self.available + amount)
+
+
+class RateLimitScheduler:
+	"""Process-wide admission control for LLM calls.
+
+	Each call is admitted against a requests-per-minute and a tokens-per-minute bucket, in
+	priority order (``INTERACTIVE`` before ``BATCH``). On HTTP 429 the scheduler pauses all
+	admissions for the server's ``retry-after`` (or a jittered exponential backoff), halves the
+	refill rate, and retries; successful calls slowly restore the rate.
+	"""
+
+	def __init__(self, requests_per_minute: float = 30, tokens_per_minute: float = 6000, max_retries: int = 4,
+			base_backoff: float = 1.0, max_backoff: float = 60.0):
+		self.requests = TokenBucket(requests_per_minute)
+		self.tokens = TokenBucket(tokens_per_minute)
+		self.max_retries = max_retries
+		self.base_backoff = base_backoff
+		self.max_backoff = max_backoff
+		self._cond = threading.Condition()
+		self._queue = []
+		self._seq = itertools.count()
+		self._blocked_until = 0.0
+		self.admitted = 0
+		self.rate_limited = 0
+		self.wait_seconds = 0.0
+
+	def _try_admit(self, ticket: tuple, tokens: int, now: float) -> float:
+		"""Admit ``ticket`` if it is first in line and the buckets allow; otherwise return seconds to wait."""
+		if self._queue[0] != ticket:
+			return 0.05
+		if now < self._blocked_until:
+			return self._blocked_until - now
+		wait = max(self.requests.wait_time(1, now), self.tokens.wait_time(tokens, now))
+		if wait > 0:
+			return wait
+		self.requests.consume(1)
+		self.tokens.consume(tokens)
+		heapq.heappop(self._queue)
+		self.admitted += 1
+		self._cond.notify_all()
+		return 0.0
+
+	def _enqueue(self, level) -> tuple:
+		ticket = (current_priority() if level is None else level, next(self._seq))
+		heapq.heappush(self._queue, ticket)
+		return ticket
+
+	def _abandon(self, ticket: tuple):
+		if ticket in self._queue:
+			self._queue.remove(ticket)
+			heapq.heapify(self._queue)
+			self._cond.notify_all()
+
+	def queued(self) -> bool:
+		"""True while callers are waiting for admission."""
+		with self._cond:
+			return bool(self._queue)
+
+	def acquire(self, tokens: int, level: int = None):
+		start = time.monotonic()
+		admission = _admission.get()
+		with self._cond:
+			ticket = self._enqueue(level)
+			try:
+				while True:
+					if admission is not None and admission.withdrawn:
+						raise Withdrawn("call withdrawn while queued")
+					wait = self._try_admit(ticket, tokens, time.monotonic())
+					if wait <= 0:
+						break
+					self._cond.wait(min(wait, 0.25))
+			except BaseException:
+				self._abandon(ticket)
+				raise
+			self.wait_seconds += time.monotonic() - start
+		if admission is not None:
+			admission.admit()
+
+	async def aacquire(self, tokens: int, level: int = None):
+		start = time.monotonic()
+		admission = _admission.get()
+		with self._cond:
+			ticket = self._enqueue(level)
+		try:
+			while True:
+				with self._cond:
+					wait = self._try_admit(ticket, tokens, time.monotonic())
+				if wait <= 0:
+					break
+				await asyncio.sleep(min(wait, 0.25))
+		except BaseException:
+			with self._cond:
+				self._abandon(ticket)
+			raise
+		with self._cond:
+			self.wait_seconds += time.monotonic() - start
+		if admission is not None:
+			admission.admit()
+
+	def _on_success(self, estimated: int, response=None):
+		usage = (getattr(response, "response_metadata", None) or {}).get("token_usage") or {}
+		with self._cond:
+			actual = usage.get("total_tokens")
+			if actual is not None:
+				# settle the estimate against what the server actually counted
+				self.tokens.credit(estimated - actual)
+			for bucket in (self.requests, self.tokens):
+				bucket.scale = min(1.0, bucket.scale + 0.05)
+
+	def _on_rate_limited(self, error: Exception, attempt: int):
+		delay = retry_after(error)
+		if delay is None:
+			delay = min(self.max_backoff, self.base_backoff * 2 ** attempt) * (0.5 + random.random())
+		with self._cond:
+			self.rate_limited += 1
+			self._blocked_until = max(self._blocked_until, time.monotonic() + delay)
+			for bucket in (self.requests, self.tokens):
+				bucket.scale = max(0.1, bucket.scale * 0.5)
+
+	def call(self, fn, tokens: int, level: int = None):
+		for attempt in range(self.max_retries + 1):
+			self.acquire(tokens, level)
+			try:
+				response = fn()
+			except Exception as e:
+				if not is_rate_limited(e) or attempt == self.max_retries:
+					raise
+				self._on_rate_limited(e, attempt)
+				continue
+			self._on_success(tokens, response)
+			return response
+
+	async def acall(self, coro_fn, tokens: int, level: int = None):
+		for attempt in range(self.max_retries + 1):
+			await self.aacquire(tokens, level)
+			try:
+				response = await coro_fn()
+			except Exception as e:
+				if not is_rate_limited(e) or attempt == self.max_retries:
+					raise
+				self._on_rate_limited(e, attempt)
+				continue
+			self._on_success(tokens, response)
+			return response
+
+	def stream(self, make_iter, tokens: int, level: int = None):
+		"""Admit a streaming call; a 429 is retried only if no chunk has been yielded yet."""
+		for attempt in range(self.max_retries + 1):
+			self.acquire(tokens, level)
+			started = False
+			try:
+				for item in make_iter():
+					started = True
+					yield item
+			except Exception as e:
+				if started or not is_rate_limited(e) or attempt == self.max_retries:
+					raise
+				self._on_rate_limited(e, attempt)
+				continue
+			self._on_success(tokens)
+			return
+
+	async def astream(self, make_iter, tokens: int, level: int = None):
+		for attempt in range(self.max_retries + 1):
+			await self.aacquire(tokens, level)
+			started = False
+			try:
+				async for item in make_iter():
+					started = True
+					yield item
+			except Exception as e:
+				if started or not is_rate_limited(e) or attempt == self.max_retries:
+					raise
+				self._on_rate_limited(e, attempt)
+				continue
+			self._on_success(tokens)
+			return
+
+	def stats(self) -> dict:
+		with self._cond:
+			return {
+				"admitted": self.admitted,
+				"rate_limited": self.rate_limited,
+				"wait_seconds": round(self.wait_seconds, 3),
+				"queued": len(self._queue),
+				"rate_scale": self.tokens.scale,
+			}
+
+
+_default_scheduler = None
+_default_scheduler_lock = threading.Lock()
+
+
+def get_scheduler():
+	"""The scheduler shared by every agent in the process. Limits come from GROQ_RPM / GROQ_TPM;
+	set RESUME_RATE_LIMIT=0 to disable admission control."""
+	global _default_scheduler
+	if os.getenv("RESUME_RATE_LIMIT", "1").lower() in ("0", "false", "off"):
+		return None
+	with _default_scheduler_lock:
+		if _default_scheduler is None:
+			_default_scheduler = RateLimitScheduler(
+				requests_per_minute=float(os.getenv("GROQ_RPM", "30")),
+				tokens_per_minute=float(os.getenv("GROQ_TPM", "6000")),
+			)
+		return _default_scheduler
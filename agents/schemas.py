@@ -0,0 +1,99 @@
+from collections import namedtuple
+
+from langchain_core.prompts import PromptTemplate
+
+from agents.prompts import compact
+
+# One expected key of an agent's JSON response. Fields marked ``repair`` are re-requested on their own
+# when missing or invalid; the rest fall back to ``default``.
+Field = namedtuple("Field", ["type", "default", "description", "repair"])
+
+TYPE_NAMES = {list: "array", dict: "object", str: "string", bool: "boolean", float: "number"}
+
+JD_ANALYSIS = {
+	"skills": Field(list, [], "key skills required", True),
+	"tone": Field(str, "", "overall tone of the JD", True),
+	"keywords": Field(list, [], "important keywords", True),
+}
+
+EVALUATION = {
+	"effectiveness": Field(str, "not effective", "'effective' or 'not effective'", True),
+	"feedback": Field(str, "", "short actionable feedback", True),
+	"request_rebuild": Field(bool, True, "whether another rebuild is needed", True),
+	"section_scores": Field(dict, {}, "resume section -> score (0-5) and comment", False),
+}
+
+# The revised resume is never repaired: re-emitting it costs as much as the original build.
+BUILD = {
+	"sections": Field(dict, {}, "per-section feedback", False),
+	"revised_resume": Field(str, None, "the revised resume", False),
+	"request_rebuild": Field(bool, False, "whether another refinement is recommended", True),
+}
+
+SECTION_BUILD = {
+	"match_score": Field(float, None, "score 0-5 of the revised section", False),
+	"comments": Field(str, "", "short comments", False),
+	"important_keywords_to_add": Field(list, [], "keywords to add", False),
+	"revised_section": Field(str, None, "the revised section", False),
+}
+
+REPAIR_PROMPT = PromptTemplate(
+	input_variables=["fields", "response_text"],
+	template=compact(
+		"""
+		The response below should have been a JSON object, but some fields are missing or invalid.
+		Using only the information in the response, return a JSON object with exactly these keys:
+		{fields}
+		Only return the JSON.
+		"""
+	) + "\n\nResponse:\n{response_text}\n"
+)
+
+# Cap on the broken response echoed back in a repair request
+MAX_REPAIR_CHARS = 6000
+
+
+def _coerce(value, field: Field):
+	"""``value`` converted to the field's type, or None if it does not fit."""
+	if field.type is bool:
+		if isinstance(value, bool):
+			return value
+		if isinstance(value, str) and value.strip().lower() in ("true", "false"):
+			return value.strip().lower() == "true"
+		return None
+	if field.type is float:
+		if isinstance(value, bool):
+			return None
+		try:
+			return float(value)
+		except (TypeError, ValueError):
+			return None
+	if field.type is str and isinstance(value, str):
+		return value if value.strip() or field.default is not None else None
+	return value if isinstance(value, field.type) else None
+
+
+def validate(data: dict, schema: dict) -> tuple:
+	"""(result, broken field names). Keys outside the schema are kept; broken fields are left out."""
+	result = dict(data or {})
+	broken = []
+	for name, field in schema.items():
+		value = _coerce(result.get(name), field) if name in result else None
+		if value is None:
+			result.pop(name, None)
+			broken.append(name)
+		else:
+			result[name] = value
+	return result, broken
+
+
+def repair_inputs(schema: dict, fields: list, response_text: str) -> dict:
+	spec = "\n".join(f"- {name} ({TYPE_NAMES[schema[name].type]}): {schema[name].description}" for name in fields)
+	return {"fields": spec, "response_text": response_text[-MAX_REPAIR_CHARS:]}
+
+
+def fill_defaults(result: dict, schema: dict, broken: list) -> dict:
+	for name in broken:
+		default = schema[name].default
+		result[name] = type(default)(default) if isinstance(default, (list, dict)) else default
+	return result
@@ -1,45 +1,64 @@
-from langchain_groq import ChatGroq
-from langchain_core.prompts import PromptTemplate
-
-class Supervisor:
-	def __init__(self, groq_api_key: str, model_name: str = "llama-3.1-8b-instant"):
-		self.llm = ChatGroq(
-			api_key=groq_api_key,
-			model_name=model_name
-		)
-		self.prompt = PromptTemplate(
-			input_variables=["resume_text", "jd_text"],
-			template=(
-				"""
-				You are an expert resume evaluator. You will be given a candidate's resume text and a full job description.
-				Compare the resume against the JD and provide a concise evaluation. Return JSON with keys:
-				- effectiveness: 'effective' or 'not effective'
-				- feedback: short actionable feedback
-				- request_rebuild: true/false
-				- section_scores: an object mapping resume sections to scores (0-5) and short comments.
-				Only return valid JSON.
-				Resume:\n{resume_text}\n\nJob Description:\n{jd_text}\n"""
-			)
+from agents.base import BaseAgent
+from agents.llm_cache import LLMCache
+from agents.prompts import compact_resume, compile_prompt
+from agents.schemas import EVALUATION
+
+class Supervisor(BaseAgent):
+	schema = EVALUATION
+	repair_saves_loop = True
+
+	def __init__(self, groq_api_key: str, model_name: str = "llama-3.1-8b-instant", cache: LLMCache = None):
+		super().__init__(groq_api_key, model_name, cache)
+		self.prompt = compile_prompt(
+			"""
+			You are an expert resume evaluator. Compare the candidate's resume against the job description digest
+			and give a concise evaluation. JSON keys:
+			- effectiveness: 'effective' or 'not effective'
+			- feedback: short actionable feedback
+			- request_rebuild: true/false
+			- section_scores: resume section -> score (0-5) and a short comment
+			""",
+			[("Job Description", "jd_text"), ("Resume", "resume_text")],
 		)
 
 	def evaluate(self, resume_text: str, jd_text: str) -> dict:
-		import json
-		chain = self.prompt | self.llm
-		response = chain.invoke({
-			"resume_text": resume_text,
-			"jd_text": jd_text
-		})
-		response_text = getattr(response, "content", response) if hasattr(response, "content") else response
-		try:
-			result = json.loads(response_text)
-		except Exception:
-			import re
-			match = re.search(r"{.*}", response_text, re.DOTALL)
-			if match:
-				try:
-					result = json.loads(match.group(0))
-				except Exception:
-					result = {"effectiveness": "not effective", "feedback": "Could not parse response.", "request_rebuild": True, "section_scores": {}}
+		response_text = self._invoke(self._inputs(resume_text, jd_text))
+		return self._parse(response_text)
+
+	async def aevaluate(self, resume_text: str, jd_text: str) -> dict:
+		response_text = await self._ainvoke(self._inputs(resume_text, jd_text))
+		return await self._aparse(response_text)
+
+	def stream_evaluate(self, resume_text: str, jd_text: str):
+		"""Like ``evaluate`` but yields partial feedback and per-section scores as tokens arrive,
+		ending with ``{"type": "result", "result": <evaluation>}``."""
+		for event in self._stream_json(self._inputs(resume_text, jd_text)):
+			if event["type"] == "text":
+				yield {"type": "result", "result": self._parse(event["value"])}
 			else:
-				result = {"effectiveness": "not effective", "feedback": "No valid response.", "request_rebuild": True, "section_scores": {}}
+				yield event
+
+	async def astream_evaluate(self, resume_text: str, jd_text: str):
+		async for event in self._astream_json(self._inputs(resume_text, jd_text)):
+			if event["type"] == "text":
+				yield {"type": "result", "result": await self._aparse(event["value"])}
+			else:
+				yield event
+
+	@staticmethod
+	def _inputs(resume_text: str, jd_text: str) -> dict:
+		return {"resume_text": compact_resume(resume_text), "jd_text": jd_text}
+
+	def _parse(self, response_text: str) -> dict:
+		return self._evaluation(*self._parse_structured(response_text))
+
+	async def _aparse(self, response_text: str) -> dict:
+		return self._evaluation(*await self._aparse_structured(response_text))
+
+	@staticmethod
+	def _evaluation(result: dict, broken: list) -> dict:
+		# Without a verdict the defaults ask for a rebuild; flag it so the flow can stop instead
+		if "effectiveness" in broken or "request_rebuild" in broken:
+			result["parse_error"] = True
+			result["feedback"] = result["feedback"] or "Could not parse response."
 		return result
@@ -0,0 +1,72 @@
+import os
+import random
+
+SKILLS = [
+	"Python", "Pandas", "NumPy", "Scikit-learn", "PyTorch", "TensorFlow", "SQL", "PostgreSQL", "AWS", "GCP",
+	"Azure", "Docker", "Kubernetes", "Terraform", "Spark", "Airflow", "Kafka", "React", "TypeScript", "Java",
+	"Go", "Rust", "Git", "CI/CD", "REST", "GraphQL", "Linux", "Tableau", "Excel", "Communication",
+]
+ROLES = ["Data Scientist", "Machine Learning Engineer", "Backend Engineer", "Data Engineer", "Platform Engineer"]
+VERBS = ["Built", "Designed", "Led", "Optimized", "Migrated", "Automated", "Shipped", "Scaled", "Maintained"]
+THINGS = ["data pipelines", "ML models", "REST services", "dashboards", "batch jobs", "feature stores", "APIs"]
+
+# Number of jobs in the Experience section per corpus size
+SIZES = {"small": 2, "medium": 8, "large": 80}
+
+
+def make_jd(seed: int = 0) -> str:
+	rng = random.Random(seed)
+	role = rng.choice(ROLES)
+	skills = rng.sample(SKILLS, 8)
+	return "\n".join([
+		f"{role}",
+		f"We are hiring a {role} to join a fast-moving product team.",
+		"Requirements:",
+		*[f"- Experience with {s}" for s in skills],
+		"Nice to have: strong communication and ownership.",
+		"We are an equal opportunity employer. Benefits include health insurance and a learning budget.",
+	])
+
+
+def make_resume(seed: int = 0, size: str = "small") -> str:
+	rng = random.Random(seed)
+	lines = [
+		f"Candidate {seed}",
+		f"candidate{seed}@example.com | +1 555 {seed % 10000:04d}",
+		"",
+		"Summary",
+		f"{rng.choice(ROLES)} with {rng.randint(2, 15)} years of experience delivering {rng.choice(THINGS)}.",
+		"",
+		"Skills",
+		", ".join(rng.sample(SKILLS, 10)),
+		"",
+		"Experience",
+	]
+	for job in range(SIZES[size]):
+		lines.append(f"{rng.choice(ROLES)} - Company {rng.randint(1, 999)} ({2024 - job * 2}-{2026 - job * 2})")
+		for _ in range(4):
+			lines.append(f"- {rng.choice(VERBS)} {rng.choice(THINGS)} using {rng.choice(SKILLS)} and {rng.choice(SKILLS)}.")
+	lines += ["", "Education", f"BSc Computer Science, University {rng.randint(1, 99)}"]
+	return "\n".join(lines) + "\n"
+
+
+def write_resume_files(directory: str, count: int, size: str = "small", formats=("pdf", "docx", "txt"), seed: int = 0) -> list:
+	"""Write ``count`` synthetic resumes per format to ``directory`` and return their paths."""
+	from utils.export import create_docx, create_pdf
+
+	os.makedirs(directory, exist_ok=True)
+	paths = []
+	for i in range(count):
+		text = make_resume(seed + i, size)
+		for fmt in formats:
+			path = os.path.join(directory, f"resume_{size}_{seed + i}.{fmt}")
+			if fmt == "pdf":
+				data = create_pdf(text).getvalue()
+			elif fmt == "docx":
+				data = create_docx(text).getvalue()
+			else:
+				data = text.encode("utf-8")
+			with open(path, "wb") as f:
+				f.write(data)
+			paths.append(path)
+	return paths
@@ -0,0 +1,154 @@
+"""Local stand-in for the Groq HTTP API, for load-testing the real clients without spending tokens.
+
+	python -m bench.fake_groq --port 8099 --rpm 30 --tpm 6000
+	GROQ_API_BASE=http://127.0.0.1:8099 GROQ_API_KEY=x streamlit run ui/app.py
+
+Serves ``/openai/v1/chat/completions`` (plain and streamed) and ``/openai/v1/models``. Replies come from
+FakeChatModel, so the agents parse them as usual. Requests and tokens are limited per minute with the
+same token-bucket semantics Groq documents; a request over either budget gets HTTP 429 with ``retry-after``.
+"""
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from agents.scheduler import TokenBucket, estimate_tokens
+from bench.fake_llm import FakeChatModel, _chunks
+
+
+class FakeGroqServer(ThreadingHTTPServer):
+	"""Threaded HTTP server with per-minute request and token budgets and counters for every outcome."""
+
+	daemon_threads = True
+
+	def __init__(self, port: int = 0, rpm: float = 30, tpm: float = 6000, latency: float = 0.05,
+			model: FakeChatModel = None):
+		super().__init__(("127.0.0.1", port), _Handler)
+		self.requests = TokenBucket(rpm)
+		self.tokens = TokenBucket(tpm)
+		self.latency = latency
+		self.model = model or FakeChatModel(latency=0.0)
+		self.lock = threading.Lock()
+		self.counts = {"requests": 0, "completed": 0, "rate_limited": 0, "prompt_tokens": 0, "completion_tokens": 0}
+
+	@property
+	def base_url(self) -> str:
+		return f"http://127.0.0.1:{self.server_address[1]}"
+
+	def start(self):
+		threading.Thread(target=self.serve_forever, name="fake-groq", daemon=True).start()
+		return self
+
+	def admit(self, prompt_tokens: int):
+		"""None if the request fits both budgets (and charge it), else seconds until it would."""
+		with self.lock:
+			self.counts["requests"] += 1
+			now = time.monotonic()
+			wait = max(self.requests.wait_time(1, now), self.tokens.wait_time(prompt_tokens, now))
+			if wait > 0:
+				self.counts["rate_limited"] += 1
+				return wait
+			self.requests.consume(1)
+			self.tokens.consume(prompt_tokens)
+			self.counts["prompt_tokens"] += prompt_tokens
+			return None
+
+	def complete(self, completion_tokens: int):
+		with self.lock:
+			self.tokens.consume(completion_tokens)
+			self.counts["completed"] += 1
+			self.counts["completion_tokens"] += completion_tokens
+
+	def stats(self) -> dict:
+		with self.lock:
+			return dict(self.counts)
+
+
+class _Handler(BaseHTTPRequestHandler):
+	protocol_version = "HTTP/1.1"
+
+	def log_message(self, format, *args):
+		pass
+
+	def _send_json(self, status: int, body: dict, headers: dict = None):
+		data = json.dumps(body).encode("utf-8")
+		self.send_response(status)
+		self.send_header("Content-Type", "application/json")
+		self.send_header("Content-Length", str(len(data)))
+		for name, value in (headers or {}).items():
+			self.send_header(name, value)
+		self.end_headers()
+		self.wfile.write(data)
+
+	def do_GET(self):
+		if self.path.rstrip("/").endswith("/models"):
+			self._send_json(200, {"object": "list", "data": [{"id": "llama-3.1-8b-instant", "object": "model"}]})
+		else:
+			self._send_json(404, {"error": {"message": "not found"}})
+
+	def do_POST(self):
+		body = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)) or b"{}")
+		if not self.path.endswith("/chat/completions"):
+			self._send_json(404, {"error": {"message": "not found"}})
+			return
+		server = self.server
+		prompt = "\n".join(str(m.get("content", "")) for m in body.get("messages", []))
+		prompt_tokens = estimate_tokens(prompt)
+		wait = server.admit(prompt_tokens)
+		if wait is not None:
+			self._send_json(429, {"error": {"message": "Rate limit reached", "type": "tokens", "code": "rate_limit_exceeded"}},
+				{"retry-after": f"{wait:.3f}"})
+			return
+		text = server.model._respond(prompt, server.stats()["requests"])
+		completion_tokens = estimate_tokens(text)
+		time.sleep(server.latency)
+		server.complete(completion_tokens)
+		usage = {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+			"total_tokens": prompt_tokens + completion_tokens}
+		model = body.get("model", "fake")
+		if body.get("stream"):
+			self._stream(model, text, usage)
+			return
+		self._send_json(200, {
+			"id": "chatcmpl-fake", "object": "chat.completion", "created": int(time.time()), "model": model,
+			"choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}],
+			"usage": usage,
+		})
+
+	def _stream(self, model: str, text: str, usage: dict):
+		self.send_response(200)
+		self.send_header("Content-Type", "text/event-stream")
+		self.send_header("Connection", "close")
+		self.end_headers()
+		chunks = _chunks(text) + [None]
+		for chunk in chunks:
+			delta = {"content": chunk} if chunk is not None else {}
+			event = {
+				"id": "chatcmpl-fake", "object": "chat.completion.chunk", "created": int(time.time()), "model": model,
+				"choices": [{"index": 0, "delta": delta, "finish_reason": None if chunk is not None else "stop"}],
+			}
+			if chunk is None:
+				event["x_groq"] = {"usage": usage}
+			self.wfile.write(f"data: {json.dumps(event)}\n\n".encode("utf-8"))
+		self.wfile.write(b"data: [DONE]\n\n")
+		self.close_connection = True
+
+
+def main(argv=None):
+	parser = argparse.ArgumentParser(description="Local fake Groq endpoint with per-minute rate limits")
+	parser.add_argument("--port", type=int, default=8099)
+	parser.add_argument("--rpm", type=float, default=30)
+	parser.add_argument("--tpm", type=float, default=6000)
+	parser.add_argument("--latency", type=float, default=0.05)
+	args = parser.parse_args(argv)
+	server = FakeGroqServer(args.port, args.rpm, args.tpm, args.latency)
+	print(f"Fake Groq endpoint on {server.base_url}", flush=True)
+	try:
+		server.serve_forever()
+	except KeyboardInterrupt:
+		pass
+
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,140 @@
+import asyncio
+import hashlib
+import json
+import re
+import time
+from typing import List, Optional
+
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+# Marker the fake builder appends; a resume that already has it is treated as tailored
+TAILORED_MARKER = "Tailored for:"
+
+
+class FakeChatModel(BaseChatModel):
+	"""Deterministic stand-in for ChatGroq with configurable latency, token rate and output quality.
+
+	Responses are derived from the prompt (JD analysis, full build, section build or evaluation),
+	so the real agents and flow run unchanged. ``malformed_rate`` of responses are truncated,
+	unparseable JSON; which ones is fixed by ``seed``. ``responses``, if given, are returned in order
+	instead.
+	"""
+
+	model_name: str = "fake-llm"
+	temperature: float = 0.0
+	latency: float = 0.05
+	tokens_per_second: float = 2000.0
+	malformed_rate: float = 0.0
+	seed: int = 0
+	responses: Optional[List[str]] = None
+	calls: int = 0
+
+	@property
+	def _llm_type(self) -> str:
+		return "fake-chat"
+
+	def _prompt(self, messages) -> str:
+		return "\n".join(str(m.content) for m in messages)
+
+	def _next(self, messages):
+		self.calls += 1
+		if self.responses:
+			text = self.responses[(self.calls - 1) % len(self.responses)]
+		else:
+			text = self._respond(self._prompt(messages), self.calls)
+		tokens = max(1, len(text) // 4)
+		usage = {"prompt_tokens": len(self._prompt(messages)) // 4, "completion_tokens": tokens}
+		usage["total_tokens"] = usage["prompt_tokens"] + tokens
+		return text, tokens / self.tokens_per_second, usage
+
+	def _roll(self, prompt: str, call: int) -> float:
+		digest = hashlib.sha256(f"{self.seed}:{call}:{prompt}".encode("utf-8")).digest()
+		return int.from_bytes(digest[:8], "big") / 2 ** 64
+
+	def _respond(self, prompt: str, call: int) -> str:
+		if "some fields are missing or invalid" in prompt:
+			# repair request: answer each requested field with a plain value of its type
+			values = {"array": [], "object": {}, "string": "not effective", "boolean": True, "number": 0}
+			return json.dumps({name: values[kind] for name, kind in re.findall(r"^\s*- (\w+) \((\w+)\):", prompt, re.M)})
+		if self.malformed_rate and self._roll(prompt, call) < self.malformed_rate:
+			return 'Sure! Here is the result:\n{"sections": {"Summary": {"match_score": 3, "comments": "trunc'
+		if "Analyze the following job description" in prompt:
+			words = sorted(set(re.findall(r"[A-Z][A-Za-z+#]{2,}", prompt)))[:8]
+			return json.dumps({"skills": words[:5], "tone": "formal", "keywords": words[5:]})
+		if "revised_section" in prompt:
+			section = _between(prompt, "Section:\n", "\n\nJob Description:")
+			return json.dumps({"match_score": 4.5, "comments": "Tightened wording.", "important_keywords_to_add": [],
+				"revised_section": section + " (aligned with the role)"})
+		if "You are a resume editor" in prompt:
+			resume = _between(prompt, "Resume:\n", "\n\nJob Description:")
+			tailored = TAILORED_MARKER in resume
+			revised = resume if tailored else resume.rstrip("\n") + "\n" + TAILORED_MARKER + " the target role\n"
+			score = 4.5 if tailored else 3.0
+			return json.dumps({
+				"sections": {name: {"match_score": score, "comments": "ok", "important_keywords_to_add": []}
+					for name in ("Summary", "Skills", "Experience", "Education")},
+				"revised_resume": revised,
+				"request_rebuild": not tailored,
+			})
+		resume = _between(prompt, "Resume:\n", "\n\nJob Description:")
+		tailored = TAILORED_MARKER in resume
+		return json.dumps({
+			"effectiveness": "effective" if tailored else "not effective",
+			"feedback": "Looks aligned." if tailored else "Add role-specific keywords.",
+			"request_rebuild": not tailored,
+			"section_scores": {},
+		})
+
+	def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+		text, duration, usage = self._next(messages)
+		time.sleep(self.latency + duration)
+		return _result(text, usage)
+
+	async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+		text, duration, usage = self._next(messages)
+		await asyncio.sleep(self.latency + duration)
+		return _result(text, usage)
+
+	def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+		text, duration, usage = self._next(messages)
+		time.sleep(self.latency)
+		chunks = _chunks(text)
+		for chunk in chunks:
+			time.sleep(duration / len(chunks))
+			yield ChatGenerationChunk(message=AIMessageChunk(content=chunk))
+
+	async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+		text, duration, usage = self._next(messages)
+		await asyncio.sleep(self.latency)
+		chunks = _chunks(text)
+		for chunk in chunks:
+			await asyncio.sleep(duration / len(chunks))
+			yield ChatGenerationChunk(message=AIMessageChunk(content=chunk))
+
+
+def _between(text: str, start: str, end: str) -> str:
+	i = text.find(start)
+	if i == -1:
+		return ""
+	i += len(start)
+	j = text.find(end, i)
+	# the last input block runs to the end of the prompt, which ends with a newline
+	return text[i:j] if j != -1 else text[i:].rstrip("\n")
+
+
+def _chunks(text: str, size: int = 16) -> list:
+	return [text[i:i + size] for i in range(0, len(text), size)] or [""]
+
+
+def _result(text: str, usage: dict) -> ChatResult:
+	message = AIMessage(content=text, response_metadata={"token_usage": usage})
+	return ChatResult(generations=[ChatGeneration(message=message)], llm_output={"token_usage": usage})
+
+
+def install(flow, model: FakeChatModel):
+	"""Point every agent of a ResumeFlow at ``model``."""
+	for agent in (flow.jd_analyzer, flow.resume_builder, flow.supervisor):
+		agent.llm = model
+	return flow
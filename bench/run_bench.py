@@ -0,0 +1,299 @@
+"""Offline benchmarks for the resume pipeline. No Groq tokens are spent.
+
+	python -m bench.run_bench --output bench_results.json
+	python -m bench.run_bench --quick --compare bench_results.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+
+_tmp = tempfile.mkdtemp(prefix="resume-bench-")
+# Benchmarks measure the pipeline itself: no response cache, no rate limiting, throwaway JD profiles
+os.environ["RESUME_LLM_CACHE"] = "0"
+os.environ["RESUME_RATE_LIMIT"] = "0"
+os.environ["RESUME_JD_PROFILE_PATH"] = os.path.join(_tmp, "jd_profiles.sqlite")
+
+from agents.scheduler import RateLimitScheduler  # noqa: E402
+from bench.corpus import make_jd, make_resume, write_resume_files  # noqa: E402
+from bench.fake_groq import FakeGroqServer  # noqa: E402
+from bench.fake_llm import FakeChatModel, install  # noqa: E402
+from graph.resume_flow import ResumeFlow  # noqa: E402
+from utils.export import create_docx, create_pdf, export_batch, export_cache  # noqa: E402
+from utils.ingestion import extract_text_from_path, text_cache  # noqa: E402
+
+
+def _summary(samples: list) -> dict:
+	ordered = sorted(samples)
+	return {
+		"n": len(ordered),
+		"mean_ms": round(statistics.mean(ordered) * 1000, 3),
+		"p50_ms": round(ordered[len(ordered) // 2] * 1000, 3),
+		"p95_ms": round(ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))] * 1000, 3),
+		"max_ms": round(ordered[-1] * 1000, 3),
+	}
+
+
+def _flow(args, **model_kwargs) -> ResumeFlow:
+	model = FakeChatModel(latency=args.latency, tokens_per_second=args.tps, **model_kwargs)
+	return install(ResumeFlow("bench-key"), model)
+
+
+def bench_single_flow(args) -> dict:
+	flow = _flow(args)
+	jd = flow.get_profile(make_jd(1))
+	samples, loops, calls = [], [], []
+	for i in range(args.iterations):
+		start = time.perf_counter()
+		result = flow.run(jd, make_resume(i, "small"))
+		samples.append(time.perf_counter() - start)
+		loops.append(result["loop_stats"]["loops"])
+		calls.append(result["loop_stats"]["llm_calls"])
+	return {**_summary(samples), "mean_loops": statistics.mean(loops), "mean_llm_calls": statistics.mean(calls)}
+
+
+def bench_batch_throughput(args) -> dict:
+	results = {}
+	jd_text = make_jd(2)
+	for concurrency in args.concurrency:
+		flow = _flow(args)
+		pairs = ({"id": i, "jd_text": jd_text, "resume_text": make_resume(i, "small")} for i in range(args.pairs))
+
+		async def drain():
+			count = 0
+			async for record in flow.run_batch(pairs, concurrency=concurrency):
+				count += "error" not in record
+			return count
+
+		start = time.perf_counter()
+		ok = asyncio.run(drain())
+		elapsed = time.perf_counter() - start
+		results[f"concurrency_{concurrency}"] = {
+			"pairs": args.pairs,
+			"ok": ok,
+			"elapsed_s": round(elapsed, 3),
+			"pairs_per_s": round(args.pairs / elapsed, 3),
+		}
+	return results
+
+
+def bench_parse_failures(args) -> dict:
+	flow = _flow(args, malformed_rate=args.malformed_rate, seed=7)
+	jd = flow.get_profile(make_jd(3))
+	samples, loops, calls, reasons, repairs, saved = [], [], [], {}, 0, 0
+	for i in range(args.iterations):
+		start = time.perf_counter()
+		result = flow.run(jd, make_resume(i, "small"))
+		samples.append(time.perf_counter() - start)
+		stats = result["loop_stats"]
+		loops.append(stats["loops"])
+		calls.append(stats["llm_calls"])
+		reasons[stats["stop_reason"]] = reasons.get(stats["stop_reason"], 0) + 1
+		repairs += result["metrics"]["repairs"]
+		saved += result["metrics"]["loops_saved"]
+	return {
+		**_summary(samples),
+		"malformed_rate": args.malformed_rate,
+		"mean_loops": statistics.mean(loops),
+		"mean_llm_calls": statistics.mean(calls),
+		"stop_reasons": reasons,
+		"repairs": repairs,
+		"loops_saved_by_repair": saved,
+	}
+
+
+def bench_export(args) -> dict:
+	results = {}
+	for size in args.sizes:
+		text = make_resume(0, size)
+		for name, fn in (("pdf", create_pdf), ("docx", create_docx)):
+			samples = []
+			for _ in range(args.repeat):
+				export_cache.clear()
+				start = time.perf_counter()
+				data = fn(text).getvalue()
+				samples.append(time.perf_counter() - start)
+			start = time.perf_counter()
+			fn(text)
+			cached_ms = (time.perf_counter() - start) * 1000
+			results[f"{name}_{size}"] = {
+				**_summary(samples), "cached_ms": round(cached_ms, 3), "bytes": len(data), "chars": len(text)
+			}
+	export_cache.clear()
+	items = [(f"resume_{i}", make_resume(i, "medium")) for i in range(args.pairs)]
+	start = time.perf_counter()
+	files = export_batch(items, ("pdf", "docx"), zip_file=os.path.join(_tmp, "export.zip"))
+	elapsed = time.perf_counter() - start
+	results["batch_zip"] = {"files": files, "seconds": round(elapsed, 3), "files_per_sec": round(files / elapsed, 1)}
+	return results
+
+
+def bench_extraction(args) -> dict:
+	results = {}
+	directory = os.path.join(_tmp, "corpus")
+	for size in args.sizes:
+		paths = write_resume_files(directory, 1, size, formats=("pdf", "docx"))
+		for path in paths:
+			samples = []
+			for _ in range(args.repeat):
+				text_cache.clear()
+				start = time.perf_counter()
+				extract_text_from_path(path)
+				samples.append(time.perf_counter() - start)
+			start = time.perf_counter()
+			extract_text_from_path(path)
+			cached_ms = (time.perf_counter() - start) * 1000
+			results[f"{os.path.splitext(path)[1][1:]}_{size}"] = {
+				**_summary(samples), "cached_ms": round(cached_ms, 3), "bytes": os.path.getsize(path)
+			}
+	return results
+
+
+def _endpoint_batch(args, scheduler) -> dict:
+	"""One batch through the real Groq clients against a fresh fake endpoint whose budgets start empty."""
+	server = FakeGroqServer(rpm=args.rpm, tpm=args.tpm, latency=args.latency).start()
+	buckets = [server.requests, server.tokens]
+	if scheduler is not None:
+		buckets += [scheduler.requests, scheduler.tokens]
+	for bucket in buckets:
+		# start both sides at zero so the run measures the steady refill rate, not the one-minute burst
+		bucket.available = 0.0
+		bucket._updated = time.monotonic()
+	jd_text = make_jd(5)
+	pairs = ({"id": i, "jd_text": jd_text, "resume_text": make_resume(i, "small")} for i in range(args.endpoint_pairs))
+
+	async def drain(flow):
+		errors = 0
+		async for record in flow.run_batch(pairs, concurrency=8, max_loops=2):
+			errors += "error" in record
+		return errors
+
+	previous = os.environ.get("GROQ_API_BASE")
+	os.environ["GROQ_API_BASE"] = server.base_url
+	try:
+		# a key per endpoint keeps these clients apart from any built for other endpoints
+		flow = ResumeFlow(f"bench-{server.server_address[1]}")
+		for agent in (flow.jd_analyzer, flow.resume_builder, flow.supervisor):
+			agent.scheduler = scheduler
+		start = time.perf_counter()
+		errors = asyncio.run(drain(flow))
+		elapsed = time.perf_counter() - start
+	finally:
+		if previous is None:
+			os.environ.pop("GROQ_API_BASE")
+		else:
+			os.environ["GROQ_API_BASE"] = previous
+	server.shutdown()
+	stats = server.stats()
+	admitted = stats["requests"] - stats["rate_limited"]
+	return {
+		**stats,
+		"errors": errors,
+		"elapsed_s": round(elapsed, 3),
+		"requests_per_min": round(admitted / elapsed * 60, 1),
+		"tokens_per_min": round((stats["prompt_tokens"] + stats["completion_tokens"]) / elapsed * 60, 1),
+	}
+
+
+def bench_rate_limit(args) -> dict:
+	"""Admission control against the local fake endpoint: with the scheduler no request should get a 429
+	and throughput should sit at the budget; without it the same batch overruns the budget."""
+	guarded = _endpoint_batch(args, RateLimitScheduler(args.rpm, args.tpm, max_retries=0))
+	unguarded = _endpoint_batch(args, None)
+	return {
+		"rpm": args.rpm,
+		"tpm": args.tpm,
+		"scheduled": guarded,
+		"unscheduled": unguarded,
+		"holds_budget": guarded["rate_limited"] == 0 and guarded["errors"] == 0,
+	}
+
+
+SCENARIOS = {
+	"single_flow": bench_single_flow,
+	"batch_throughput": bench_batch_throughput,
+	"parse_failures": bench_parse_failures,
+	"export": bench_export,
+	"extraction": bench_extraction,
+	"rate_limit": bench_rate_limit,
+}
+
+
+def _flatten(data, prefix=""):
+	for key, value in data.items():
+		path = f"{prefix}{key}"
+		if isinstance(value, dict):
+			yield from _flatten(value, path + ".")
+		elif isinstance(value, (int, float)) and not isinstance(value, bool):
+			yield path, value
+
+
+def compare(current: dict, baseline: dict):
+	"""Print every numeric metric that changed against a previous results file."""
+	before = dict(_flatten(baseline.get("scenarios", {})))
+	for path, value in _flatten(current["scenarios"]):
+		old = before.get(path)
+		if old:
+			change = (value - old) / old * 100
+			if abs(change) >= 0.5:
+				print(f"{path:60s} {old:>12} -> {value:>12} ({change:+.1f}%)")
+
+
+def main(argv=None):
+	parser = argparse.ArgumentParser(description="Offline resume pipeline benchmarks (fake LLM, no tokens spent)")
+	parser.add_argument("--scenarios", nargs="+", choices=sorted(SCENARIOS), default=sorted(SCENARIOS))
+	parser.add_argument("--output", help="Write results as JSON to this file")
+	parser.add_argument("--compare", help="Previous results JSON to diff against")
+	parser.add_argument("--quick", action="store_true", help="Small sizes and counts for a fast smoke run")
+	parser.add_argument("--latency", type=float, default=0.05, help="Fake LLM time to first token (s)")
+	parser.add_argument("--tps", type=float, default=2000.0, help="Fake LLM output tokens per second")
+	parser.add_argument("--malformed-rate", type=float, default=0.3)
+	parser.add_argument("--iterations", type=int, default=20)
+	parser.add_argument("--pairs", type=int, default=64)
+	parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16])
+	parser.add_argument("--sizes", nargs="+", default=["small", "medium", "large"])
+	parser.add_argument("--repeat", type=int, default=5)
+	parser.add_argument("--rpm", type=float, default=600, help="Fake endpoint (and scheduler) requests per minute")
+	parser.add_argument("--tpm", type=float, default=300000, help="Fake endpoint (and scheduler) tokens per minute")
+	parser.add_argument("--endpoint-pairs", type=int, default=16, help="Batch size for the rate_limit scenario")
+	args = parser.parse_args(argv)
+	if args.quick:
+		args.iterations, args.pairs, args.repeat, args.endpoint_pairs = 5, 16, 2, 8
+		args.concurrency, args.sizes = [1, 8], ["small", "medium"]
+
+	results = {
+		"meta": {
+			"timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+			"python": sys.version.split()[0],
+			"platform": platform.platform(),
+			"latency_s": args.latency,
+			"tokens_per_second": args.tps,
+		},
+		"scenarios": {},
+	}
+	for name in args.scenarios:
+		start = time.perf_counter()
+		results["scenarios"][name] = SCENARIOS[name](args)
+		print(f"{name}: done in {time.perf_counter() - start:.2f}s", file=sys.stderr)
+
+	if args.output:
+		with open(args.output, "w", encoding="utf-8") as f:
+			json.dump(results, f, indent=2)
+	else:
+		print(json.dumps(results, indent=2))
+	if args.compare:
+		with open(args.compare, encoding="utf-8") as f:
+			compare(results, json.load(f))
+	if results["scenarios"].get("rate_limit", {}).get("holds_budget") is False:
+		print("rate_limit: the scheduler let requests past the endpoint's budget", file=sys.stderr)
+		return 1
+	return 0
+
+
+if __name__ == "__main__":
+	sys.exit(main())
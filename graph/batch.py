@@ -0,0 +1,135 @@
+import asyncio
+import json
+import os
+
+from utils.ingestion import extract_text_from_path, iter_directory_texts, normalize_text
+from utils.jd_index import JDIndex
+
+
+def compact_results(output_path: str) -> set:
+	"""IDs already written to ``output_path``, so an interrupted batch can pick up where it stopped.
+
+	Error records and partially written lines are removed from the file first: those IDs are retried,
+	and their old errors should not sit next to the new result.
+	"""
+	done = set()
+	if not os.path.exists(output_path):
+		return done
+	dropped = 0
+	tmp_path = output_path + ".tmp"
+	with open(output_path, encoding="utf-8") as f, open(tmp_path, "w", encoding="utf-8") as out:
+		for line in f:
+			try:
+				record = json.loads(line)
+			except ValueError:
+				dropped += 1
+				continue
+			if "error" in record:
+				dropped += 1
+				continue
+			done.add(record.get("id"))
+			out.write(line if line.endswith("\n") else line + "\n")
+	if dropped:
+		os.replace(tmp_path, output_path)
+	else:
+		os.remove(tmp_path)
+	return done
+
+
+def iter_jsonl_pairs(path: str, skip_ids=frozenset()):
+	"""Stream pairs from a JSONL file with ``jd_text`` and ``resume_text`` (or ``resume_path``) per line."""
+	with open(path, encoding="utf-8") as f:
+		for line_no, line in enumerate(f, 1):
+			if not line.strip():
+				continue
+			record = json.loads(line)
+			pair_id = str(record.get("id", line_no))
+			if pair_id in skip_ids:
+				continue
+			resume_text = record.get("resume_text")
+			if resume_text is not None:
+				# inline text gets the same normalization as extracted files, so prompts and dedup agree
+				resume_text = normalize_text(resume_text)
+			elif record.get("resume_path"):
+				resume_text = extract_text_from_path(record["resume_path"])
+			yield {"id": pair_id, "jd_text": record["jd_text"], "resume_text": resume_text or ""}
+
+
+def iter_directory_pairs(directory: str, jd_profile, skip_ids=frozenset()):
+	"""Stream every PDF/DOCX/TXT resume under ``directory`` paired with one JD profile."""
+	for pair_id, resume_text in iter_directory_texts(directory, skip_ids):
+		yield {"id": pair_id, "jd_profile": jd_profile, "resume_text": resume_text}
+
+
+def iter_jd_texts(path: str):
+	"""(JD ID, JD text) from a directory of .txt files (ID = relative path) or a JSONL of {id, jd_text}."""
+	if os.path.isdir(path):
+		for root, dirs, files in os.walk(path):
+			dirs.sort()
+			for name in sorted(files):
+				if name.lower().endswith(".txt"):
+					file_path = os.path.join(root, name)
+					with open(file_path, encoding="utf-8", errors="replace") as f:
+						yield os.path.relpath(file_path, path), f.read()
+		return
+	with open(path, encoding="utf-8") as f:
+		for line_no, line in enumerate(f, 1):
+			if line.strip():
+				record = json.loads(line)
+				yield str(record.get("id", line_no)), record["jd_text"]
+
+
+def iter_refined_resumes(path: str):
+	"""(ID, refined resume) for every successful record in a batch or match results JSONL."""
+	with open(path, encoding="utf-8") as f:
+		for line in f:
+			try:
+				record = json.loads(line)
+			except ValueError:
+				continue
+			if "error" not in record and record.get("resume"):
+				yield str(record.get("id")), record["resume"]
+
+
+async def build_jd_index(flow, jds, concurrency: int = 8) -> tuple:
+	"""(JDIndex, {JD ID: error}) over (JD ID, JD text) pairs. Profiles come from the JD profile store, so
+	only JDs never seen before cost an analysis call.
+
+	``jds`` is consumed lazily with at most ``concurrency`` analyses in flight. A JD whose analysis fails
+	is left out of the index and reported instead of aborting the rest.
+	"""
+	index = JDIndex()
+	failed = {}
+	iterator = iter(jds)
+	pending = {}
+	exhausted = False
+	while True:
+		while not exhausted and len(pending) < concurrency:
+			# reading the next JD may touch the disk, so it runs off the event loop
+			item = await asyncio.to_thread(next, iterator, None)
+			if item is None:
+				exhausted = True
+				break
+			jd_id, jd_text = item
+			pending[asyncio.ensure_future(flow.aget_profile(jd_text))] = jd_id
+		if not pending:
+			break
+		done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+		for task in done:
+			jd_id = pending.pop(task)
+			try:
+				index.add(jd_id, task.result())
+			except Exception as e:
+				failed[jd_id] = str(e)
+	return index, failed
+
+
+async def run_batch_to_jsonl(flow, pairs, output_path: str, concurrency: int = 8, max_loops: int = 3) -> int:
+	"""Write each flow result to ``output_path`` as soon as it finishes. Returns the number written."""
+	written = 0
+	with open(output_path, "a", encoding="utf-8") as out:
+		async for record in flow.run_batch(pairs, concurrency=concurrency, max_loops=max_loops):
+			out.write(json.dumps(record, ensure_ascii=False) + "\n")
+			out.flush()
+			written += 1
+	return written
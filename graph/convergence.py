@@ -0,0 +1,126 @@
+from difflib import SequenceMatcher
+
+
+def similarity(a: str, b: str) -> float:
+	"""0-1 similarity between two resume versions. Lines are matched first and only replaced lines are
+	compared character by character, so the cost follows the size of the edit rather than the resume."""
+	a, b = a or "", b or ""
+	if a == b:
+		return 1.0
+	a_lines, b_lines = a.splitlines(keepends=True), b.splitlines(keepends=True)
+	matched = 0
+	for tag, i1, i2, j1, j2 in SequenceMatcher(None, a_lines, b_lines).get_opcodes():
+		if tag == "equal":
+			matched += sum(map(len, a_lines[i1:i2]))
+		elif tag == "replace":
+			for old, new in zip(a_lines[i1:i2], b_lines[j1:j2]):
+				matched += sum(block.size for block in SequenceMatcher(None, old, new).get_matching_blocks())
+	return 2 * matched / (len(a) + len(b))
+
+
+def section_scores(builder_result: dict) -> list:
+	scores = []
+	for section in (builder_result.get("sections") or {}).values():
+		if isinstance(section, dict):
+			try:
+				scores.append(float(section.get("match_score")))
+			except (TypeError, ValueError):
+				continue
+	return scores
+
+
+class LoopTracker:
+	"""Decides when the builder/supervisor loop has stopped making progress and counts saved calls.
+
+	- ``similarity_threshold``: stop once a revision is at least this similar to the previous revision
+	  (never on the first pass, which has nothing to compare against).
+	- ``plateau_delta``: stop once the mean section score improves by less than this.
+	- ``local_approve_score``: if every builder section scores at least this, approve without the Supervisor.
+	"""
+
+	def __init__(self, max_loops: int, similarity_threshold: float = 0.98, plateau_delta: float = 0.1,
+			local_approve_score: float = None):
+		self.max_loops = max_loops
+		self.similarity_threshold = similarity_threshold
+		self.plateau_delta = plateau_delta
+		self.local_approve_score = local_approve_score
+		self.loops = 0
+		self.llm_calls = 0
+		self.supervisor_calls_saved = 0
+		self.stop_reason = None
+		self._last_mean = None
+		self._last_revision = None
+
+	def local_evaluation(self, builder_result: dict):
+		"""An approving evaluation built from the builder's own section scores, or None."""
+		if self.local_approve_score is None:
+			return None
+		scores = section_scores(builder_result)
+		if not scores or min(scores) < self.local_approve_score:
+			return None
+		self.supervisor_calls_saved += 1
+		return {
+			"effectiveness": "effective",
+			"feedback": f"Approved locally: every section scored at least {self.local_approve_score}.",
+			"request_rebuild": False,
+			"section_scores": {name: s.get("match_score") for name, s in builder_result["sections"].items() if isinstance(s, dict)},
+			"local": True
+		}
+
+	def observe(self, revised: str, builder_result: dict, evaluation: dict) -> bool:
+		"""Record one iteration; return True when the loop should stop."""
+		self.loops += 1
+		previous, self._last_revision = self._last_revision, revised
+		wants_rebuild = builder_result.get("request_rebuild", False)
+		# An unparseable Supervisor reply defaults to request_rebuild; don't spend a loop on that alone
+		if not evaluation.get("parse_error"):
+			wants_rebuild = wants_rebuild or evaluation.get("request_rebuild", False)
+		if not wants_rebuild:
+			self.stop_reason = "supervisor_unparsed" if evaluation.get("parse_error") else "approved"
+			return True
+		# A builder reply that could not be parsed leaves the resume unchanged, which is not convergence
+		if builder_result.get("parse_error"):
+			self.stop_reason = "builder_unparsed"
+			return True
+		if previous is not None and similarity(previous, revised) >= self.similarity_threshold:
+			self.stop_reason = "converged"
+			return True
+		scores = section_scores(builder_result)
+		mean = sum(scores) / len(scores) if scores else None
+		plateaued = mean is not None and self._last_mean is not None and mean - self._last_mean < self.plateau_delta
+		self._last_mean = mean
+		if plateaued:
+			self.stop_reason = "plateau"
+			return True
+		return False
+
+	def state(self) -> dict:
+		"""Counters needed to continue an interrupted run (see ``restore``)."""
+		return {
+			"loops": self.loops,
+			"llm_calls": self.llm_calls,
+			"supervisor_calls_saved": self.supervisor_calls_saved,
+			"last_mean": self._last_mean,
+			"last_revision": self._last_revision
+		}
+
+	def restore(self, state: dict):
+		self.loops = state.get("loops", 0)
+		self.llm_calls = state.get("llm_calls", 0)
+		self.supervisor_calls_saved = state.get("supervisor_calls_saved", 0)
+		self._last_mean = state.get("last_mean")
+		self._last_revision = state.get("last_revision")
+
+	def stats(self) -> dict:
+		"""Loop counters. ``supervisor_calls_saved`` is counted; ``calls_saved_estimate`` adds the skipped
+		loops priced at this run's average calls per loop, since calls that never ran cannot be counted."""
+		loops_saved = self.max_loops - self.loops if self.stop_reason in ("converged", "plateau", "supervisor_unparsed", "builder_unparsed") else 0
+		calls_per_loop = self.llm_calls / self.loops if self.loops else 0.0
+		return {
+			"loops": self.loops,
+			"llm_calls": self.llm_calls,
+			"stop_reason": self.stop_reason or "max_loops",
+			"loops_saved": loops_saved,
+			"supervisor_calls_saved": self.supervisor_calls_saved,
+			"calls_saved_estimate": round(loops_saved * calls_per_loop) + self.supervisor_calls_saved
+		}
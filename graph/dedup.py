@@ -0,0 +1,145 @@
+import itertools
+import threading
+from concurrent.futures import Future
+
+from utils.metrics import record
+from utils.minhash import LSHIndex, MinHasher
+from utils.sections import parse_resume
+
+# Result fields a reused result copies from the earlier run; the rest (builder output, loop stats, metrics)
+# stay with it, so batch totals count the earlier pair's calls once
+_REUSED_FIELDS = ("evaluation", "note", "prescore", "routing")
+
+
+class _Entry:
+	"""What a later duplicate needs from an earlier pair: its section names and text hashes, and once the
+	run finishes its refined section texts and small result fields. ``future`` is dropped when done."""
+
+	__slots__ = ("pair_id", "jd_hash", "sections", "refined", "fields", "future")
+
+	def __init__(self, pair_id, jd_hash: str, sections: tuple):
+		self.pair_id = pair_id
+		self.jd_hash = jd_hash
+		self.sections = sections
+		self.refined = None
+		self.fields = None
+		# resolves when the pair's run finishes; later duplicates wait on it
+		self.future = Future()
+
+
+def _digest(text: str) -> int:
+	return hash(" ".join(text.split()))
+
+
+class ResumeDedup:
+	"""Near-duplicate stage in front of batch flow runs.
+
+	Every (JD, resume) pair is MinHashed and kept in an LSH index scoped by JD hash. A later pair
+	whose resume is at least ``threshold`` similar to an earlier one for the same JD waits for that
+	result and reuses it when the difference is confined to sections the builder never edits (the
+	header block): matching sections take the earlier refined text, the rest keep their own. Any other
+	near-duplicate runs the flow as usual, where the section memo still skips its unchanged sections.
+
+	Only section hashes and refined section texts are kept per pair, and at most ``max_entries`` finished
+	pairs; older ones leave the index and are no longer matched.
+	"""
+
+	def __init__(self, threshold: float = 0.9, num_perm: int = 64, shingle_size: int = 5, max_entries: int = 100000):
+		self.hasher = MinHasher(num_perm, shingle_size)
+		self.index = LSHIndex(threshold, num_perm)
+		self.max_entries = max_entries
+		self._entries = {}
+		self._ids = itertools.count()
+		self._lock = threading.Lock()
+		self.counts = {"unique": 0, "exact": 0, "patched": 0, "rerun": 0, "evicted": 0}
+
+	def claim(self, pair_id, jd_hash: str, resume_text: str) -> tuple:
+		"""Register a pair; (its entry, most similar earlier entry or None, similarity)."""
+		parsed = parse_resume(resume_text)
+		signature = self.hasher.signature(parsed)
+		sections = tuple((s.name, _digest(s.text())) for s in parsed.sections)
+		with self._lock:
+			entry = _Entry(pair_id, jd_hash, sections)
+			earlier, score = None, 0.0
+			for key, similarity in self.index.query(signature, jd_hash):
+				# bucket keys are hashes, so check the namespace before trusting a candidate
+				if self._entries[key].jd_hash == jd_hash:
+					earlier, score = self._entries[key], similarity
+					break
+			key = next(self._ids)
+			self._entries[key] = entry
+			self.index.add(key, signature, jd_hash)
+			evicted = self._evict()
+		if earlier is None:
+			self._count("unique")
+		if evicted:
+			self._count("evicted", evicted)
+		return entry, earlier, score
+
+	def _evict(self) -> int:
+		# oldest first; stop at a pair still running, since duplicates may be waiting on it
+		evicted = 0
+		while len(self._entries) > self.max_entries:
+			key = next(iter(self._entries))
+			entry = self._entries[key]
+			if entry.future is not None:
+				break
+			del self._entries[key]
+			self.index.remove(key, entry.jd_hash)
+			evicted += 1
+		return evicted
+
+	def finish(self, entry: _Entry, result: dict):
+		"""Keep what duplicates of ``entry`` need from its flow ``result`` (None if it failed) and wake them."""
+		if result:
+			refined = parse_resume(result.get("resume") or "").sections
+			if [s.name for s in refined] == [name for name, _ in entry.sections]:
+				entry.refined = tuple(s.text() for s in refined)
+				entry.fields = {key: result[key] for key in _REUSED_FIELDS if key in result}
+		future, entry.future = entry.future, None
+		future.set_result(None)
+
+	def reuse(self, earlier: _Entry, resume_text: str, score: float):
+		"""The earlier result patched onto ``resume_text``, or None if it needs its own run."""
+		patched = self._patch(earlier, resume_text)
+		if patched is None:
+			self._count("rerun")
+			return None
+		text, reused_sections, exact = patched
+		# the builder output stays with the earlier pair's own result
+		result = {"resume": text, "builder": None, **earlier.fields}
+		result["loop_stats"] = {"loops": 0, "llm_calls": 0, "stop_reason": "dedup", "loops_saved": 0,
+			"supervisor_calls_saved": 0, "calls_saved_estimate": 0, "reused_from": earlier.pair_id}
+		result["dedup"] = {"of": earlier.pair_id, "similarity": round(score, 4), "exact": exact,
+			"reused_sections": reused_sections}
+		self._count("exact" if exact else "patched")
+		return result
+
+	@staticmethod
+	def _patch(earlier: _Entry, resume_text: str):
+		if earlier.refined is None:
+			return None
+		current = parse_resume(resume_text).sections
+		if [name for name, _ in earlier.sections] != [s.name for s in current]:
+			return None
+		parts, reused = [], []
+		for (name, digest), after, section in zip(earlier.sections, earlier.refined, current):
+			if digest == _digest(section.text()):
+				parts.append(after)
+				reused.append(name)
+			elif name == "Header":
+				parts.append(section.text())
+			else:
+				return None
+		if not reused:
+			return None
+		return "".join(parts), reused, len(reused) == len(current)
+
+	def _count(self, outcome: str, n: int = 1):
+		with self._lock:
+			self.counts[outcome] += n
+		record({"kind": "dedup", "outcome": outcome, "count": n})
+
+	def stats(self) -> dict:
+		with self._lock:
+			return {"indexed": len(self.index), **self.counts}
@@ -0,0 +1,198 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+
+class JobStore:
+	"""SQLite-backed queue of flow runs with their progress, last checkpoint and result.
+
+	A job's checkpoint is the flow state after its last completed iteration (see ``ResumeFlow.stream``),
+	so a job interrupted by a restart picks up from there instead of starting over.
+	"""
+
+	def __init__(self, path: str):
+		os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+		self._lock = threading.Lock()
+		self._conn = sqlite3.connect(path, check_same_thread=False)
+		self._conn.execute(
+			"CREATE TABLE IF NOT EXISTS jobs ("
+			"id TEXT PRIMARY KEY, status TEXT NOT NULL, jd_text TEXT NOT NULL, resume_text TEXT NOT NULL, "
+			"max_loops INTEGER NOT NULL, meta TEXT, progress TEXT, checkpoint TEXT, result TEXT, error TEXT, "
+			"created REAL NOT NULL, updated REAL NOT NULL)"
+		)
+		self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created)")
+		self._conn.commit()
+
+	def submit(self, jd_text: str, resume_text: str, max_loops: int = 3, meta: dict = None) -> str:
+		job_id = uuid.uuid4().hex
+		now = time.time()
+		with self._lock:
+			self._conn.execute(
+				"INSERT INTO jobs (id, status, jd_text, resume_text, max_loops, meta, created, updated) "
+				"VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+				(job_id, QUEUED, jd_text, resume_text, max_loops, json.dumps(meta or {}), now, now),
+			)
+			self._conn.commit()
+		return job_id
+
+	def claim(self):
+		"""Mark the oldest queued job running and return it, or None if the queue is empty."""
+		with self._lock:
+			row = self._conn.execute(
+				"SELECT id FROM jobs WHERE status = ? ORDER BY created LIMIT 1", (QUEUED,)
+			).fetchone()
+			if row is None:
+				return None
+			self._conn.execute("UPDATE jobs SET status = ?, updated = ? WHERE id = ?", (RUNNING, time.time(), row[0]))
+			self._conn.commit()
+		return self.get(row[0])
+
+	def get(self, job_id: str):
+		with self._lock:
+			self._conn.row_factory = sqlite3.Row
+			try:
+				row = self._conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+			finally:
+				self._conn.row_factory = None
+		if row is None:
+			return None
+		job = dict(row)
+		for key in ("meta", "progress", "checkpoint", "result"):
+			job[key] = json.loads(job[key]) if job[key] else None
+		return job
+
+	def _update(self, job_id: str, **fields):
+		fields["updated"] = time.time()
+		columns = ", ".join(f"{name} = ?" for name in fields)
+		with self._lock:
+			self._conn.execute(f"UPDATE jobs SET {columns} WHERE id = ?", (*fields.values(), job_id))
+			self._conn.commit()
+
+	def set_progress(self, job_id: str, progress: dict, checkpoint: dict = None):
+		fields = {"progress": json.dumps(progress)}
+		if checkpoint is not None:
+			fields["checkpoint"] = json.dumps(checkpoint)
+		self._update(job_id, **fields)
+
+	def finish(self, job_id: str, result: dict, progress: dict = None):
+		fields = {"status": DONE, "result": json.dumps(result, default=str)}
+		if progress is not None:
+			fields["progress"] = json.dumps(progress)
+		self._update(job_id, **fields)
+
+	def fail(self, job_id: str, error: str):
+		self._update(job_id, status=FAILED, error=error)
+
+	def requeue_interrupted(self) -> int:
+		"""Put jobs left running by a previous process back on the queue (their checkpoints are kept)."""
+		with self._lock:
+			count = self._conn.execute(
+				"UPDATE jobs SET status = ?, updated = ? WHERE status = ?", (QUEUED, time.time(), RUNNING)
+			).rowcount
+			self._conn.commit()
+		return count
+
+
+class WorkerPool:
+	"""Background threads that claim jobs from a JobStore and run them through one ResumeFlow.
+
+	Progress (stage, partial text, finished turns) is written at most every ``progress_interval``
+	seconds plus at every iteration boundary, so pollers see live output without a write per token.
+	"""
+
+	def __init__(self, flow, store: JobStore, workers: int = 4, poll_interval: float = 0.5,
+			progress_interval: float = 0.5):
+		self.flow = flow
+		self.store = store
+		self.poll_interval = poll_interval
+		self.progress_interval = progress_interval
+		self._stop = threading.Event()
+		self._wake = threading.Event()
+		self._threads = [
+			threading.Thread(target=self._loop, name=f"resume-job-worker-{i}", daemon=True) for i in range(workers)
+		]
+
+	def start(self):
+		for thread in self._threads:
+			thread.start()
+		return self
+
+	def stop(self):
+		self._stop.set()
+		self._wake.set()
+
+	def notify(self):
+		"""Wake idle workers right away after a submit instead of waiting for the next poll."""
+		self._wake.set()
+
+	def _loop(self):
+		while not self._stop.is_set():
+			job = self.store.claim()
+			if job is None:
+				self._wake.wait(self.poll_interval)
+				self._wake.clear()
+				continue
+			try:
+				self.run_job(job)
+			except Exception as e:
+				self.store.fail(job["id"], str(e))
+
+	def run_job(self, job: dict):
+		progress = job["progress"] or {"turns": []}
+		progress.update({"stage": "starting", "partial_resume": "", "partial_feedback": "", "sections": []})
+		checkpoint = job["checkpoint"]
+		resume_text = job["resume_text"]
+		last_write = 0.0
+		for event in self.flow.stream(job["jd_text"], resume_text, max_loops=job["max_loops"], checkpoint=checkpoint):
+			kind = event["type"]
+			if "iteration" in event:
+				progress["iteration"] = event["iteration"]
+			if kind == "partial" and event["key"] == "revised_resume":
+				progress["stage"] = "builder"
+				progress["partial_resume"] = event["value"]
+			elif kind == "partial" and event["key"] == "feedback":
+				progress["stage"] = "supervisor"
+				progress["partial_feedback"] = event["value"]
+			elif kind == "member" and event["key"] == "sections" and isinstance(event["value"], dict):
+				progress["sections"].append({"name": event["name"], **event["value"]})
+			elif kind == "builder":
+				progress["sections"] = []
+			elif kind == "evaluation" and not event["carried"]:
+				progress["turns"].append({
+					"iteration": event["iteration"],
+					"resume": (checkpoint or {}).get("resume", resume_text),
+					"feedback": event["result"].get("feedback", "No feedback."),
+				})
+				progress["partial_feedback"] = ""
+			elif kind == "checkpoint":
+				checkpoint = event["state"]
+				self.store.set_progress(job["id"], progress, checkpoint)
+				last_write = time.monotonic()
+				continue
+			elif kind == "done":
+				progress["stage"] = "done"
+				self.store.finish(job["id"], event["result"], progress)
+				return
+			if time.monotonic() - last_write >= self.progress_interval:
+				self.store.set_progress(job["id"], progress)
+				last_write = time.monotonic()
+
+
+_default_store = None
+_default_store_lock = threading.Lock()
+
+
+def get_default_job_store() -> JobStore:
+	global _default_store
+	with _default_store_lock:
+		if _default_store is None:
+			_default_store = JobStore(os.getenv("RESUME_JOBS_PATH", os.path.join(".cache", "jobs.sqlite")))
+		return _default_store
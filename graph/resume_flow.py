@@ -1,35 +1,443 @@
+import asyncio
+import itertools
+import threading
+from collections import OrderedDict
+
+from agents.jd_analyzer import JDAnalyzer
+from agents.jd_profile import JDProfile
+from agents.llm_cache import LLMCache, get_default_cache, get_default_section_memo
 from agents.resume_builder import ResumeBuilder
+from agents.routing import Cascade, RoutingPolicy, get_default_policy
+from agents.scheduler import BATCH, set_priority
 from agents.supervisor import Supervisor
+from graph.convergence import LoopTracker
+from graph.dedup import ResumeDedup
+from utils.metrics import current_run, record, timed, with_run_scope
+from utils.scoring import ResumeScorer
+from utils.sections import parse_resume
+
+# Pre-screen scorers kept per JD (LRU), and how many batch pairs are pulled and scored together
+MAX_SCORERS = 64
+PRESCREEN_BATCH = 64
 
 class ResumeFlow:
-	def __init__(self, groq_api_key: str, model_name: str = "llama-3.1-8b-instant"):
-		self.resume_builder = ResumeBuilder(groq_api_key, model_name)
-		self.supervisor = Supervisor(groq_api_key, model_name)
+	def __init__(self, groq_api_key: str, model_name: str = "llama-3.1-8b-instant", cache: LLMCache = None,
+			prescreen_threshold: float = None, similarity_threshold: float = 0.98, plateau_delta: float = 0.1,
+			local_approve_score: float = None, section_mode: bool = False, section_threshold: float = 4.0,
+			routing: RoutingPolicy = None, incremental: bool = False, section_memo: LLMCache = None,
+			dedup_threshold: float = None):
+		# One cache instance shared by every agent so repeated prompts never hit Groq twice
+		self.cache = cache if cache is not None else get_default_cache()
+		self.jd_analyzer = JDAnalyzer(groq_api_key, model_name, self.cache)
+		# Incremental mode builds the first pass section by section through a persistent section memo,
+		# so re-running after a small edit only re-requests the sections that changed
+		self.incremental = incremental
+		if section_memo is None and (incremental or section_mode):
+			section_memo = get_default_section_memo()
+		self.resume_builder = ResumeBuilder(groq_api_key, model_name, self.cache, section_memo)
+		self.supervisor = Supervisor(groq_api_key, model_name, self.cache)
+		# Resumes whose local match score (0-1) falls below this skip the LLM loop entirely
+		self.prescreen_threshold = prescreen_threshold
+		self._scorers = OrderedDict()
+		self._scorers_lock = threading.Lock()
+		# Early-exit settings, see LoopTracker
+		self.similarity_threshold = similarity_threshold
+		self.plateau_delta = plateau_delta
+		self.local_approve_score = local_approve_score
+		# After the first full pass, rebuild only sections scoring below section_threshold
+		self.section_mode = section_mode
+		self.section_threshold = section_threshold
+		# Per-role model cascade (see RoutingPolicy); None keeps model_name for every call
+		self.routing = routing if routing is not None else get_default_policy()
+		# Batch pairs whose resume is this similar (MinHash estimate) to an earlier one for the same JD
+		# reuse that result where it can be patched on (see ResumeDedup)
+		self.dedup = ResumeDedup(dedup_threshold) if dedup_threshold is not None else None
+
+	def cache_stats(self) -> dict:
+		return self.cache.stats() if self.cache is not None else {}
+
+	def get_profile(self, jd) -> JDProfile:
+		"""Accept either a precomputed JDProfile or raw JD text."""
+		if isinstance(jd, JDProfile):
+			return jd
+		with Cascade(self.routing).use("analyzer"):
+			return self.jd_analyzer.profile(jd)
+
+	async def aget_profile(self, jd) -> JDProfile:
+		if isinstance(jd, JDProfile):
+			return jd
+		with Cascade(self.routing).use("analyzer"):
+			return await self.jd_analyzer.aprofile(jd)
+
+	def _scorer(self, profile: JDProfile):
+		"""Cached ResumeScorer for the JD, or None when it has no skills or keywords to match on."""
+		with self._scorers_lock:
+			scorer = self._scorers.get(profile.jd_hash)
+			if scorer is None:
+				scorer = ResumeScorer(profile)
+				if not scorer.vocab:
+					scorer = None
+				self._scorers[profile.jd_hash] = scorer
+			self._scorers.move_to_end(profile.jd_hash)
+			while len(self._scorers) > MAX_SCORERS:
+				self._scorers.popitem(last=False)
+			return scorer
+
+	def prescreen(self, profile: JDProfile, resume_text: str, score: float = None):
+		"""Return (match score, skipped result or None) for the configured gate.
+
+		``score`` is a match score computed earlier (see ``_prescreen_batch``). A JD without skills or
+		keywords scores every resume 0, so it bypasses the gate with a None score.
+		"""
+		if score is None:
+			scorer = self._scorer(profile)
+			if scorer is None:
+				return None, None
+			score = float(scorer.score([parse_resume(resume_text)]).match[0, 0])
+		if self.prescreen_threshold is None or score >= self.prescreen_threshold:
+			return score, None
+		return score, {
+			"resume": resume_text,
+			"builder": None,
+			"evaluation": {
+				"effectiveness": "not effective",
+				"feedback": "Resume does not meet the minimum skill/keyword match for this JD.",
+				"request_rebuild": False,
+				"section_scores": {}
+			},
+			"prescore": score,
+			"note": "Below pre-screen threshold; refinement skipped."
+		}
 
-	def run(self, jd_text: str, resume_text: str, max_loops: int = 3):
+	@with_run_scope
+	def run(self, jd, resume_text: str, max_loops: int = 3):
+		profile = self.get_profile(jd)
+		if self.prescreen_threshold is not None:
+			prescore, skipped = self.prescreen(profile, resume_text)
+			if skipped is not None:
+				return skipped
+		jd_text = profile.digest
+		tracker = self._tracker(max_loops)
+		cascade = Cascade(self.routing)
 		current_resume = resume_text
 		last_eval = None
 		last_builder = None
-		for _ in range(max_loops):
-			# Builder compares JD and resume and returns sections + revised_resume
-			builder_result = self.resume_builder.build(current_resume, jd_text)
-			revised = builder_result.get("revised_resume", current_resume)
-			# Supervisor evaluates the revised resume against the JD
-			evaluation = self.supervisor.evaluate(revised, jd_text)
-			last_eval = evaluation
-			last_builder = builder_result
-			# stop when neither asks for rebuild
-			if not builder_result.get("request_rebuild", False) and not evaluation.get("request_rebuild", False):
-				return {
-					"resume": revised,
-					"builder": builder_result,
-					"evaluation": evaluation
-				}
+		for iteration in range(max_loops):
+			with timed("flow_iteration", iteration=iteration):
+				# Builder compares JD and resume and returns sections + revised_resume
+				with cascade.use("builder"):
+					if self._use_sections(last_builder):
+						builder_result = self.resume_builder.build_sections(
+							current_resume, jd_text, last_builder["sections"], self.section_threshold
+						)
+					elif self.incremental:
+						builder_result = self.resume_builder.build_incremental(current_resume, jd_text, self.section_threshold)
+					else:
+						builder_result = self.resume_builder.build(current_resume, jd_text)
+				tracker.llm_calls += self._builder_calls(builder_result)
+				revised = builder_result.get("revised_resume", current_resume)
+				# Supervisor evaluates the revised resume against the JD, unless the builder's scores already clear the bar
+				evaluation = tracker.local_evaluation(builder_result)
+				if evaluation is None and revised == current_resume and last_eval is not None:
+					# nothing changed since the last evaluation (e.g. no weak sections left); carry it forward
+					evaluation = last_eval
+				if evaluation is None:
+					with cascade.use("supervisor"):
+						evaluation = self.supervisor.evaluate(revised, jd_text)
+					tracker.llm_calls += 1
+				last_eval = evaluation
+				last_builder = builder_result
+				stop = tracker.observe(revised, builder_result, evaluation)
+				stop = stop and not self._escalate(cascade, tracker, iteration, builder_result, evaluation)
+			if stop:
+				return self._result(revised, builder_result, evaluation, tracker, cascade)
 			current_resume = revised
 		# If still not effective after max_loops
-		return {
-			"resume": current_resume,
-			"builder": last_builder,
-			"evaluation": last_eval,
-			"note": "Max rebuild attempts reached."
+		return self._result(current_resume, last_builder, last_eval, tracker, cascade)
+
+	@with_run_scope
+	def stream(self, jd, resume_text: str, max_loops: int = 3, checkpoint: dict = None):
+		"""Run the flow like ``run`` but yield progress as tokens arrive.
+
+		Agent token events (see IncrementalJSONParser) are tagged with ``agent`` and ``iteration``.
+		Each iteration also yields ``{"type": "builder", ...}`` and ``{"type": "evaluation", ...}`` with
+		the parsed results, then ``{"type": "checkpoint", "state": ...}`` if the loop continues; passing
+		that state back as ``checkpoint`` resumes after the last completed iteration. The stream ends
+		with ``{"type": "done", "result": <run result>}``.
+		"""
+		profile = self.get_profile(jd)
+		if self.prescreen_threshold is not None and checkpoint is None:
+			prescore, skipped = self.prescreen(profile, resume_text)
+			if skipped is not None:
+				yield {"type": "done", "result": skipped}
+				return
+		jd_text = profile.digest
+		tracker = self._tracker(max_loops)
+		cascade = Cascade(self.routing)
+		current_resume = resume_text
+		last_eval = None
+		last_builder = None
+		start = 0
+		if checkpoint is not None:
+			start = checkpoint["iteration"]
+			current_resume = checkpoint["resume"]
+			last_builder = checkpoint["builder"]
+			last_eval = checkpoint["evaluation"]
+			tracker.restore(checkpoint["tracker"])
+			cascade.tier = checkpoint.get("tier", 0)
+		for iteration in range(start, max_loops):
+			with timed("flow_iteration", iteration=iteration):
+				# section builds stream each section's feedback and the spliced resume as sections complete
+				if self._use_sections(last_builder):
+					events = self.resume_builder.stream_sections(
+						current_resume, jd_text, last_builder["sections"], self.section_threshold
+					)
+				elif self.incremental:
+					events = self.resume_builder.stream_incremental(current_resume, jd_text, self.section_threshold)
+				else:
+					events = self.resume_builder.stream_build(current_resume, jd_text)
+				builder_result = None
+				for event in self._routed(cascade, "builder", events):
+					if event["type"] == "result":
+						builder_result = event["result"]
+					else:
+						yield {"agent": "builder", "iteration": iteration, **event}
+				tracker.llm_calls += self._builder_calls(builder_result)
+				yield {"type": "builder", "iteration": iteration, "result": builder_result}
+				revised = builder_result.get("revised_resume", current_resume)
+				evaluation = tracker.local_evaluation(builder_result)
+				if evaluation is None and revised == current_resume and last_eval is not None:
+					# nothing changed since the last evaluation (e.g. no weak sections left); carry it forward
+					evaluation = last_eval
+				if evaluation is None:
+					for event in self._routed(cascade, "supervisor", self.supervisor.stream_evaluate(revised, jd_text)):
+						if event["type"] == "result":
+							evaluation = event["result"]
+						else:
+							yield {"agent": "supervisor", "iteration": iteration, **event}
+					tracker.llm_calls += 1
+				yield {"type": "evaluation", "iteration": iteration, "result": evaluation, "resume": revised,
+					"carried": evaluation is last_eval}
+				last_eval = evaluation
+				last_builder = builder_result
+				stop = tracker.observe(revised, builder_result, evaluation)
+				stop = stop and not self._escalate(cascade, tracker, iteration, builder_result, evaluation)
+			if stop:
+				yield {"type": "done", "result": self._result(revised, builder_result, evaluation, tracker, cascade)}
+				return
+			current_resume = revised
+			yield {"type": "checkpoint", "iteration": iteration, "state": {
+				"iteration": iteration + 1,
+				"resume": revised,
+				"builder": builder_result,
+				"evaluation": evaluation,
+				"tracker": tracker.state(),
+				"tier": cascade.tier
+			}}
+		yield {"type": "done", "result": self._result(current_resume, last_builder, last_eval, tracker, cascade)}
+
+	@with_run_scope
+	async def arun(self, jd, resume_text: str, max_loops: int = 3, prescore: float = None):
+		profile = await self.aget_profile(jd)
+		if self.prescreen_threshold is not None:
+			prescore, skipped = self.prescreen(profile, resume_text, prescore)
+			if skipped is not None:
+				return skipped
+		jd_text = profile.digest
+		tracker = self._tracker(max_loops)
+		cascade = Cascade(self.routing)
+		current_resume = resume_text
+		last_eval = None
+		last_builder = None
+		for iteration in range(max_loops):
+			with timed("flow_iteration", iteration=iteration):
+				with cascade.use("builder"):
+					if self._use_sections(last_builder):
+						builder_result = await self.resume_builder.abuild_sections(
+							current_resume, jd_text, last_builder["sections"], self.section_threshold
+						)
+					elif self.incremental:
+						builder_result = await self.resume_builder.abuild_incremental(current_resume, jd_text, self.section_threshold)
+					else:
+						builder_result = await self.resume_builder.abuild(current_resume, jd_text)
+				tracker.llm_calls += self._builder_calls(builder_result)
+				revised = builder_result.get("revised_resume", current_resume)
+				evaluation = tracker.local_evaluation(builder_result)
+				if evaluation is None and revised == current_resume and last_eval is not None:
+					# nothing changed since the last evaluation (e.g. no weak sections left); carry it forward
+					evaluation = last_eval
+				if evaluation is None:
+					with cascade.use("supervisor"):
+						evaluation = await self.supervisor.aevaluate(revised, jd_text)
+					tracker.llm_calls += 1
+				last_eval = evaluation
+				last_builder = builder_result
+				# the revision diff is CPU-bound; keep it off the loop the rest of the batch runs on
+				stop = await asyncio.to_thread(tracker.observe, revised, builder_result, evaluation)
+				stop = stop and not self._escalate(cascade, tracker, iteration, builder_result, evaluation)
+			if stop:
+				return self._result(revised, builder_result, evaluation, tracker, cascade)
+			current_resume = revised
+		return self._result(current_resume, last_builder, last_eval, tracker, cascade)
+
+	def _use_sections(self, last_builder: dict) -> bool:
+		return (self.section_mode or self.incremental) and bool(last_builder and last_builder.get("sections"))
+
+	@staticmethod
+	def _builder_calls(builder_result: dict) -> int:
+		# section builds report the sections actually sent to the LLM (memo hits are free)
+		return len(builder_result["rebuilt_sections"]) if "rebuilt_sections" in builder_result else 1
+
+	@staticmethod
+	def _routed(cascade: Cascade, role: str, events):
+		"""Drive an agent's event generator with the role's model selected only while it runs."""
+		while True:
+			with cascade.use(role):
+				event = next(events, None)
+			if event is None:
+				return
+			yield event
+
+	@staticmethod
+	def _escalate(cascade: Cascade, tracker: LoopTracker, iteration: int, builder_result: dict, evaluation: dict) -> bool:
+		"""Instead of stopping on a stall or an unparseable reply, move up a model tier and keep looping."""
+		if builder_result.get("parse_error") or evaluation.get("parse_error"):
+			reason = "parse_error"
+		elif tracker.stop_reason == "plateau":
+			reason = "plateau"
+		else:
+			return False
+		if iteration + 1 >= tracker.max_loops or not cascade.escalate(iteration, reason):
+			return False
+		tracker.stop_reason = None
+		return True
+
+	def _tracker(self, max_loops: int) -> LoopTracker:
+		return LoopTracker(max_loops, self.similarity_threshold, self.plateau_delta, self.local_approve_score)
+
+	def _result(self, resume: str, builder_result: dict, evaluation: dict, tracker: LoopTracker, cascade: Cascade) -> dict:
+		result = {
+			"resume": resume,
+			"builder": builder_result,
+			"evaluation": evaluation,
+			"loop_stats": tracker.stats()
 		}
+		if tracker.stop_reason is None:
+			result["note"] = "Max rebuild attempts reached."
+		elif tracker.stop_reason != "approved":
+			result["note"] = f"Stopped early: {tracker.stop_reason}."
+		if cascade.policy is not None:
+			result["routing"] = cascade.stats()
+		run = current_run()
+		if run is not None:
+			result["metrics"] = run.summary()
+			record({
+				"kind": "flow_run",
+				"duration": result["metrics"]["wall_time"],
+				"loops": tracker.loops,
+				"stop_reason": tracker.stop_reason or "max_loops"
+			})
+		return result
+
+	async def run_batch(self, pairs, concurrency: int = 8, max_loops: int = 3):
+		"""Run many (JD, resume) pairs with at most ``concurrency`` flows in flight.
+
+		``pairs`` is any iterable of dicts with ``id``, ``resume_text`` and either ``jd_profile``
+		or ``jd_text`` (each distinct JD is analyzed only once); it is consumed lazily, in chunks of
+		PRESCREEN_BATCH, so large inputs never sit in memory. With a pre-screen threshold each chunk is
+		scored in one vectorized pass per JD. Results are yielded in completion order as dicts carrying
+		the pair's ``id`` plus either the flow result or an ``error``.
+		"""
+		iterator = iter(pairs)
+		buffered = []
+		pending = set()
+		exhausted = False
+		while True:
+			while not exhausted and len(pending) < concurrency:
+				if not buffered:
+					# pulling pairs can read and extract files, so it runs off the event loop
+					buffered = await asyncio.to_thread(lambda: list(itertools.islice(iterator, PRESCREEN_BATCH)))
+					if not buffered:
+						exhausted = True
+						break
+					if self.prescreen_threshold is not None:
+						buffered = await self._prescreen_batch(buffered)
+					buffered.reverse()
+				pending.add(asyncio.ensure_future(self._run_pair(buffered.pop(), max_loops)))
+			if not pending:
+				break
+			done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+			for task in done:
+				yield task.result()
+
+	async def _prescreen_batch(self, pairs: list) -> list:
+		"""Copies of ``pairs`` with their JD profile resolved and a ``prescore`` from one scoring pass per JD.
+
+		A pair whose JD fails to analyze is passed on unchanged so its own run reports the error.
+		"""
+		jds = {}
+		for pair in pairs:
+			jd = pair.get("jd_profile") or pair.get("jd_text")
+			if isinstance(jd, str) and jd not in jds:
+				jds[jd] = None
+		if jds:
+			profiles = await asyncio.gather(*(self.aget_profile(jd) for jd in jds), return_exceptions=True)
+			jds = dict(zip(jds, profiles))
+		groups = {}
+		for i, pair in enumerate(pairs):
+			profile = pair.get("jd_profile") or jds.get(pair.get("jd_text"))
+			if isinstance(profile, JDProfile):
+				groups.setdefault(profile.jd_hash, (profile, []))[1].append(i)
+		scored = list(pairs)
+		for profile, rows in groups.values():
+			scorer = self._scorer(profile)
+			if scorer is None:
+				continue
+			match = scorer.score([parse_resume(pairs[i]["resume_text"]) for i in rows]).match[:, 0]
+			for i, score in zip(rows, match):
+				scored[i] = {**pairs[i], "jd_profile": profile, "prescore": float(score)}
+		return scored
+
+	async def run_matches(self, resume_text: str, index, top_k: int = 5, concurrency: int = 4, max_loops: int = 3):
+		"""Refine one resume for its ``top_k`` best JDs in a JDIndex; the rest never reach the LLM loop.
+
+		Yields run_batch records (``id`` is the JD ID) with the local ``match_score`` and ``matched_terms``.
+		"""
+		matches = index.top_k(parse_resume(resume_text), top_k)
+		scores = {jd_id: (score, terms) for jd_id, score, terms in matches}
+		pairs = ({"id": jd_id, "jd_profile": index.profile(jd_id), "resume_text": resume_text} for jd_id, _, _ in matches)
+		async for result in self.run_batch(pairs, concurrency=concurrency, max_loops=max_loops):
+			score, terms = scores[result["id"]]
+			yield {**result, "match_score": round(score, 4), "matched_terms": terms}
+
+	async def _run_pair(self, pair: dict, max_loops: int) -> dict:
+		# batch work yields to interactive UI traffic in the shared rate-limit scheduler
+		set_priority(BATCH)
+		try:
+			jd = pair.get("jd_profile") or pair["jd_text"]
+			if self.dedup is not None:
+				result = await self._arun_deduped(pair.get("id"), jd, pair["resume_text"], max_loops, pair.get("prescore"))
+			else:
+				result = await self.arun(jd, pair["resume_text"], max_loops=max_loops, prescore=pair.get("prescore"))
+		except Exception as e:
+			return {"id": pair.get("id"), "error": str(e)}
+		return {"id": pair.get("id"), **result}
+
+	async def _arun_deduped(self, pair_id, jd, resume_text: str, max_loops: int, prescore: float = None) -> dict:
+		profile = await self.aget_profile(jd)
+		entry, earlier, score = self.dedup.claim(pair_id, profile.jd_hash, resume_text)
+		result = None
+		try:
+			if earlier is not None:
+				# an in-flight duplicate is awaited rather than run twice; a finished one has dropped its future
+				future = earlier.future
+				if future is not None:
+					await asyncio.wrap_future(future)
+				result = self.dedup.reuse(earlier, resume_text, score)
+			if result is None:
+				result = await self.arun(profile, resume_text, max_loops=max_loops, prescore=prescore)
+				if earlier is not None:
+					result["dedup"] = {"near": earlier.pair_id, "similarity": round(score, 4)}
+			return result
+		finally:
+			self.dedup.finish(entry, result)
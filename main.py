@@ -1,13 +1,10 @@
+import argparse
+import asyncio
 import os
 from dotenv import load_dotenv
 from graph.resume_flow import ResumeFlow
 
-def main():
-	load_dotenv()
-	groq_api_key = os.getenv("GROQ_API_KEY")
-	if not groq_api_key:
-		raise ValueError("GROQ_API_KEY not found in .env file.")
-
+def run_sample(groq_api_key):
 	# Sample inputs
 	jd_text = """
 	We are seeking a Python developer with experience in data analysis, machine learning, and cloud deployment. The ideal candidate is proactive, detail-oriented, and comfortable working in a fast-paced environment. Key skills: Python, Pandas, Scikit-learn, AWS, communication.
@@ -24,6 +21,129 @@ def main():
 	print("\nEvaluation:\n", result["evaluation"])
 	if "note" in result:
 		print("\nNote:", result["note"])
+	print("\nMetrics:", result["metrics"])
+
+def _routing(args):
+	from agents.routing import RoutingPolicy
+
+	return RoutingPolicy.from_spec(args.routes) if args.routes else None
+
+def run_batch(groq_api_key, args):
+	from graph.batch import compact_results, iter_directory_pairs, iter_jsonl_pairs, run_batch_to_jsonl
+
+	from utils.metrics import JsonlTraceWriter, get_metrics, start_metrics_server
+
+	if args.trace:
+		get_metrics().add_hook(JsonlTraceWriter(args.trace))
+	if args.metrics_port:
+		start_metrics_server(args.metrics_port)
+		print(f"Serving Prometheus metrics on :{args.metrics_port}/metrics")
+
+	flow = ResumeFlow(groq_api_key, prescreen_threshold=args.min_score, local_approve_score=args.local_approve_score,
+		section_mode=args.section_mode, routing=_routing(args), dedup_threshold=args.dedup_threshold,
+		incremental=args.incremental)
+	# failed IDs are retried, so their old error lines are dropped first
+	skip_ids = compact_results(args.output)
+	if os.path.isdir(args.input):
+		if not args.jd:
+			raise ValueError("--jd is required when --input is a directory of resumes.")
+		with open(args.jd, encoding="utf-8") as f:
+			jd_text = f.read()
+		pairs = iter_directory_pairs(args.input, flow.get_profile(jd_text), skip_ids)
+	else:
+		pairs = iter_jsonl_pairs(args.input, skip_ids)
+
+	written = asyncio.run(run_batch_to_jsonl(flow, pairs, args.output, args.concurrency, args.max_loops))
+	print(f"Wrote {written} results to {args.output} ({len(skip_ids)} already done).")
+	if flow.dedup is not None:
+		print("Near-duplicates:", flow.dedup.stats())
+
+def run_match(groq_api_key, args):
+	import json
+
+	from graph.batch import build_jd_index, iter_jd_texts
+	from utils.ingestion import extract_text_from_path
+
+	flow = ResumeFlow(groq_api_key, local_approve_score=args.local_approve_score, section_mode=args.section_mode,
+		routing=_routing(args))
+	index, failed = asyncio.run(build_jd_index(flow, iter_jd_texts(args.jds)))
+	for jd_id, error in failed.items():
+		print(f"Skipped JD {jd_id}: {error}")
+	resume_text = extract_text_from_path(args.resume)
+
+	async def collect():
+		return [record async for record in flow.run_matches(resume_text, index, args.top_k, args.concurrency, args.max_loops)]
+
+	records = sorted(asyncio.run(collect()), key=lambda r: -r["match_score"])
+	with open(args.output, "w", encoding="utf-8") as out:
+		for record in records:
+			out.write(json.dumps(record, ensure_ascii=False) + "\n")
+	for record in records:
+		effectiveness = record.get("evaluation", {}).get("effectiveness", record.get("error", ""))
+		print(f"{record['match_score']:.3f}  {record['id']}  {effectiveness}")
+	print(f"Refined against the top {len(records)} of {len(index)} JDs; results in {args.output}.")
+
+def run_export(args):
+	from graph.batch import iter_refined_resumes
+	from utils.export import EXPORT_WORKERS, export_batch
+
+	formats = [fmt.strip() for fmt in args.formats.split(",") if fmt.strip()]
+	written = export_batch(iter_refined_resumes(args.input), formats, out_dir=args.output_dir, zip_file=args.zip,
+		workers=args.workers or EXPORT_WORKERS)
+	print(f"Wrote {written} files to {args.zip or args.output_dir}.")
+
+def main():
+	parser = argparse.ArgumentParser(description="Resume multi-agent system")
+	subparsers = parser.add_subparsers(dest="command")
+	batch = subparsers.add_parser("batch", help="Screen many resumes from a JSONL file or a directory")
+	batch.add_argument("--input", required=True, help="JSONL of {id, jd_text, resume_text|resume_path} or a directory of PDF/DOCX/TXT resumes")
+	batch.add_argument("--output", required=True, help="JSONL file results are appended to; reruns skip IDs already in it")
+	batch.add_argument("--jd", help="Job description text file (required with a directory input)")
+	batch.add_argument("--concurrency", type=int, default=8)
+	batch.add_argument("--max-loops", type=int, default=3)
+	batch.add_argument("--min-score", type=float, default=None, help="Skip the LLM loop for resumes whose local match score (0-1) is below this")
+	batch.add_argument("--local-approve-score", type=float, default=None, help="Approve without the Supervisor when every builder section scores at least this (0-5)")
+	batch.add_argument("--section-mode", action="store_true", help="After the first pass, rebuild only weak sections")
+	batch.add_argument("--routes", help="Model cascade, e.g. 'builder=llama-3.1-8b-instant>llama-3.3-70b-versatile,supervisor=llama-3.1-8b-instant'")
+	batch.add_argument("--incremental", action="store_true", help="Build the first pass section by section through the section memo, so resumes sharing sections only re-request the ones that differ")
+	batch.add_argument("--dedup-threshold", type=float, default=None, help="Reuse the result of an earlier near-duplicate resume for the same JD at this MinHash similarity (0-1), e.g. 0.9")
+	batch.add_argument("--metrics-port", type=int, default=None, help="Serve Prometheus metrics on this port while the batch runs")
+	batch.add_argument("--trace", help="Append every instrumentation event (LLM calls, parses, iterations) to this JSONL file")
+	match = subparsers.add_parser("match", help="Find and refine for the best-matching JDs for one resume")
+	match.add_argument("--resume", required=True, help="Resume file (PDF/DOCX/TXT)")
+	match.add_argument("--jds", required=True, help="Directory of JD .txt files or a JSONL of {id, jd_text}")
+	match.add_argument("--output", required=True, help="JSONL file for the refined top-k results")
+	match.add_argument("--top-k", type=int, default=5, help="Only this many best local matches go through the LLM loop")
+	match.add_argument("--concurrency", type=int, default=4)
+	match.add_argument("--max-loops", type=int, default=3)
+	match.add_argument("--local-approve-score", type=float, default=None, help="Approve without the Supervisor when every builder section scores at least this (0-5)")
+	match.add_argument("--section-mode", action="store_true", help="After the first pass, rebuild only weak sections")
+	match.add_argument("--routes", help="Model cascade, e.g. 'builder=llama-3.1-8b-instant>llama-3.3-70b-versatile,supervisor=llama-3.1-8b-instant'")
+	export = subparsers.add_parser("export", help="Render refined resumes from a batch/match results JSONL to PDF/DOCX")
+	export.add_argument("--input", required=True, help="Results JSONL written by the batch or match command")
+	export.add_argument("--formats", default="pdf,docx", help="Comma-separated formats (pdf, docx)")
+	destination = export.add_mutually_exclusive_group(required=True)
+	destination.add_argument("--output-dir", help="Directory to write one file per result and format into")
+	destination.add_argument("--zip", help="Zip archive to write all files into")
+	export.add_argument("--workers", type=int, default=None, help="Rendering processes (default RESUME_EXPORT_WORKERS)")
+	args = parser.parse_args()
+
+	if args.command == "export":
+		# rendering needs no LLM, so no API key either
+		run_export(args)
+		return
+
+	load_dotenv()
+	groq_api_key = os.getenv("GROQ_API_KEY")
+	if not groq_api_key:
+		raise ValueError("GROQ_API_KEY not found in .env file.")
+
+	if args.command == "batch":
+		run_batch(groq_api_key, args)
+	elif args.command == "match":
+		run_match(groq_api_key, args)
+	else:
+		run_sample(groq_api_key)
 
 if __name__ == "__main__":
 	main()
@@ -0,0 +1,77 @@
+import asyncio
+import json
+
+from agents.jd_analyzer import JDAnalyzer
+from agents.jd_profile import JDProfileStore
+from agents.llm_cache import LLMCache
+from agents.supervisor import Supervisor
+from bench.fake_llm import FakeChatModel
+
+RESUME = "Summary\nPython developer.\n"
+JD = "Senior Python developer. Needs AWS."
+EVALUATION = {"effectiveness": "effective", "feedback": "Mention AWS.", "request_rebuild": False, "section_scores": {}}
+
+
+def _agent(cls, responses, **kwargs):
+	agent = cls("test-key", cache=LLMCache(), **kwargs)
+	agent.scheduler = None
+	agent.call_policy = None
+	agent.llm = FakeChatModel(latency=0.0, responses=responses)
+	return agent
+
+
+def _without(field: str) -> str:
+	return json.dumps({key: value for key, value in EVALUATION.items() if key != field})
+
+
+def test_missing_field_is_repaired_and_both_replies_cached():
+	agent = _agent(Supervisor, [_without("feedback"), json.dumps({"feedback": "Mention AWS."})])
+	assert agent.evaluate(RESUME, JD)["feedback"] == "Mention AWS."
+	assert agent.llm.calls == 2
+	# the broken reply is asked for again, its repair comes from the cache
+	agent.llm = FakeChatModel(latency=0.0, responses=[_without("feedback")])
+	assert agent.evaluate(RESUME, JD)["feedback"] == "Mention AWS."
+	assert agent.llm.calls == 1
+
+
+def test_failed_repair_is_not_replayed_after_the_model_recovers():
+	agent = _agent(Supervisor, [_without("feedback"), "{}"])
+	assert agent.evaluate(RESUME, JD)["feedback"] == ""
+	# same broken reply again, but this time the repair succeeds
+	agent.llm = FakeChatModel(latency=0.0, responses=[_without("feedback"), json.dumps({"feedback": "Mention AWS."})])
+	assert agent.evaluate(RESUME, JD) == EVALUATION
+	assert agent.llm.calls == 2
+	assert agent.cache.hits == 0
+
+
+def test_failed_repair_is_not_replayed_async():
+	agent = _agent(Supervisor, [_without("effectiveness"), '{"effectiveness": 3'])
+	assert asyncio.run(agent.aevaluate(RESUME, JD))["parse_error"]
+	agent.llm = FakeChatModel(latency=0.0, responses=[_without("effectiveness"), '{"effectiveness": "effective"}'])
+	assert asyncio.run(agent.aevaluate(RESUME, JD)) == EVALUATION
+	assert agent.cache.hits == 0
+
+
+def test_recovered_model_replaces_a_broken_reply():
+	agent = _agent(Supervisor, [_without("feedback"), "{}"])
+	agent.evaluate(RESUME, JD)
+	agent.llm = FakeChatModel(latency=0.0, responses=[json.dumps(EVALUATION)])
+	assert agent.evaluate(RESUME, JD) == EVALUATION
+	assert agent.llm.calls == 1
+
+
+def test_truncated_analysis_is_not_replayed():
+	agent = _agent(JDAnalyzer, ['{"skills": ["Python"'], profile_store=JDProfileStore())
+	assert agent.profile(JD).skills == []
+	agent.llm = FakeChatModel(latency=0.0, responses=[json.dumps({"skills": ["Python"], "tone": "formal", "keywords": ["AWS"]})])
+	profile = agent.profile(JD)
+	assert profile.skills == ["Python"] and profile.keywords == ["AWS"]
+	assert agent.llm.calls == 1
+
+
+def test_empty_analysis_is_not_replayed():
+	agent = _agent(JDAnalyzer, [json.dumps({"skills": [], "tone": "formal", "keywords": []})], profile_store=JDProfileStore())
+	assert agent.profile(JD).skills == []
+	agent.llm = FakeChatModel(latency=0.0, responses=[json.dumps({"skills": ["Python"], "tone": "formal", "keywords": ["AWS"]})])
+	assert agent.profile(JD).skills == ["Python"]
+	assert agent.llm.calls == 1
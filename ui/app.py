@@ -1,139 +1,64 @@
-
 import streamlit as st
-import tempfile
 import os
 # Add project root to sys.path for module imports
 import sys
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from agents.jd_profile import JDProfile
+from agents.llm_clients import prewarm
+from graph.jobs import DONE, FAILED, WorkerPool, get_default_job_store
 from graph.resume_flow import ResumeFlow
+from utils.export import create_docx, create_pdf
+from utils.ingestion import extract_text_from_file
+from utils.metrics import start_metrics_server
+from utils.scoring import score_resume
+from utils.sections import parse_resume
 from dotenv import load_dotenv
 
-
-import docx2txt
-from PyPDF2 import PdfReader
 import io
-from docx import Document
-import re
-
-def extract_text_from_file(uploaded_file):
-    if uploaded_file.type == "application/pdf":
-        reader = PdfReader(uploaded_file)
-        text = "\n".join(page.extract_text() or "" for page in reader.pages)
-        return text
-    elif uploaded_file.type in ["application/vnd.openxmlformats-officedocument.wordprocessingml.document", "application/msword"]:
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".docx") as tmp:
-            tmp.write(uploaded_file.read())
-            tmp_path = tmp.name
-        text = docx2txt.process(tmp_path)
-        os.unlink(tmp_path)
-        return text
-    else:
-        return uploaded_file.read().decode("utf-8")
+import time
 
 # Helper to highlight improvements (simple diff)
 def highlight_changes(original, refined):
-    orig_lines = set(original.splitlines())
-    refined_lines = set(refined.splitlines())
-    added = refined_lines - orig_lines
+    refined = parse_resume(refined)
+    added = refined.added_lines(parse_resume(original))
     highlighted = []
-    for line in refined.splitlines():
+    for line in refined.text.splitlines():
         if line.strip() in added and line.strip():
             highlighted.append(f":green[**{line}**]")
         else:
             highlighted.append(line)
     return "\n".join(highlighted)
 
-# Wrapper for processing resume
-def process_resume(jd_text, resume_text):
-    result = flow.run(jd_text, resume_text)
-    supervisor_feedback = result["evaluation"].get("feedback", "No feedback.")
-    refined_resume = result["resume"]
-    return supervisor_feedback, refined_resume
-
-# Helper to create DOCX for download
-def create_docx(text):
-    doc = Document()
-    # Try to split and add headings for Skills, Experience, Education
-    sections = {"Skills": [], "Experience": [], "Education": [], "Other": []}
-    current = "Other"
-    for line in text.splitlines():
-        l = line.strip()
-        if re.match(r"skills?[:]?", l, re.I):
-            current = "Skills"
-            continue
-        elif re.match(r"experience[:]?", l, re.I):
-            current = "Experience"
-            continue
-        elif re.match(r"education[:]?", l, re.I):
-            current = "Education"
-            continue
-        if l:
-            sections[current].append(l)
-    # Add name/title if present
-    lines = text.splitlines()
-    if lines and lines[0].strip():
-        doc.add_heading(lines[0].strip(), 0)
-    # Add sections with headings
-    for sec in ["Skills", "Experience", "Education", "Other"]:
-        if sections[sec]:
-            doc.add_heading(sec, level=1)
-            for item in sections[sec]:
-                doc.add_paragraph(item)
-    buf = io.BytesIO()
-    doc.save(buf)
-    buf.seek(0)
-    return buf
-
-
-def create_pdf(text):
-    """Create a simple PDF from plain text using reportlab."""
-    try:
-        from reportlab.lib.pagesizes import letter
-        from reportlab.pdfgen import canvas
-    except Exception:
-        raise RuntimeError("reportlab is required to generate PDF. Install with: pip install reportlab")
-
-    buf = io.BytesIO()
-    c = canvas.Canvas(buf, pagesize=letter)
-    width, height = letter
-    margin = 72
-    y = height - margin
-    max_width = width - 2 * margin
-    # simple line wrap
-    from reportlab.pdfbase.pdfmetrics import stringWidth
-    lines = []
-    for paragraph in text.splitlines():
-        if not paragraph:
-            lines.append("")
-            continue
-        words = paragraph.split()
-        line = ""
-        for w in words:
-            test = (line + " " + w).strip()
-            if stringWidth(test, "Helvetica", 10) < max_width:
-                line = test
-            else:
-                lines.append(line)
-                line = w
-        if line:
-            lines.append(line)
-
-    for line in lines:
-        if y < margin:
-            c.showPage()
-            y = height - margin
-        c.setFont("Helvetica", 10)
-        c.drawString(margin, y, line)
-        y -= 12
-
-    c.save()
-    buf.seek(0)
-    return buf
-
 # Load environment variables
 load_dotenv()
 groq_api_key = os.getenv("GROQ_API_KEY")
-flow = ResumeFlow(groq_api_key)
+
+
+@st.cache_resource(show_spinner=False)
+def get_flow(groq_api_key):
+    # Built once per server process and shared by every session and rerun
+    # builds the clients now; the warm-up connection opens on a background thread
+    prewarm(groq_api_key, connect=True)
+    metrics_port = os.getenv("RESUME_METRICS_PORT")
+    if metrics_port:
+        start_metrics_server(int(metrics_port))
+    return ResumeFlow(groq_api_key, incremental=True)
+
+
+flow = get_flow(groq_api_key)
+
+
+@st.cache_resource(show_spinner=False)
+def get_workers(groq_api_key):
+    # One worker pool per server process; sessions only submit jobs and poll their progress,
+    # so a refinement keeps running across reruns and page reloads.
+    store = get_default_job_store()
+    store.requeue_interrupted()
+    return WorkerPool(get_flow(groq_api_key), store, workers=int(os.getenv("RESUME_JOB_WORKERS", "4"))).start()
+
+
+workers = get_workers(groq_api_key)
+jobs = workers.store
 
 st.set_page_config(page_title="Resume Multi-Agent", layout="wide")
 
@@ -175,28 +100,49 @@ with st.sidebar.expander("Inputs", expanded=True):
 
 
 
-# Enhanced process_resume for multiple iterations and chat turns
-def process_resume(jd_text, resume_text, max_loops=3):
+SUPERVISOR_BUBBLE = "<div style='text-align: right; background: #e6f7ff; padding: 10px; border-radius: 10px; margin: 5px 0;'>{}</div>"
+
+# Chat turns (input resume, then Supervisor feedback) for every finished iteration of a job
+def chat_turns_for(job):
     chat_turns = []
-    current_resume = resume_text
-    for i in range(max_loops):
-        result = flow.run(jd_text, current_resume, max_loops=1)
-        supervisor_feedback = result["evaluation"].get("feedback", "No feedback.")
-        refined_resume = result["resume"]
+    for turn in (job["progress"] or {}).get("turns", []):
         chat_turns.append({
             "role": "user",
-            "content": f"**Job Description:**\n{jd_text}\n\n**Resume:**\n{current_resume}",
+            "content": f"**Job Description:**\n{job['jd_text']}\n\n**Resume:**\n{turn['resume']}",
             "align": "left"
         })
         chat_turns.append({
             "role": "supervisor",
-            "content": f"**Supervisor Feedback:**\n{supervisor_feedback}",
+            "content": f"**Supervisor Feedback:**\n{turn['feedback']}",
             "align": "right"
         })
-        if not result["evaluation"].get("request_rebuild", False):
-            break
-        current_resume = refined_resume
-    return chat_turns, refined_resume, resume_text
+    return chat_turns
+
+
+# Live view of a running job: finished feedback plus whatever the agents are writing right now
+def render_progress(job):
+    progress = job["progress"] or {}
+    if job["status"] == "queued":
+        st.caption("Waiting for a free worker...")
+        return
+    iteration = progress.get("iteration", 0) + 1
+    stage = progress.get("stage")
+    if stage == "builder":
+        st.caption(f"Iteration {iteration}: rewriting resume...")
+    elif stage == "supervisor":
+        st.caption(f"Iteration {iteration}: supervisor reviewing...")
+    else:
+        st.caption("Analyzing and refining resume...")
+    for turn in progress.get("turns", []):
+        st.markdown(SUPERVISOR_BUBBLE.format(f"**Supervisor Feedback:**\n{turn['feedback']}"), unsafe_allow_html=True)
+    if progress.get("sections"):
+        st.markdown("\n".join(
+            f"- **{s['name']}** ({s.get('match_score', '?')}/5): {s.get('comments', '')}" for s in progress["sections"]
+        ))
+    if progress.get("partial_feedback"):
+        st.markdown(SUPERVISOR_BUBBLE.format(f"**Supervisor Feedback:**\n{progress['partial_feedback']}"), unsafe_allow_html=True)
+    if progress.get("partial_resume"):
+        st.text(progress["partial_resume"])
 
 if st.button("Analyze and Refine Resume"):
     if not uploaded_file or not jd_text.strip():
@@ -206,62 +152,66 @@ if st.button("Analyze and Refine Resume"):
         st.session_state.chat_history = []
         with st.spinner("Analyzing and refining resume..."):
             resume_text = extract_text_from_file(uploaded_file)
-            # Preliminary JD analysis for preview / scoring
+            # JD profile (analyzed once per JD, reused on reruns) for preview / scoring
             try:
-                jd_analysis = flow.jd_analyzer.analyze(jd_text)
+                jd_profile = flow.get_profile(jd_text)
             except Exception:
-                jd_analysis = {"skills": [], "tone": "", "keywords": []}
-
-            # compute simple scores
-            def compute_scores(jd_analysis, resume_text):
-                skills = jd_analysis.get("skills", []) or []
-                keywords = jd_analysis.get("keywords", []) or []
-                rt = (resume_text or "").lower()
-                skill_matches = sum(1 for s in skills if s.lower() in rt)
-                keyword_matches = sum(1 for k in keywords if k.lower() in rt)
-                skill_score = round((skill_matches / len(skills) * 5) if skills else 0, 1)
-                keyword_score = round((keyword_matches / len(keywords) * 5) if keywords else 0, 1)
-                tone = jd_analysis.get("tone", "").lower()
-                tone_score = 5.0 if tone and tone in rt else 3.0
-                # normalize
-                def clamp(x):
-                    if x is None:
-                        return 0.0
-                    return max(0.0, min(5.0, x))
-                return {"skill_score": clamp(skill_score), "keyword_score": clamp(keyword_score), "tone_score": clamp(tone_score)}
-
-            scores = compute_scores(jd_analysis, resume_text)
+                jd_profile = JDProfile.from_analysis(jd_text, {})
+            jd_analysis = jd_profile.analysis()
+
+            scores = score_resume(jd_profile, parse_resume(resume_text))
 
             # prepare improvisation ideas
-            missing_skills = [s for s in (jd_analysis.get("skills") or []) if s.lower() not in (resume_text or "").lower()]
+            matched_skills = set(jd_profile.matched_skills(resume_text))
+            missing_skills = [s for s in jd_profile.skills if s not in matched_skills]
             improv_ideas = []
             if missing_skills:
                 improv_ideas.append(f"Consider adding or emphasizing these skills: {', '.join(missing_skills[:8])}")
-            if jd_analysis.get("keywords"):
-                missing_kw = [k for k in jd_analysis.get("keywords") if k.lower() not in (resume_text or "").lower()]
+            if jd_profile.keywords:
+                matched_kw = set(jd_profile.matched_keywords(resume_text))
+                missing_kw = [k for k in jd_profile.keywords if k not in matched_kw]
                 if missing_kw:
                     improv_ideas.append(f"Include important keywords: {', '.join(missing_kw[:8])}")
 
-            # Run iterative refinement
-            chat_turns, refined_resume, original_resume = process_resume(jd_text, resume_text, max_loops=max_iterations)
-            st.session_state.original_resume = original_resume
-            st.session_state.refined_resume = refined_resume
-            st.session_state.chat_history.extend(chat_turns)
-
-            # store analysis preview in session for right column
-            st.session_state.jd_analysis = jd_analysis
-            st.session_state.scores = scores
-            st.session_state.improv_ideas = improv_ideas
-            st.session_state.uploaded_type = uploaded_file.type
-
-
+            # Refinement runs in the background worker pool; this session just polls the job
+            job_id = jobs.submit(jd_text, resume_text, max_loops=int(max_iterations), meta={
+                "jd_analysis": jd_analysis,
+                "scores": scores,
+                "improv_ideas": improv_ideas,
+                "uploaded_type": uploaded_file.type,
+            })
+            workers.notify()
+            st.session_state.job_id = job_id
+            st.session_state.original_resume = resume_text
+            st.session_state.refined_resume = None
+            st.query_params["job"] = job_id
+
+# Pick a job back up after a page reload
+if "job_id" not in st.session_state and "job" in st.query_params:
+    st.session_state.job_id = st.query_params["job"]
+
+job = jobs.get(st.session_state.job_id) if st.session_state.get("job_id") else None
+poll_job = False
+if job is not None:
+    # analysis preview is stored with the job so it survives reloads too
+    for key, value in (job["meta"] or {}).items():
+        st.session_state[key] = value
+    st.session_state.original_resume = job["resume_text"]
+    if job["status"] == DONE:
+        st.session_state.chat_history = chat_turns_for(job)
+        st.session_state.refined_resume = job["result"]["resume"]
+    elif job["status"] == FAILED:
+        st.error(f"Refinement failed: {job['error']}")
+    else:
+        render_progress(job)
+        poll_job = True
 
 
 # Show only Supervisor Feedback (right-aligned) in chat window
 for msg in st.session_state.chat_history:
     if msg.get("align") == "right":
         with st.container():
-            st.markdown(f"<div style='text-align: right; background: #e6f7ff; padding: 10px; border-radius: 10px; margin: 5px 0;'>{msg['content']}</div>", unsafe_allow_html=True)
+            st.markdown(SUPERVISOR_BUBBLE.format(msg['content']), unsafe_allow_html=True)
 
 # Feedback & Analysis section (appears under Supervisor feedback)
 jd_analysis = st.session_state.get("jd_analysis")
@@ -310,14 +260,14 @@ if st.session_state.refined_resume:
     if prefer_same and uploaded_type:
         if "pdf" in uploaded_type:
             try:
-                out_buf = create_pdf(st.session_state.refined_resume)
+                out_buf = create_pdf(parse_resume(st.session_state.refined_resume))
                 out_filename = "refined_resume.pdf"
                 out_mime = "application/pdf"
             except Exception as e:
                 st.warning(f"PDF generation failed: {e}. Falling back to DOCX.")
-                out_buf = create_docx(st.session_state.refined_resume)
+                out_buf = create_docx(parse_resume(st.session_state.refined_resume))
         elif "word" in uploaded_type or "officedocument.wordprocessingml" in uploaded_type or "docx" in uploaded_type:
-            out_buf = create_docx(st.session_state.refined_resume)
+            out_buf = create_docx(parse_resume(st.session_state.refined_resume))
             out_filename = "refined_resume.docx"
             out_mime = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
         elif "text" in uploaded_type or "plain" in uploaded_type:
@@ -325,10 +275,10 @@ if st.session_state.refined_resume:
             out_filename = "refined_resume.txt"
             out_mime = "text/plain"
         else:
-            out_buf = create_docx(st.session_state.refined_resume)
+            out_buf = create_docx(parse_resume(st.session_state.refined_resume))
     else:
         # default to DOCX
-        out_buf = create_docx(st.session_state.refined_resume)
+        out_buf = create_docx(parse_resume(st.session_state.refined_resume))
 
     if out_buf is not None:
         st.download_button(
@@ -337,3 +287,8 @@ if st.session_state.refined_resume:
             file_name=out_filename,
             mime=out_mime,
         )
+
+# Keep polling a running job; the rest of the page has rendered by now
+if poll_job:
+    time.sleep(1)
+    st.rerun()
@@ -0,0 +1,199 @@
+import functools
+import io
+import itertools
+import os
+import zipfile
+from multiprocessing import Pool
+
+from docx import Document
+
+from utils.ingestion import TextCache
+from utils.metrics import instrumented
+from utils.sections import parse_resume
+
+# Sections that get their own DOCX heading; everything else is listed under "Other"
+DOCX_SECTIONS = ("Skills", "Experience", "Education")
+
+PDF_FONT = "Helvetica"
+PDF_FONT_SIZE = 10
+PDF_LEADING = 12
+PDF_MARGIN = 72
+
+EXPORT_FORMATS = ("pdf", "docx")
+EXPORT_WORKERS = int(os.getenv("RESUME_EXPORT_WORKERS", str(min(4, os.cpu_count() or 1))))
+
+# Rendered bytes by (format, resume hash), so Streamlit reruns and repeated downloads skip rendering
+export_cache = TextCache(max_items=64)
+
+
+@functools.lru_cache(maxsize=1)
+def _docx_template() -> bytes:
+	# python-docx re-reads its default template from disk for every Document(); keep the bytes instead
+	buf = io.BytesIO()
+	Document().save(buf)
+	return buf.getvalue()
+
+
+@functools.lru_cache(maxsize=65536)
+def word_width(word: str, font: str = PDF_FONT, size: float = PDF_FONT_SIZE) -> float:
+	"""Rendered width of one word, cached; standard PDF fonts have no kerning, so widths add up."""
+	from reportlab.pdfbase.pdfmetrics import stringWidth
+
+	return stringWidth(word, font, size)
+
+
+def wrap_lines(text: str, max_width: float, font: str = PDF_FONT, size: float = PDF_FONT_SIZE) -> list:
+	"""Greedy word wrap in one pass per paragraph, summing cached word widths instead of
+	re-measuring the growing line for every word."""
+	space = word_width(" ", font, size)
+	lines = []
+	for paragraph in text.splitlines():
+		if not paragraph:
+			lines.append("")
+			continue
+		line = []
+		line_width = 0.0
+		for word in paragraph.split():
+			width = word_width(word, font, size)
+			if not line:
+				line, line_width = [word], width
+			elif line_width + space + width < max_width:
+				line.append(word)
+				line_width += space + width
+			else:
+				lines.append(" ".join(line))
+				line, line_width = [word], width
+		if line:
+			lines.append(" ".join(line))
+	return lines
+
+
+def render_docx(text) -> bytes:
+	parsed = parse_resume(text)
+	doc = Document(io.BytesIO(_docx_template()))
+	sections = {"Skills": [], "Experience": [], "Education": [], "Other": []}
+	for section in parsed.sections:
+		group = section.name if section.name in DOCX_SECTIONS else "Other"
+		if group == "Other" and section.heading.strip():
+			sections["Other"].append(section.heading.strip())
+		sections[group].extend(line.strip() for line in section.body.splitlines() if line.strip())
+	# Add name/title if present
+	title = parsed.text.split("\n", 1)[0].strip()
+	if title:
+		doc.add_heading(title, 0)
+	# Add sections with headings
+	for sec in ["Skills", "Experience", "Education", "Other"]:
+		if sections[sec]:
+			doc.add_heading(sec, level=1)
+			for item in sections[sec]:
+				doc.add_paragraph(item)
+	buf = io.BytesIO()
+	doc.save(buf)
+	return buf.getvalue()
+
+
+def render_pdf(text) -> bytes:
+	try:
+		from reportlab.lib.pagesizes import letter
+		from reportlab.pdfgen import canvas
+	except Exception:
+		raise RuntimeError("reportlab is required to generate PDF. Install with: pip install reportlab")
+
+	buf = io.BytesIO()
+	c = canvas.Canvas(buf, pagesize=letter)
+	width, height = letter
+	y = height - PDF_MARGIN
+	c.setFont(PDF_FONT, PDF_FONT_SIZE)
+	for line in wrap_lines(parse_resume(text).text, width - 2 * PDF_MARGIN):
+		if y < PDF_MARGIN:
+			c.showPage()
+			# showPage resets the graphics state, font included
+			c.setFont(PDF_FONT, PDF_FONT_SIZE)
+			y = height - PDF_MARGIN
+		c.drawString(PDF_MARGIN, y, line)
+		y -= PDF_LEADING
+	c.save()
+	return buf.getvalue()
+
+
+_RENDERERS = {"pdf": render_pdf, "docx": render_docx}
+
+
+def render(text, fmt: str) -> bytes:
+	"""``fmt`` (pdf or docx) bytes of a resume (text or ParsedResume), memoized by resume hash."""
+	if fmt not in _RENDERERS:
+		raise ValueError(f"Unknown export format: {fmt}")
+	parsed = parse_resume(text)
+	key = TextCache.make_key(parsed.text.encode("utf-8"), fmt)
+	data = export_cache.get(key)
+	if data is None:
+		data = _RENDERERS[fmt](parsed)
+		export_cache.set(key, data)
+	return data
+
+
+@instrumented("export", lambda text: "docx")
+def create_docx(text):
+	"""DOCX with the resume's Skills/Experience/Education under headings; ``text`` may be a ParsedResume."""
+	return io.BytesIO(render(text, "docx"))
+
+
+@instrumented("export", lambda text: "pdf")
+def create_pdf(text):
+	"""Create a simple PDF from plain text (or a ParsedResume) using reportlab."""
+	return io.BytesIO(render(text, "pdf"))
+
+
+def _render_file(job: tuple) -> tuple:
+	name, text, fmt = job
+	# the full ID is kept: "alice.pdf" and "alice.docx" are different resumes
+	return f"{name}.{fmt}", fmt, render(text, fmt)
+
+
+def export_batch(items, formats=("pdf",), out_dir: str = None, zip_file=None, workers: int = EXPORT_WORKERS,
+		chunksize: int = 8) -> int:
+	"""Render (name, resume text) pairs to every format in ``formats`` across a process pool.
+
+	Each file (``name`` plus the format's extension) is written into ``out_dir`` or added to ``zip_file``
+	(a path or a writable binary stream) as soon as it is rendered. Jobs are handed to the pool a bounded
+	window at a time, so memory stays flat however many items there are. Returns the number of files written.
+	"""
+	if (out_dir is None) == (zip_file is None):
+		raise ValueError("Pass exactly one of out_dir or zip_file.")
+	unknown = set(formats) - set(EXPORT_FORMATS)
+	if unknown:
+		raise ValueError(f"Unknown export formats: {', '.join(sorted(unknown))}")
+	jobs = ((name, text, fmt) for name, text in items for fmt in formats)
+	archive = zipfile.ZipFile(zip_file, "w", zipfile.ZIP_DEFLATED) if zip_file is not None else None
+	pool = Pool(workers) if workers > 1 else None
+	written = 0
+	try:
+		for path, fmt, data in _rendered(pool, jobs, workers * chunksize * 4, chunksize):
+			if archive is not None:
+				# DOCX is already a zip archive; deflating it again only costs time
+				archive.writestr(path, data, zipfile.ZIP_STORED if fmt == "docx" else zipfile.ZIP_DEFLATED)
+			else:
+				target = os.path.join(out_dir, path)
+				os.makedirs(os.path.dirname(os.path.abspath(target)), exist_ok=True)
+				with open(target, "wb") as f:
+					f.write(data)
+			written += 1
+	finally:
+		if pool is not None:
+			pool.close()
+			pool.join()
+		if archive is not None:
+			archive.close()
+	return written
+
+
+def _rendered(pool, jobs, window: int, chunksize: int):
+	# Pool.imap_unordered drains its whole input up front, so it only ever sees one window of jobs
+	if pool is None:
+		yield from map(_render_file, jobs)
+		return
+	while True:
+		batch = list(itertools.islice(jobs, window))
+		if not batch:
+			return
+		yield from pool.imap_unordered(_render_file, batch, chunksize)
@@ -0,0 +1,163 @@
+import atexit
+import hashlib
+import io
+import os
+import re
+import threading
+import unicodedata
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+import docx2txt
+from PyPDF2 import PdfReader
+
+from utils.metrics import instrumented
+
+RESUME_EXTENSIONS = (".pdf", ".docx", ".txt")
+
+MIME_KINDS = {
+	"application/pdf": "pdf",
+	"application/vnd.openxmlformats-officedocument.wordprocessingml.document": "docx",
+	"application/msword": "docx",
+}
+
+# PDFs with at least this many pages are split across the process pool
+PARALLEL_PDF_PAGES = 8
+PDF_WORKERS = int(os.getenv("RESUME_PDF_WORKERS", str(min(4, os.cpu_count() or 1))))
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def normalize_text(text: str) -> str:
+	"""Canonical whitespace so identical documents give identical (and shorter) prompts.
+
+	NFKC folds ligatures and full-width forms from PDF extraction, runs of spaces/tabs inside a line
+	collapse to one space, trailing spaces go, and blank-line runs shrink to a single blank line.
+	Leading indentation is layout (nested bullets, aligned dates), so it is kept.
+	"""
+	text = unicodedata.normalize("NFKC", text.replace("\r\n", "\n").replace("\r", "\n"))
+	# NFKC already turns no-break spaces into spaces; zero-width spaces it leaves alone
+	text = text.replace("\u200b", "")
+	text = re.sub(r"(?<=\S)[ \t\f\v]+(?=\S)", " ", text)
+	text = re.sub(r"[ \t\f\v]+(?=\n|$)", "", text)
+	text = re.sub(r"\n{3,}", "\n\n", text)
+	return text.strip("\n") + "\n" if text.strip() else ""
+
+
+class TextCache:
+	"""Extracted text by content hash (LRU), so reruns and duplicate uploads skip extraction."""
+
+	def __init__(self, max_items: int = 256):
+		self.max_items = max_items
+		self._items = OrderedDict()
+		self._lock = threading.Lock()
+		self.hits = 0
+		self.misses = 0
+
+	@staticmethod
+	def make_key(data: bytes, kind: str) -> str:
+		return f"{kind}:{hashlib.sha256(data).hexdigest()}"
+
+	def get(self, key: str):
+		with self._lock:
+			text = self._items.get(key)
+			if text is None:
+				self.misses += 1
+				return None
+			self._items.move_to_end(key)
+			self.hits += 1
+			return text
+
+	def set(self, key: str, text: str):
+		with self._lock:
+			self._items[key] = text
+			self._items.move_to_end(key)
+			while len(self._items) > self.max_items:
+				self._items.popitem(last=False)
+
+	def clear(self):
+		with self._lock:
+			self._items.clear()
+
+	def stats(self) -> dict:
+		with self._lock:
+			return {"items": len(self._items), "hits": self.hits, "misses": self.misses}
+
+
+text_cache = TextCache()
+
+
+def _get_pool():
+	global _pool
+	with _pool_lock:
+		if _pool is None:
+			_pool = ProcessPoolExecutor(max_workers=PDF_WORKERS)
+			atexit.register(_pool.shutdown, wait=False)
+		return _pool
+
+
+def _pdf_pages(data: bytes, start: int, stop: int) -> str:
+	reader = PdfReader(io.BytesIO(data))
+	return "\n".join(reader.pages[i].extract_text() or "" for i in range(start, stop))
+
+
+def _extract_pdf(data: bytes) -> str:
+	page_count = len(PdfReader(io.BytesIO(data)).pages)
+	if PDF_WORKERS < 2 or page_count < PARALLEL_PDF_PAGES:
+		return _pdf_pages(data, 0, page_count)
+	step = -(-page_count // PDF_WORKERS)
+	ranges = [(start, min(start + step, page_count)) for start in range(0, page_count, step)]
+	pool = _get_pool()
+	futures = [pool.submit(_pdf_pages, data, start, stop) for start, stop in ranges]
+	return "\n".join(future.result() for future in futures)
+
+
+def _extract(data: bytes, kind: str) -> str:
+	if kind == "pdf":
+		return _extract_pdf(data)
+	if kind == "docx":
+		# docx2txt opens its argument with zipfile, which reads a file object as well as a path
+		return docx2txt.process(io.BytesIO(data))
+	return data.decode("utf-8", errors="replace")
+
+
+def extract_text(data: bytes, kind: str) -> str:
+	"""Normalized text of a ``pdf``, ``docx`` or ``txt`` document, cached by content hash."""
+	key = TextCache.make_key(data, kind)
+	text = text_cache.get(key)
+	if text is None:
+		text = normalize_text(_extract(data, kind))
+		text_cache.set(key, text)
+	return text
+
+
+@instrumented("extraction", lambda uploaded_file: uploaded_file.type)
+def extract_text_from_file(uploaded_file):
+	data = uploaded_file.getvalue() if hasattr(uploaded_file, "getvalue") else uploaded_file.read()
+	return extract_text(data, MIME_KINDS.get(uploaded_file.type, "txt"))
+
+
+@instrumented("extraction", lambda path: os.path.splitext(path)[1].lower().lstrip("."))
+def extract_text_from_path(path: str) -> str:
+	kind = os.path.splitext(path)[1].lower().lstrip(".")
+	with open(path, "rb") as f:
+		data = f.read()
+	return extract_text(data, kind if kind in ("pdf", "docx") else "txt")
+
+
+def iter_resume_paths(directory: str):
+	"""(relative path, path) of every PDF/DOCX/TXT file under ``directory``, in a stable order."""
+	for root, dirs, files in os.walk(directory):
+		dirs.sort()
+		for name in sorted(files):
+			if name.lower().endswith(RESUME_EXTENSIONS):
+				path = os.path.join(root, name)
+				yield os.path.relpath(path, directory), path
+
+
+def iter_directory_texts(directory: str, skip=frozenset()):
+	"""(relative path, text) for every resume under ``directory`` whose relative path is not in ``skip``."""
+	for rel_path, path in iter_resume_paths(directory):
+		if rel_path not in skip:
+			yield rel_path, extract_text_from_path(path)
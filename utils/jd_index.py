@@ -0,0 +1,118 @@
+import heapq
+import threading
+
+from agents.jd_profile import JDProfile
+from utils.scoring import KEYWORD_WEIGHT, SKILL_WEIGHT, doc_tokens, tokenize
+
+SKILL = 1
+KEYWORD = 2
+
+
+def normalize_term(term: str) -> str:
+	return " ".join(tokenize(term))
+
+
+class JDIndex:
+	"""Inverted index from normalized skill/keyword terms to the JDs that ask for them.
+
+	``query`` looks up each distinct n-gram of a resume once and walks only the postings it hits, so
+	its cost follows the matched postings rather than the number of JDs. Scores use the same 0-1
+	skill/keyword coverage blend as ``ScoreResult.match``.
+	"""
+
+	def __init__(self):
+		self._postings = {}
+		self._profiles = {}
+		self._sizes = {}
+		self._lock = threading.Lock()
+		self.max_ngram = 1
+
+	def __len__(self) -> int:
+		return len(self._profiles)
+
+	def __contains__(self, jd_id) -> bool:
+		return jd_id in self._profiles
+
+	@classmethod
+	def from_profiles(cls, profiles: dict) -> "JDIndex":
+		index = cls()
+		for jd_id, profile in profiles.items():
+			index.add(jd_id, profile)
+		return index
+
+	def profile(self, jd_id) -> JDProfile:
+		return self._profiles[jd_id]
+
+	def _terms(self, profile: JDProfile) -> dict:
+		terms = {}
+		for kind, values in ((SKILL, profile.skills), (KEYWORD, profile.keywords)):
+			for value in values:
+				term = normalize_term(value)
+				if term:
+					terms[term] = terms.get(term, 0) | kind
+		return terms
+
+	def add(self, jd_id, profile: JDProfile):
+		"""Index (or re-index) one JD."""
+		with self._lock:
+			if jd_id in self._profiles:
+				self._remove(jd_id)
+			terms = self._terms(profile)
+			for term, kinds in terms.items():
+				self._postings.setdefault(term, {})[jd_id] = kinds
+				self.max_ngram = max(self.max_ngram, term.count(" ") + 1)
+			self._profiles[jd_id] = profile
+			self._sizes[jd_id] = (
+				sum(1 for kinds in terms.values() if kinds & SKILL),
+				sum(1 for kinds in terms.values() if kinds & KEYWORD),
+			)
+
+	def remove(self, jd_id):
+		with self._lock:
+			if jd_id in self._profiles:
+				self._remove(jd_id)
+
+	def _remove(self, jd_id):
+		for term in self._terms(self._profiles.pop(jd_id)):
+			postings = self._postings.get(term)
+			if postings is not None:
+				postings.pop(jd_id, None)
+				if not postings:
+					del self._postings[term]
+		del self._sizes[jd_id]
+
+	def _resume_terms(self, resume_text) -> set:
+		tokens = doc_tokens(resume_text)
+		found = set()
+		for n in range(1, self.max_ngram + 1):
+			for i in range(len(tokens) - n + 1):
+				term = " ".join(tokens[i:i + n])
+				if term in self._postings:
+					found.add(term)
+		return found
+
+	def scores(self, resume_text: str) -> dict:
+		"""jd_id -> (match score, matched terms) for every JD sharing at least one term with the resume."""
+		with self._lock:
+			hits = {}
+			for term in self._resume_terms(resume_text):
+				for jd_id, kinds in self._postings[term].items():
+					entry = hits.get(jd_id)
+					if entry is None:
+						entry = hits[jd_id] = [0, 0, []]
+					entry[0] += bool(kinds & SKILL)
+					entry[1] += bool(kinds & KEYWORD)
+					entry[2].append(term)
+			results = {}
+			for jd_id, (skill_hits, keyword_hits, terms) in hits.items():
+				n_skills, n_keywords = self._sizes[jd_id]
+				score = (SKILL_WEIGHT * (skill_hits / n_skills if n_skills else 0.0)
+					+ KEYWORD_WEIGHT * (keyword_hits / n_keywords if n_keywords else 0.0))
+				results[jd_id] = (score, sorted(terms))
+			return results
+
+	def top_k(self, resume_text: str, k: int) -> list:
+		"""(jd_id, match score, matched terms) for the k best-matching JDs, best first."""
+		scores = self.scores(resume_text)
+		best = heapq.nlargest(k, scores.items(), key=lambda item: (item[1][0], len(item[1][1])))
+		return [(jd_id, score, terms) for jd_id, (score, terms) in best]
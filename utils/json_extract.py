@@ -0,0 +1,55 @@
+import json
+
+
+def extract_json(text: str):
+	"""Return the first JSON object embedded in ``text``, or None.
+
+	Tolerates code fences, leading/trailing prose and braces inside strings. The text is scanned
+	once, tracking string/escape state and brace depth, and only balanced spans are handed to
+	``json.loads`` (unlike a greedy ``{.*}`` regex, which grabs everything up to the last brace).
+	"""
+	if not text:
+		return None
+	depth = 0
+	start = None
+	in_string = False
+	escaped = False
+	for i, char in enumerate(text):
+		if depth:
+			if in_string:
+				if escaped:
+					escaped = False
+				elif char == "\\":
+					escaped = True
+				elif char == '"':
+					in_string = False
+				continue
+			if char == '"':
+				in_string = True
+			elif char == "{":
+				depth += 1
+			elif char == "}":
+				depth -= 1
+				if not depth:
+					try:
+						value = json.loads(text[start:i + 1])
+					except ValueError:
+						value = None
+					if isinstance(value, dict):
+						return value
+		elif char == "{":
+			depth = 1
+			start = i
+	return None
+
+
+def parse_json(text: str):
+	"""(object, how) where how is ``json`` (the whole text parsed), ``extracted`` or ``None`` (nothing found)."""
+	try:
+		value = json.loads(text)
+		if isinstance(value, dict):
+			return value, "json"
+	except (TypeError, ValueError):
+		pass
+	value = extract_json(text)
+	return value, "extracted" if value is not None else None
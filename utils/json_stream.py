@@ -0,0 +1,149 @@
+import json
+
+
+class IncrementalJSONParser:
+	"""Parse a JSON object as it streams in, token chunk by token chunk.
+
+	``feed`` returns events for what became readable in that chunk:
+
+	- ``{"type": "partial", "key": k, "value": text}``: a top-level string value still being streamed
+	- ``{"type": "member", "key": k, "name": n, "value": v}``: one complete member of a top-level object
+	- ``{"type": "field", "key": k, "value": v}``: a complete top-level value
+
+	Text before the first ``{`` (code fences, preambles) and after the closing ``}`` is ignored.
+	Each character is scanned and decoded once; only handing out a partial value copies the text so far.
+	"""
+
+	def __init__(self):
+		self.buffer = ""
+		self.result = {}
+		self.done = False
+		self._pos = 0
+		# frames: [kind ("obj"/"arr"), key, expecting ("key"/"colon"/"value"/"comma"), value_start]
+		self._stack = []
+		self._in_string = False
+		self._escape = False
+		self._string_start = None
+		# decoded prefix of the top-level string being streamed: (its string_start, raw offset decoded up to, text)
+		self._partial = (None, 0, "")
+
+	def feed(self, chunk: str) -> list:
+		events = []
+		self.buffer += chunk
+		buf = self.buffer
+		for i in range(self._pos, len(buf)):
+			if self.done:
+				break
+			c = buf[i]
+			if not self._stack:
+				if c == "{":
+					self._stack.append(["obj", None, "key", None])
+				continue
+			frame = self._stack[-1]
+			if self._in_string:
+				if self._escape:
+					self._escape = False
+				elif c == "\\":
+					self._escape = True
+				elif c == '"':
+					self._in_string = False
+					if frame[2] == "key":
+						frame[1] = json.loads(buf[self._string_start:i + 1])
+						frame[2] = "colon"
+					else:
+						self._complete(frame, i + 1, events)
+				continue
+			if c == '"':
+				self._in_string = True
+				self._string_start = i
+				if frame[2] == "value":
+					frame[3] = i
+			elif c == ":" and frame[2] == "colon":
+				frame[2] = "value"
+			elif c in "{[":
+				if frame[2] == "value" and frame[3] is None:
+					frame[3] = i
+				self._stack.append(["obj", None, "key", None] if c == "{" else ["arr", None, "value", None])
+			elif c in "}]":
+				self._complete(frame, i, events)
+				self._stack.pop()
+				if not self._stack:
+					self.done = True
+				else:
+					self._complete(self._stack[-1], i + 1, events)
+			elif c == ",":
+				self._complete(frame, i, events)
+				frame[2] = "key" if frame[0] == "obj" else "value"
+			elif not c.isspace() and frame[2] == "value" and frame[3] is None:
+				frame[3] = i
+		self._pos = len(buf)
+		if self._in_string and len(self._stack) == 1:
+			root = self._stack[0]
+			if root[2] == "value" and root[3] == self._string_start:
+				partial = self._partial_string()
+				if partial is not None:
+					events.append({"type": "partial", "key": root[1], "value": partial})
+		return events
+
+	def _complete(self, frame: list, end: int, events: list):
+		# ``frame`` is always the innermost open container
+		start = frame[3]
+		if start is None:
+			return
+		frame[3] = None
+		frame[2] = "comma"
+		if frame[0] != "obj":
+			return
+		try:
+			value = json.loads(self.buffer[start:end])
+		except ValueError:
+			return
+		depth = len(self._stack) - 1
+		if depth == 0:
+			self.result[frame[1]] = value
+			events.append({"type": "field", "key": frame[1], "value": value})
+		elif depth == 1 and self._stack[0][0] == "obj":
+			parent_key = self._stack[0][1]
+			events.append({"type": "member", "key": parent_key, "name": frame[1], "value": value})
+
+	def _partial_string(self):
+		"""Decoded text so far of the open top-level string, decoding only what arrived since the last call."""
+		start, pos, text = self._partial
+		if start != self._string_start:
+			start, pos, text = self._string_start, self._string_start + 1, ""
+		buf = self.buffer
+		end = _complete_escapes(buf, pos)
+		if end > pos:
+			try:
+				text += json.loads('"' + buf[pos:end] + '"')
+			except ValueError:
+				return None
+		self._partial = (start, end, text)
+		return text
+
+
+def _complete_escapes(buf: str, pos: int) -> int:
+	"""Offset up to which ``buf[pos:]`` (inside a JSON string, starting outside an escape) can be decoded:
+	stops before an escape sequence, or a surrogate pair, that has not fully arrived."""
+	end = len(buf)
+	i = pos
+	while i < end:
+		if buf[i] != "\\":
+			i += 1
+			continue
+		if i + 1 >= end:
+			break
+		step = 2
+		if buf[i + 1] == "u":
+			step = 6
+			if buf[i + 2:i + 4].lower() in ("d8", "d9", "da", "db"):
+				# a high surrogate decodes correctly only together with the low one after it
+				follow = buf[i + 6:i + 8]
+				if follow in ("", "\\") or (follow == "\\u" and i + 12 > end):
+					break
+				if follow == "\\u":
+					step = 12
+		if i + step > end:
+			break
+		i += step
+	return i
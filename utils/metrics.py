@@ -0,0 +1,302 @@
+import asyncio
+import contextlib
+import contextvars
+import functools
+import inspect
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+_current_run = contextvars.ContextVar("resume_run", default=None)
+
+
+def _label_key(labels: dict) -> tuple:
+	return tuple(sorted((k, str(v)) for k, v in (labels or {}).items()))
+
+
+def _format_labels(key: tuple, extra: tuple = ()) -> str:
+	pairs = list(key) + list(extra)
+	if not pairs:
+		return ""
+	return "{" + ",".join('{}="{}"'.format(k, v.replace("\\", "\\\\").replace('"', '\\"')) for k, v in pairs) + "}"
+
+
+class MetricsRegistry:
+	"""Counters and histograms for the pipeline plus event hooks.
+
+	Every instrumented step calls ``record(event)``; the registry updates its metrics from the
+	event, appends it to the active run (see ``run_scope``) and hands it to every hook.
+	"""
+
+	def __init__(self, buckets=DEFAULT_BUCKETS):
+		self.buckets = buckets
+		self._lock = threading.Lock()
+		self._counters = {}
+		self._histograms = {}
+		self._help = {}
+		self.hooks = []
+
+	def inc(self, name: str, value: float = 1, help_text: str = "", **labels):
+		with self._lock:
+			self._help.setdefault(name, help_text)
+			series = self._counters.setdefault(name, {})
+			key = _label_key(labels)
+			series[key] = series.get(key, 0) + value
+
+	def observe(self, name: str, value: float, help_text: str = "", **labels):
+		with self._lock:
+			self._help.setdefault(name, help_text)
+			series = self._histograms.setdefault(name, {})
+			key = _label_key(labels)
+			hist = series.get(key)
+			if hist is None:
+				hist = series[key] = {"buckets": [0] * len(self.buckets), "count": 0, "sum": 0.0}
+			for i, bound in enumerate(self.buckets):
+				if value <= bound:
+					hist["buckets"][i] += 1
+			hist["count"] += 1
+			hist["sum"] += value
+
+	def add_hook(self, hook):
+		self.hooks.append(hook)
+
+	def record(self, event: dict):
+		event.setdefault("ts", time.time())
+		kind = event["kind"]
+		if kind == "agent_call":
+			agent = event["agent"]
+			cache = "hit" if event.get("cache_hit") else "miss"
+			self.inc("resume_llm_calls_total", help_text="Agent LLM calls", agent=agent, model=event.get("model", ""),
+				cache=cache, outcome="error" if event.get("error") else "ok")
+			if not event.get("cache_hit"):
+				self.observe("resume_llm_call_seconds", event["duration"], "Agent LLM call wall time", agent=agent,
+					model=event.get("model", ""))
+				self.inc("resume_llm_tokens_total", event.get("prompt_tokens", 0), "LLM tokens", agent=agent, kind="prompt")
+				self.inc("resume_llm_tokens_total", event.get("completion_tokens", 0), "LLM tokens", agent=agent, kind="completion")
+				self.inc("resume_llm_retries_total", event.get("retries", 0), "Retried LLM attempts", agent=agent)
+				self.inc("resume_prompt_tokens_counted_total", event.get("prompt_tokens_counted", 0),
+					"Prompt tokens counted before sending", agent=agent, exact=str(bool(event.get("prompt_tokens_exact"))).lower())
+				if event.get("winner") == "hedge":
+					self.inc("resume_llm_hedge_wins_total", help_text="Calls won by the hedged request", agent=agent)
+		elif kind == "parse":
+			self.inc("resume_parse_total", help_text="Agent response parse outcomes", agent=event["agent"], outcome=event["outcome"])
+			if event.get("saves_loop"):
+				self.inc("resume_parse_loops_saved_total", help_text="Refinement loops avoided by repairing a response", agent=event["agent"])
+		elif kind == "flow_iteration":
+			self.observe("resume_flow_iteration_seconds", event["duration"], "One builder/supervisor iteration")
+		elif kind == "flow_run":
+			self.observe("resume_flow_run_seconds", event["duration"], "Whole ResumeFlow run")
+			self.inc("resume_flow_runs_total", help_text="ResumeFlow runs", stop_reason=event.get("stop_reason", ""))
+			self.inc("resume_flow_iterations_total", event.get("loops", 0), "ResumeFlow iterations")
+		elif kind == "dedup":
+			self.inc("resume_dedup_total", event.get("count", 1), "Batch pairs by near-duplicate outcome", outcome=event["outcome"])
+		elif kind in ("extraction", "export"):
+			self.observe(f"resume_{kind}_seconds", event["duration"], f"Document {kind} time", format=event.get("format", ""))
+		run = _current_run.get()
+		if run is not None:
+			run.add(event)
+		for hook in list(self.hooks):
+			try:
+				hook(event)
+			except Exception:
+				# a broken exporter must never break the pipeline
+				pass
+
+	def to_prometheus(self) -> str:
+		lines = []
+		with self._lock:
+			for name, series in sorted(self._counters.items()):
+				lines.append(f"# HELP {name} {self._help.get(name, '')}")
+				lines.append(f"# TYPE {name} counter")
+				for key, value in sorted(series.items()):
+					lines.append(f"{name}{_format_labels(key)} {value}")
+			for name, series in sorted(self._histograms.items()):
+				lines.append(f"# HELP {name} {self._help.get(name, '')}")
+				lines.append(f"# TYPE {name} histogram")
+				for key, hist in sorted(series.items()):
+					for bound, count in zip(self.buckets, hist["buckets"]):
+						lines.append(f"{name}_bucket{_format_labels(key, (('le', str(bound)),))} {count}")
+					lines.append(f"{name}_bucket{_format_labels(key, (('le', '+Inf'),))} {hist['count']}")
+					lines.append(f"{name}_sum{_format_labels(key)} {hist['sum']}")
+					lines.append(f"{name}_count{_format_labels(key)} {hist['count']}")
+		return "\n".join(lines) + "\n"
+
+
+class RunRecorder:
+	"""Collects the events of one flow run for the per-run summary attached to its result."""
+
+	def __init__(self):
+		self.started = time.monotonic()
+		self.events = []
+		self._lock = threading.Lock()
+
+	def add(self, event: dict):
+		with self._lock:
+			self.events.append(event)
+
+	def summary(self) -> dict:
+		with self._lock:
+			events = list(self.events)
+		calls = [e for e in events if e["kind"] == "agent_call"]
+		misses = [e for e in calls if not e.get("cache_hit")]
+		routes = {}
+		for e in misses:
+			route = routes.setdefault(f"{e['agent']}:{e.get('model', '')}", {
+				"calls": 0, "seconds": 0.0, "prompt_tokens": 0, "completion_tokens": 0, "cost": 0.0
+			})
+			route["calls"] += 1
+			route["seconds"] += e["duration"]
+			route["prompt_tokens"] += e.get("prompt_tokens", 0)
+			route["completion_tokens"] += e.get("completion_tokens", 0)
+			route["cost"] += e.get("cost", 0.0)
+		for route in routes.values():
+			route["seconds"] = round(route["seconds"], 4)
+			route["cost"] = round(route["cost"], 6)
+		return {
+			"wall_time": round(time.monotonic() - self.started, 4),
+			"llm_calls": len(misses),
+			"cache_hits": len(calls) - len(misses),
+			"llm_seconds": round(sum(e["duration"] for e in misses), 4),
+			"prompt_tokens": sum(e.get("prompt_tokens", 0) for e in misses),
+			"prompt_tokens_counted": sum(e.get("prompt_tokens_counted", 0) for e in misses),
+			"completion_tokens": sum(e.get("completion_tokens", 0) for e in misses),
+			"retries": sum(e.get("retries", 0) for e in misses),
+			"parse_failures": sum(1 for e in events if e["kind"] == "parse" and e["outcome"] == "default"),
+			"repairs": sum(1 for e in events if e["kind"] == "parse" and e["outcome"] == "repaired"),
+			"loops_saved": sum(1 for e in events if e["kind"] == "parse" and e.get("saves_loop")),
+			"iterations": [round(e["duration"], 4) for e in events if e["kind"] == "flow_iteration"],
+			"cost": round(sum(e.get("cost", 0.0) for e in misses), 6),
+			"routes": routes,
+		}
+
+
+class JsonlTraceWriter:
+	"""Hook that appends every event as one JSON line."""
+
+	def __init__(self, path: str):
+		self.path = path
+		self._lock = threading.Lock()
+
+	def __call__(self, event: dict):
+		line = json.dumps(event, default=str)
+		with self._lock:
+			with open(self.path, "a", encoding="utf-8") as f:
+				f.write(line + "\n")
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_metrics() -> MetricsRegistry:
+	"""The process-wide registry. RESUME_TRACE_PATH enables a JSONL trace of every event."""
+	global _registry
+	with _registry_lock:
+		if _registry is None:
+			_registry = MetricsRegistry()
+			trace_path = os.getenv("RESUME_TRACE_PATH")
+			if trace_path:
+				_registry.add_hook(JsonlTraceWriter(trace_path))
+		return _registry
+
+
+def record(event: dict):
+	get_metrics().record(event)
+
+
+@contextlib.contextmanager
+def run_scope():
+	"""Collect events for one run; nested scopes reuse the outer recorder."""
+	outer = _current_run.get()
+	if outer is not None:
+		yield outer
+		return
+	recorder = RunRecorder()
+	token = _current_run.set(recorder)
+	try:
+		yield recorder
+	finally:
+		_current_run.reset(token)
+
+
+def current_run():
+	return _current_run.get()
+
+
+def with_run_scope(fn):
+	"""Run a flow entry point (function, coroutine or generator) inside ``run_scope``."""
+	if asyncio.iscoroutinefunction(fn):
+		@functools.wraps(fn)
+		async def async_wrapper(*args, **kwargs):
+			with run_scope():
+				return await fn(*args, **kwargs)
+		return async_wrapper
+	if inspect.isgeneratorfunction(fn):
+		@functools.wraps(fn)
+		def generator_wrapper(*args, **kwargs):
+			with run_scope():
+				yield from fn(*args, **kwargs)
+		return generator_wrapper
+
+	@functools.wraps(fn)
+	def wrapper(*args, **kwargs):
+		with run_scope():
+			return fn(*args, **kwargs)
+	return wrapper
+
+
+@contextlib.contextmanager
+def timed(kind: str, **fields):
+	"""Record a ``kind`` event with the wall time of the enclosed block."""
+	start = time.perf_counter()
+	event = {"kind": kind, **fields}
+	try:
+		yield event
+	except Exception as e:
+		event["error"] = type(e).__name__
+		raise
+	finally:
+		event["duration"] = time.perf_counter() - start
+		record(event)
+
+
+def instrumented(kind: str, format_of=None):
+	"""Decorator form of ``timed``; ``format_of(*args)`` labels the event's document format."""
+	def decorator(fn):
+		@functools.wraps(fn)
+		def wrapper(*args, **kwargs):
+			fields = {"name": fn.__name__}
+			if format_of is not None:
+				fields["format"] = format_of(*args, **kwargs)
+			with timed(kind, **fields):
+				return fn(*args, **kwargs)
+		return wrapper
+	return decorator
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+	def do_GET(self):
+		if self.path.split("?")[0] != "/metrics":
+			self.send_response(404)
+			self.end_headers()
+			return
+		body = get_metrics().to_prometheus().encode("utf-8")
+		self.send_response(200)
+		self.send_header("Content-Type", "text/plain; version=0.0.4")
+		self.send_header("Content-Length", str(len(body)))
+		self.end_headers()
+		self.wfile.write(body)
+
+	def log_message(self, *args):
+		pass
+
+
+def start_metrics_server(port: int, host: str = "0.0.0.0") -> ThreadingHTTPServer:
+	"""Serve the Prometheus text format at http://host:port/metrics from a daemon thread."""
+	server = ThreadingHTTPServer((host, port), _MetricsHandler)
+	threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True).start()
+	return server
@@ -0,0 +1,149 @@
+import threading
+import zlib
+
+import numpy as np
+
+from utils.scoring import doc_tokens
+
+_MERSENNE = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+_SHINGLE_MULTIPLIER = np.uint64(1000003)
+
+
+class MinHasher:
+	"""MinHash signatures over word shingles of a resume's normalized tokens (see ``utils.scoring.tokenize``).
+
+	Each token is crc32-hashed once and shingle hashes are rolled from those in numpy, so no shingle
+	strings are built. Permutations are ``(a * h + b) mod (2**61 - 1)`` with a, b and h below 2**32,
+	so the products never overflow uint64 and one numpy pass computes every permutation.
+	"""
+
+	def __init__(self, num_perm: int = 64, shingle_size: int = 5, seed: int = 1):
+		rng = np.random.RandomState(seed)
+		self.num_perm = num_perm
+		self.shingle_size = shingle_size
+		self._a = rng.randint(1, int(_MAX_HASH), num_perm, dtype=np.uint64)
+		self._b = rng.randint(0, int(_MAX_HASH), num_perm, dtype=np.uint64)
+
+	def shingle_hashes(self, text):
+		"""Distinct 32-bit hashes of every run of ``shingle_size`` tokens (the whole text if shorter)."""
+		tokens = doc_tokens(text)
+		if not tokens:
+			return np.empty(0, dtype=np.uint64)
+		token_hashes = np.fromiter((zlib.crc32(t.encode("utf-8")) for t in tokens), dtype=np.uint64, count=len(tokens))
+		size = min(self.shingle_size, len(tokens))
+		count = len(tokens) - size + 1
+		hashes = np.zeros(count, dtype=np.uint64)
+		for offset in range(size):
+			hashes = (hashes * _SHINGLE_MULTIPLIER + token_hashes[offset:offset + count]) & _MAX_HASH
+		return np.unique(hashes)
+
+	def signature(self, text):
+		"""uint32 array of ``num_perm`` minimums; an empty text gets the all-max signature."""
+		hashes = self.shingle_hashes(text)
+		if not len(hashes):
+			return np.full(self.num_perm, _MAX_HASH, dtype=np.uint32)
+		permuted = (hashes[:, None] * self._a + self._b) % _MERSENNE & _MAX_HASH
+		return permuted.min(axis=0).astype(np.uint32)
+
+
+def similarity(a, b) -> float:
+	"""Estimated Jaccard similarity of the shingle sets behind two signatures."""
+	return float(np.count_nonzero(a == b)) / len(a)
+
+
+def lsh_bands(threshold: float, num_perm: int) -> tuple:
+	"""(bands, rows) with the most rows (fewest false candidates) that still make a pair at
+	``threshold`` a candidate with probability >= 0.99."""
+	best = (num_perm, 1)
+	for rows in range(1, num_perm + 1):
+		if num_perm % rows:
+			continue
+		bands = num_perm // rows
+		if 1.0 - (1.0 - threshold ** rows) ** bands >= 0.99:
+			best = (bands, rows)
+	return best
+
+
+class LSHIndex:
+	"""Banded locality-sensitive index over MinHash signatures.
+
+	Each signature is cut into ``bands`` slices and lands in one bucket per slice, so ``query`` only
+	compares against entries sharing a bucket: its cost follows the candidates, not the index size.
+	Signatures live in one growing uint32 matrix, so candidates are scored in a single numpy step.
+	Buckets are scoped by a namespace (e.g. a JD hash) and hold a bare row number until they collide,
+	which keeps the per-entry overhead small at hundreds of thousands of entries. Removed rows are reused.
+	"""
+
+	def __init__(self, threshold: float = 0.9, num_perm: int = 64):
+		self.threshold = threshold
+		self.bands, self.rows = lsh_bands(threshold, num_perm)
+		self._buckets = [{} for _ in range(self.bands)]
+		self._matrix = np.empty((1024, num_perm), dtype=np.uint32)
+		self._keys = []
+		self._rows = {}
+		self._free = []
+		self._lock = threading.Lock()
+
+	def __len__(self) -> int:
+		return len(self._rows)
+
+	def _band_keys(self, signature, namespace) -> list:
+		rows = self.rows
+		return [hash((namespace, signature[i * rows:(i + 1) * rows].tobytes())) for i in range(self.bands)]
+
+	def add(self, key, signature, namespace=""):
+		with self._lock:
+			if self._free:
+				row = self._free.pop()
+				self._keys[row] = key
+			else:
+				row = len(self._keys)
+				if row == len(self._matrix):
+					self._matrix = np.concatenate([self._matrix, np.empty_like(self._matrix)])
+				self._keys.append(key)
+			self._matrix[row] = signature
+			self._rows[key] = row
+			for buckets, band_key in zip(self._buckets, self._band_keys(signature, namespace)):
+				held = buckets.get(band_key)
+				if held is None:
+					buckets[band_key] = row
+				elif isinstance(held, list):
+					held.append(row)
+				else:
+					buckets[band_key] = [held, row]
+
+	def remove(self, key, namespace=""):
+		"""Drop ``key`` (added under ``namespace``) from its buckets and free its row."""
+		with self._lock:
+			row = self._rows.pop(key, None)
+			if row is None:
+				return
+			for buckets, band_key in zip(self._buckets, self._band_keys(self._matrix[row], namespace)):
+				held = buckets.get(band_key)
+				if held == row:
+					del buckets[band_key]
+				elif isinstance(held, list):
+					held.remove(row)
+					if len(held) == 1:
+						buckets[band_key] = held[0]
+			self._keys[row] = None
+			self._free.append(row)
+
+	def query(self, signature, namespace="") -> list:
+		"""(key, estimated similarity) of indexed signatures at or above ``threshold``, most similar first."""
+		with self._lock:
+			candidates = set()
+			for buckets, band_key in zip(self._buckets, self._band_keys(signature, namespace)):
+				held = buckets.get(band_key)
+				if isinstance(held, list):
+					candidates.update(held)
+				elif held is not None:
+					candidates.add(held)
+			if not candidates:
+				return []
+			rows = np.fromiter(candidates, dtype=np.int64, count=len(candidates))
+			scores = (self._matrix[rows] == signature).mean(axis=1)
+			keep = np.flatnonzero(scores >= self.threshold)
+			found = [(self._keys[rows[i]], float(scores[i])) for i in keep]
+		return sorted(found, key=lambda item: -item[1])
@@ -0,0 +1,116 @@
+import re
+
+import numpy as np
+
+from agents.jd_profile import JDProfile
+
+TOKEN_RE = re.compile(r"[a-z0-9+#]+(?:[.\-][a-z0-9+#]+)*")
+SKILL_WEIGHT = 0.7
+KEYWORD_WEIGHT = 0.3
+
+
+def tokenize(text: str) -> list:
+	return TOKEN_RE.findall((text or "").lower())
+
+
+def doc_tokens(doc) -> tuple:
+	"""Tokens of a resume given as text or as a ``utils.sections.ParsedResume`` (which caches them)."""
+	return doc.tokens if hasattr(doc, "tokens") else tokenize(doc)
+
+
+class ScoreResult:
+	"""Scores for a batch of resumes (rows) against one or more JDs (columns)."""
+
+	def __init__(self, bm25, skill_coverage, keyword_coverage):
+		self.bm25 = bm25
+		self.skill_coverage = skill_coverage
+		self.keyword_coverage = keyword_coverage
+		# Batch-independent 0-1 score, so a gate threshold means the same thing for one resume or ten thousand
+		self.match = SKILL_WEIGHT * skill_coverage + KEYWORD_WEIGHT * keyword_coverage
+
+	def top_k(self, k: int, jd_index: int = 0) -> list:
+		"""(resume index, match score) for the k best resumes, ties broken by BM25."""
+		order = np.lexsort((-self.bm25[:, jd_index], -self.match[:, jd_index]))[:k]
+		return [(int(i), float(self.match[i, jd_index])) for i in order]
+
+	def gate(self, threshold: float, jd_index: int = 0):
+		"""Boolean mask of resumes whose match score clears ``threshold``."""
+		return self.match[:, jd_index] >= threshold
+
+
+class ResumeScorer:
+	"""Local, LLM-free pre-scorer: BM25 plus exact skill/keyword hits over a shared term vocabulary."""
+
+	def __init__(self, profiles, k1: float = 1.5, b: float = 0.75):
+		if isinstance(profiles, JDProfile):
+			profiles = [profiles]
+		self.profiles = list(profiles)
+		self.k1 = k1
+		self.b = b
+		self.vocab = {}
+		self.max_ngram = 1
+		skill_terms = [self._term_ids(p.skills) for p in self.profiles]
+		keyword_terms = [self._term_ids(p.keywords) for p in self.profiles]
+		n_terms = len(self.vocab)
+		self.skill_mask = np.zeros((len(self.profiles), n_terms))
+		self.keyword_mask = np.zeros((len(self.profiles), n_terms))
+		for j, (skills, keywords) in enumerate(zip(skill_terms, keyword_terms)):
+			self.skill_mask[j, skills] = 1.0
+			self.keyword_mask[j, keywords] = 1.0
+		self.query_weights = np.maximum(self.skill_mask, self.keyword_mask)
+
+	def _term_ids(self, terms: list) -> list:
+		ids = []
+		for term in terms:
+			tokens = tokenize(term)
+			if not tokens:
+				continue
+			self.max_ngram = max(self.max_ngram, len(tokens))
+			ids.append(self.vocab.setdefault(" ".join(tokens), len(self.vocab)))
+		return ids
+
+	def term_counts(self, texts: list):
+		"""Term-document count matrix (resumes x vocabulary) and document lengths.
+
+		``texts`` may mix strings and ParsedResume objects; the latter reuse their cached tokens.
+		"""
+		n_terms = len(self.vocab)
+		flat = []
+		lengths = np.zeros(len(texts))
+		for row, text in enumerate(texts):
+			tokens = doc_tokens(text)
+			lengths[row] = len(tokens)
+			for n in range(1, self.max_ngram + 1):
+				for i in range(len(tokens) - n + 1):
+					col = self.vocab.get(" ".join(tokens[i:i + n]))
+					if col is not None:
+						flat.append(row * n_terms + col)
+		counts = np.bincount(np.asarray(flat, dtype=np.int64), minlength=len(texts) * n_terms)
+		return counts.reshape(len(texts), n_terms).astype(float), lengths
+
+	def score(self, texts: list) -> ScoreResult:
+		counts, lengths = self.term_counts(texts)
+		n_docs = len(texts)
+		present = counts > 0
+		df = present.sum(axis=0)
+		idf = np.log(1.0 + (n_docs - df + 0.5) / (df + 0.5))
+		avg_len = lengths.mean() if n_docs and lengths.mean() > 0 else 1.0
+		norm = self.k1 * (1.0 - self.b + self.b * lengths[:, None] / avg_len)
+		tf = counts * (self.k1 + 1.0) / (counts + norm)
+		bm25 = (tf * idf) @ self.query_weights.T
+		with np.errstate(invalid="ignore", divide="ignore"):
+			skill_coverage = np.nan_to_num((present @ self.skill_mask.T) / self.skill_mask.sum(axis=1))
+			keyword_coverage = np.nan_to_num((present @ self.keyword_mask.T) / self.keyword_mask.sum(axis=1))
+		return ScoreResult(bm25, skill_coverage, keyword_coverage)
+
+
+def score_resume(profile: JDProfile, resume_text) -> dict:
+	"""The 0-5 skill / keyword / tone scores shown in the UI for a single resume (text or ParsedResume)."""
+	result = ResumeScorer(profile).score([resume_text])
+	tone = profile.tone.lower()
+	lower = resume_text.lower if hasattr(resume_text, "tokens") else (resume_text or "").lower()
+	return {
+		"skill_score": round(float(result.skill_coverage[0, 0]) * 5, 1),
+		"keyword_score": round(float(result.keyword_coverage[0, 0]) * 5, 1),
+		"tone_score": 5.0 if tone and tone in lower else 3.0,
+	}
@@ -0,0 +1,194 @@
+import re
+import threading
+from collections import OrderedDict
+
+from utils.scoring import tokenize
+
+# Canonical section names and the headings that map to them
+SECTION_ALIASES = {
+	"Summary": ("summary", "professional summary", "profile", "objective", "about me", "about"),
+	"Skills": ("skills", "technical skills", "core competencies", "competencies", "technologies"),
+	"Experience": ("experience", "work experience", "professional experience", "employment", "work history"),
+	"Education": ("education", "academic background", "qualifications"),
+	"Projects": ("projects", "personal projects", "key projects"),
+	"Certifications": ("certifications", "certificates", "licenses", "awards"),
+}
+_ALIAS_TO_SECTION = {alias: name for name, aliases in SECTION_ALIASES.items() for alias in aliases}
+HEADING_RE = re.compile(
+	r"^\s*(" + "|".join(sorted((re.escape(a) for a in _ALIAS_TO_SECTION), key=len, reverse=True)) + r")\s*:?\s*$",
+	re.I,
+)
+
+
+def canonical_section(name: str) -> str:
+	"""Map a heading or an LLM section key such as 'Work Experience' to its canonical name."""
+	key = re.sub(r"\s+", " ", (name or "").strip().rstrip(":")).lower()
+	if key in _ALIAS_TO_SECTION:
+		return _ALIAS_TO_SECTION[key]
+	for alias, section in _ALIAS_TO_SECTION.items():
+		if alias in key:
+			return section
+	return "Other"
+
+
+class Section:
+	"""A contiguous block of resume lines. ``heading`` is the heading line ('' for the header block).
+
+	Treated as immutable once built: ``ParsedResume.revise`` swaps in new Section objects, so the
+	lazily computed tokens of an unchanged section stay valid across resume versions.
+	"""
+
+	__slots__ = ("name", "heading", "body", "_tokens")
+
+	def __init__(self, name: str, heading: str, body: str):
+		self.name = name
+		self.heading = heading
+		self.body = body
+		self._tokens = None
+
+	def text(self) -> str:
+		return self.heading + self.body
+
+	@property
+	def tokens(self) -> tuple:
+		if self._tokens is None:
+			self._tokens = tuple(tokenize(self.text()))
+		return self._tokens
+
+
+def split_sections(text: str) -> list:
+	"""Split a resume into sections in their original order; ``join_sections`` reproduces the text exactly."""
+	sections = []
+	header = []
+	name = heading = None
+	body = header
+	for line in (text or "").splitlines(keepends=True):
+		match = HEADING_RE.match(line)
+		if match:
+			if name is not None:
+				sections.append(Section(name, heading, "".join(body)))
+			name, heading, body = _ALIAS_TO_SECTION[match.group(1).lower()], line, []
+		else:
+			body.append(line)
+	if name is not None:
+		sections.append(Section(name, heading, "".join(body)))
+	if header:
+		sections.insert(0, Section("Header", "", "".join(header)))
+	return sections
+
+
+def join_sections(sections: list) -> str:
+	return "".join(section.text() for section in sections)
+
+
+def _breaks_sections(body: str) -> bool:
+	lines = body.splitlines(keepends=True)
+	return bool(lines) and (not lines[-1].endswith("\n") or any(HEADING_RE.match(line) for line in lines))
+
+
+def strip_heading_echo(name: str, body: str) -> str:
+	"""``body`` without a leading heading line for section ``name`` (e.g. an LLM repeating 'Skills:')."""
+	lines = body.splitlines(keepends=True)
+	first = next((i for i, line in enumerate(lines) if line.strip()), None)
+	if first is None:
+		return body
+	match = HEADING_RE.match(lines[first])
+	if match and _ALIAS_TO_SECTION[match.group(1).lower()] == name:
+		return "".join(lines[first + 1:])
+	return body
+
+
+class ParsedResume:
+	"""One resume version, split into sections once and shared by scoring, diffing, prompting and export.
+
+	Tokens (lowercase, see ``utils.scoring.tokenize``), the lowercase text and the set of stripped lines
+	are computed on first use; ``revise`` builds the next version reusing every unchanged section.
+	"""
+
+	__slots__ = ("text", "sections", "_tokens", "_lower", "_line_set")
+
+	def __init__(self, text: str, sections: list = None):
+		self.text = text or ""
+		self.sections = tuple(sections if sections is not None else split_sections(self.text))
+		self._tokens = None
+		self._lower = None
+		self._line_set = None
+
+	@property
+	def tokens(self) -> tuple:
+		# sections split on line boundaries and tokens never span a newline, so this equals tokenize(text)
+		if self._tokens is None:
+			self._tokens = tuple(token for section in self.sections for token in section.tokens)
+		return self._tokens
+
+	@property
+	def lower(self) -> str:
+		if self._lower is None:
+			self._lower = self.text.lower()
+		return self._lower
+
+	@property
+	def line_set(self) -> frozenset:
+		"""Stripped, non-empty lines, for line-level diffs between versions."""
+		if self._line_set is None:
+			self._line_set = frozenset(line.strip() for line in self.text.splitlines() if line.strip())
+		return self._line_set
+
+	def added_lines(self, previous: "ParsedResume") -> frozenset:
+		return self.line_set - previous.line_set
+
+	def revise(self, bodies: dict) -> "ParsedResume":
+		"""The next version with ``bodies`` (section index -> new body) swapped in; other sections are shared.
+
+		A new body containing a heading line (or not ending in a newline) would make the sections disagree
+		with ``split_sections`` of the text, so the text is split again, keeping every Section that came
+		out unchanged.
+		"""
+		sections = [
+			Section(s.name, s.heading, bodies[i]) if i in bodies and bodies[i] != s.body else s
+			for i, s in enumerate(self.sections)
+		]
+		text = join_sections(sections)
+		if any(_breaks_sections(body) for body in bodies.values()):
+			kept = {(s.name, s.heading, s.body): s for s in sections}
+			sections = [kept.get((s.name, s.heading, s.body), s) for s in split_sections(text)]
+		revised = ParsedResume(text, sections)
+		parsed_resumes.put(revised)
+		return revised
+
+
+class ParsedResumeCache:
+	"""Recent ParsedResume versions by text (LRU), so each version is split and tokenized once."""
+
+	def __init__(self, max_items: int = 128):
+		self.max_items = max_items
+		self._items = OrderedDict()
+		self._lock = threading.Lock()
+
+	def get(self, text: str):
+		with self._lock:
+			parsed = self._items.get(text)
+			if parsed is not None:
+				self._items.move_to_end(text)
+			return parsed
+
+	def put(self, parsed: ParsedResume):
+		with self._lock:
+			self._items[parsed.text] = parsed
+			self._items.move_to_end(parsed.text)
+			while len(self._items) > self.max_items:
+				self._items.popitem(last=False)
+
+
+parsed_resumes = ParsedResumeCache()
+
+
+def parse_resume(text) -> ParsedResume:
+	"""ParsedResume for ``text`` (passed through if it already is one), built once per version."""
+	if isinstance(text, ParsedResume):
+		return text
+	parsed = parsed_resumes.get(text or "")
+	if parsed is None:
+		parsed = ParsedResume(text)
+		parsed_resumes.put(parsed)
+	return parsed